@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Availability decode benchmark
+Compares json.loads + dict walking against scanning the raw body into typed spots
+
+Usage: python benchmarks/bench_decode.py [--repeat N]
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.availability_decoder import decode_spots, spots_from_json
+from src.PerfectMindSession import PerfectMindSession
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tests', 'fixtures', 'response.json')
+
+
+def load_body(days_multiplier):
+    """Build a compact JSON body like the server sends, optionally with more days"""
+    with open(FIXTURE, 'r') as f:
+        data = eval(f.read())
+    data['availabilities'] = data['availabilities'] * days_multiplier
+    return json.dumps(data, separators=(',', ':')).encode()
+
+
+def peak_memory(func):
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=200, help='Iterations per measurement')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    session = PerfectMindSession()
+
+    print(f"{'body':<12}{'bytes':>9}{'spots':>7}{'json+walk ms':>14}{'scan ms':>10}"
+          f"{'json+parse ms':>15}{'raw parse ms':>14}{'json KiB':>10}{'scan KiB':>10}")
+    for multiplier in (1, 5):
+        body = load_body(multiplier)
+        spots = decode_spots(body)
+        assert spots == spots_from_json(json.loads(body))
+
+        cases = {
+            'json_walk': lambda: spots_from_json(json.loads(body)),
+            'scan': lambda: decode_spots(body),
+            'json_parse': lambda: session.parse_availability_data(json.loads(body)),
+            'raw_parse': lambda: session.parse_availability_data(body),
+        }
+        timings = {name: timeit.timeit(func, number=args.repeat) / args.repeat * 1000 for name, func in cases.items()}
+        json_mem = peak_memory(cases['json_walk']) / 1024
+        scan_mem = peak_memory(cases['scan']) / 1024
+
+        print(f"{'x' + str(multiplier):<12}{len(body):>9}{len(spots):>7}"
+              f"{timings['json_walk']:>14.3f}{timings['scan']:>10.3f}{timings['json_parse']:>15.3f}"
+              f"{timings['raw_parse']:>14.3f}{json_mem:>10.0f}{scan_mem:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
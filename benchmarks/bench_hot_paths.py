@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Hot path benchmark
+Times parse, format, sort, diff, table rendering and SMS formatting on synthetic
+responses, reports per-slot cost and peak memory, and flags regressions against
+a stored baseline
+
+The *_legacy cases run the list-of-dicts code the SlotTable replaced. sort_table
+and diff_table build new tables while their legacy counterparts only reorder or
+filter references, so the cycle_* cases time what one check does end to end:
+build and format the slots, sort them and find the new ones.
+
+Per-slot costs only compare between runs of the same size: fixed per-call costs
+and cases that scale with dates or start times rather than slots (render_table)
+look slower per slot on a smaller input. A run whose parameters differ from the
+baseline's is therefore reported without being compared.
+
+Usage: python benchmarks/bench_hot_paths.py [--facilities N] [--days N] [--repeat N]
+                                            [--save-baseline] [--tolerance 0.3]
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.availability_grid import AvailabilityGrid
+from src.PerfectMindSession import PerfectMindSession
+from src.slot_table import SlotTable
+from src.sms_notifier import SMSNotifier
+from src.synthetic_availability import generate_body
+from src.check_availability import find_new_slots, format_slot_output, get_slot_key
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+START_DATE = date(2025, 10, 7)
+
+
+def calibrate():
+    """Fixed pure-Python workload used to scale timings to the speed of the current machine"""
+    keys = [(f"2025-10-{day:02d}", minute, court)
+            for day in range(1, 31) for minute in range(0, 1440, 30) for court in range(4)]
+    return sorted(set(keys), key=lambda k: (k[2], k[1], k[0]))
+
+
+def best_times(cases, repeat):
+    """
+    Fastest run of every case, in seconds
+
+    Repeats go round-robin over the cases so a slow patch on the machine hits all of
+    them rather than one; the garbage collector is off while timing, like timeit.
+    """
+    best = {name: float('inf') for name in cases}
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            for name, func in cases.items():
+                started = time.perf_counter()
+                func()
+                best[name] = min(best[name], time.perf_counter() - started)
+    finally:
+        gc.enable()
+    return best
+
+
+def peak_memory(func):
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def build_inputs(facilities, days, density, step):
+    """Synthetic bodies plus the parsed slots and tables the later stages start from"""
+    session = PerfectMindSession()
+    bodies = [
+        generate_body(START_DATE, days, 60, density=density, seed=court, step=step)
+        for court in range(1, facilities + 1)
+    ]
+    parsed = [session.parse_availability_data(body) for body in bodies]
+
+    current = SlotTable()
+    legacy = []
+    for court, slots in enumerate(parsed, start=1):
+        current.extend_slots(slots, court)
+        for slot in slots:
+            legacy.append({**slot, 'court': court, 'formatted': format_slot_output(slot, court)})
+
+    # Previous cycle: same facilities with a different seed, so roughly half the slots changed
+    previous = SlotTable()
+    for court in range(1, facilities + 1):
+        body = generate_body(START_DATE, days, 60, density=density, seed=f"prev-{court}", step=step)
+        previous.extend_slots(session.parse_availability_data(body), court)
+    previous_keys = {get_slot_key(slot) for slot in previous.to_dicts()}
+
+    return session, bodies, parsed, current, legacy, previous, previous_keys
+
+
+def legacy_cycle(parsed, previous_keys):
+    """One check the way the list-of-dicts code did it"""
+    all_slots = []
+    for court, slots in enumerate(parsed, start=1):
+        for slot in slots:
+            all_slots.append({**slot, 'court': court, 'formatted': format_slot_output(slot, court)})
+    all_slots.sort(key=lambda s: (s['date'], s['time'], s['court']))
+    new_slots = find_new_slots(all_slots, previous_keys)
+    return new_slots, {get_slot_key(slot) for slot in all_slots}
+
+
+def table_cycle(parsed, previous):
+    """One check with SlotTable: build, sort, diff and format what is new"""
+    tables = []
+    for court, slots in enumerate(parsed, start=1):
+        table = SlotTable()
+        table.extend_slots(slots, court)
+        tables.append(table)
+    current = SlotTable.concat(tables).sorted()
+    appeared, _ = current.diff(previous)
+    return list(appeared.iter_formatted()), current
+
+
+def make_cases(session, bodies, parsed, current, legacy, previous, previous_keys):
+    notifier = SMSNotifier()
+    table = current.sorted()
+    return {
+        'parse': lambda: [session.parse_availability_data(body) for body in bodies],
+        'build_table': lambda: [SlotTable().extend_slots(slots, court) for court, slots in enumerate(parsed, start=1)],
+        'format_legacy': lambda: [format_slot_output(slot, slot['court']) for slot in legacy],
+        'format_table': lambda: list(current.iter_formatted()),
+        'sort_legacy': lambda: sorted(legacy, key=lambda s: (s['date'], s['time'], s['court'])),
+        'sort_table': lambda: current.sorted(),
+        'diff_legacy': lambda: find_new_slots(legacy, previous_keys),
+        'diff_table': lambda: current.diff(previous),
+        'render_table': lambda: AvailabilityGrid.from_table(current).render_table(),
+        'sms_format': lambda: notifier.format_message(table),
+        'cycle_legacy': lambda: legacy_cycle(parsed, previous_keys),
+        'cycle_table': lambda: table_cycle(parsed, previous),
+    }
+
+
+def load_baseline(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--facilities', type=int, default=50, help='Number of synthetic facilities')
+    parser.add_argument('--days', type=int, default=30, help='Days per facility response')
+    parser.add_argument('--density', type=float, default=0.8, help='Fraction of start times open')
+    parser.add_argument('--step', type=int, default=30, help='Minutes between candidate start times')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per case; the fastest is reported')
+    parser.add_argument('--baseline', default=BASELINE, help='Baseline JSON file')
+    parser.add_argument('--save-baseline', action='store_true', help='Write the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.3, help='Allowed per-slot slowdown before flagging')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    inputs = build_inputs(args.facilities, args.days, args.density, args.step)
+    slot_count = len(inputs[3])
+    body_bytes = sum(len(body) for body in inputs[1])
+    print(f"{args.facilities} facilities x {args.days} days: {slot_count} slots, "
+          f"{body_bytes / 1024 / 1024:.1f} MiB of JSON")
+
+    params = {'facilities': args.facilities, 'days': args.days, 'density': args.density,
+              'step': args.step, 'slots': slot_count}
+    baseline = None if args.save_baseline else load_baseline(args.baseline)
+    if baseline and baseline.get('params') != params:
+        recorded = ', '.join(f"--{name} {value}" for name, value in baseline.get('params', {}).items()
+                             if name != 'slots')
+        print(f"Note: baseline was recorded with {recorded}; not comparing a run with other parameters")
+        baseline = None
+
+    cases = make_cases(*inputs)
+    timings = best_times({'calibration': calibrate, **cases}, args.repeat)
+    calibration_ms = timings.pop('calibration') * 1000
+    # Machine speed relative to the one the baseline was recorded on
+    speed = calibration_ms / baseline['calibration_ms'] if baseline and baseline.get('calibration_ms') else 1.0
+    print(f"Calibration {calibration_ms:.1f} ms" + (f" (x{speed:.2f} of baseline machine)" if baseline else ''))
+
+    results = {}
+    regressions = []
+    print(f"\n{'case':<16}{'total ms':>11}{'ns/slot':>10}{'peak KiB':>11}{'baseline':>11}{'change':>9}")
+    for name, func in cases.items():
+        seconds = timings[name]
+        per_slot_ns = seconds / max(slot_count, 1) * 1e9
+        peak_kib = peak_memory(func) / 1024
+        results[name] = {'per_slot_ns': round(per_slot_ns, 1), 'peak_kib': round(peak_kib, 1)}
+
+        reference = (baseline or {}).get('cases', {}).get(name)
+        if reference:
+            change = per_slot_ns / (reference['per_slot_ns'] * speed) - 1
+            flag = ' REGRESSION' if change > args.tolerance else ''
+            if flag:
+                regressions.append(name)
+            print(f"{name:<16}{seconds * 1000:>11.2f}{per_slot_ns:>10.0f}{peak_kib:>11.0f}"
+                  f"{reference['per_slot_ns']:>11.0f}{change:>+9.0%}{flag}")
+        else:
+            print(f"{name:<16}{seconds * 1000:>11.2f}{per_slot_ns:>10.0f}{peak_kib:>11.0f}{'-':>11}{'-':>9}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({'params': params, 'calibration_ms': round(calibration_ms, 2), 'cases': results}, f, indent=2)
+            f.write('\n')
+        print(f"\nBaseline saved to {args.baseline}")
+    elif regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
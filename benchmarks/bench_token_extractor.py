@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Token extraction benchmark
+Compares the streaming token scanner against a full BeautifulSoup parse of the landing page
+
+Usage: python benchmarks/bench_token_extractor.py [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.token_extractor import scan_verification_token, parse_verification_token
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tests', 'fixtures', 'landing_page.html')
+CHUNK_SIZE = 8192
+
+
+def chunked(data, size=CHUNK_SIZE):
+    return (data[i:i + size] for i in range(0, len(data), size))
+
+
+def fast_path(page):
+    return scan_verification_token(chunked(page))[0]
+
+
+def slow_path(page):
+    return parse_verification_token(page)
+
+
+def peak_memory(func, page):
+    tracemalloc.start()
+    func(page)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=50, help='Iterations per measurement')
+    args = parser.parse_args()
+
+    with open(FIXTURE, 'rb') as f:
+        page = f.read()
+
+    # Pad the page with extra markup after the form to show the scanner's cost does not grow with it
+    variants = [('fixture', page), ('fixture x10', page.replace(b'</body>', page * 9 + b'</body>', 1))]
+
+    print(f"{'page':<14}{'bytes':>10}{'bs4 ms':>10}{'scan ms':>10}{'speedup':>9}{'bs4 KiB':>10}{'scan KiB':>10}")
+    for name, body in variants:
+        assert fast_path(body) == slow_path(body)
+        slow = timeit.timeit(lambda: slow_path(body), number=args.repeat) / args.repeat * 1000
+        fast = timeit.timeit(lambda: fast_path(body), number=args.repeat) / args.repeat * 1000
+        slow_mem = peak_memory(slow_path, body) / 1024
+        fast_mem = peak_memory(fast_path, body) / 1024
+        print(f"{name:<14}{len(body):>10}{slow:>10.3f}{fast:>10.3f}{slow / fast:>8.0f}x"
+              f"{slow_mem:>10.0f}{fast_mem:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
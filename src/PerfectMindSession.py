@@ -1,24 +1,98 @@
 import requests
 import json
-from bs4 import BeautifulSoup
-from datetime import datetime, timedelta
-import pytz
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from datetime import datetime
+from urllib.parse import quote
 import logging
 
+from .availability_cache import AvailabilityCache
+from .availability_decoder import decode_spots
+from .token_extractor import scan_verification_token, parse_verification_token
+from .time_conversion import api_date_to_str, duration_label, format_time, toronto_now
+from .request_planner import plan_requests, merge_window_slots
+from .duration_index import DurationIndex
+from .availability_grid import AvailabilityGrid
+from .slot_table import SlotTable
+from .venue_config import DEFAULT_VENUE
+from .instrumentation import DISABLED as METRICS_DISABLED
+from .payload_capture import PayloadCapture
+from .token_cache import DEFAULT_TTL_SECONDS
+from .transport import RequestsTransport, Transport
+
+# Status codes PerfectMind answers with when the anti-forgery token or session is stale; they can also
+# mean a bad request, so they earn one retry with a fresh token but teach the token cache nothing by themselves
+TOKEN_REJECTED_STATUS_CODES = (400, 401, 403)
+
+# Chunk size used when streaming the landing page to look for the token
+TOKEN_SCAN_CHUNK_SIZE = 8192
+
+USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+              'Chrome/140.0.0.0 Safari/537.36')
+
+# Headers of the FacilityAvailability AJAX request (matching browser exactly), minus Origin and Referer
+AVAILABILITY_HEADERS = {
+    'Accept': 'application/json, text/javascript, */*; q=0.01',
+    'Accept-Encoding': 'gzip, deflate, br, zstd',
+    'Accept-Language': 'en-CA,en;q=0.9,zh-CN;q=0.8,zh;q=0.7,en-GB;q=0.6,en-US;q=0.5',
+    'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
+    'Priority': 'u=0, i',
+    'Sec-Ch-Ua': '"Chromium";v="140", "Not=A?Brand";v="24", "Google Chrome";v="140"',
+    'Sec-Ch-Ua-Mobile': '?0',
+    'Sec-Ch-Ua-Platform': '"Windows"',
+    'Sec-Fetch-Dest': 'empty',
+    'Sec-Fetch-Mode': 'cors',
+    'Sec-Fetch-Site': 'same-origin',
+    'User-Agent': USER_AGENT,
+    'X-Requested-With': 'XMLHttpRequest',
+}
+
 
 class PerfectMindSession:
     """Handles authentication and session management for PerfectMind booking system"""
 
-    def __init__(self, logger=None):
-        self.session = requests.Session()
-        self.base_url = "https://cityofmarkham.perfectmind.com"
+    def __init__(self, logger=None, pool_size=10, token_cache=None, upstream=None, base_url=None, venue=None,
+                 metrics=None, capture: 'PayloadCapture' = None, transport: 'Transport' = None):
+        # HTTP backend; requests with a pool_size keep-alive pool unless another is passed in
+        self.transport = transport or RequestsTransport(pool_size=pool_size)
+        # The underlying requests.Session when the requests backend is in use
+        self.session = getattr(self.transport, 'session', None)
+        # Widget, calendar and service IDs of the venue; courts of other venues on the
+        # same host can be added with register_venue
+        self.venue = venue or DEFAULT_VENUE
+        self._facility_venues = {}
+        # Overridable so the checker can run against a local stand-in server
+        self.base_url = (base_url or self.venue.base_url).rstrip('/')
         self.verification_token = None
+        # Epoch seconds after which the token is treated as expired; None means never
+        self.token_expires_at = None
+        # Epoch seconds the server last accepted the token, which the idle expiry counts from
+        self.token_used_at = None
         self.session_id = None
         self.logger = logger or logging.getLogger(__name__)
+        self.token_cache = token_cache
+        # Optional UpstreamController every PerfectMind request goes through
+        self.upstream = upstream
+        # Instrumentation for per-phase timings; disabled unless one is passed in
+        self.metrics = metrics or METRICS_DISABLED
+        # Optional sampled store of raw availability responses
+        self.capture = capture
+        # Optional compiled WatchSpec; spots it rejects are dropped while decoding
+        self.watch = None
+        self._token_lock = threading.Lock()
+        # Per-facility Referer parts and form fields, built once per facility
+        self._templates = {}
+        self._availability_headers = {**AVAILABILITY_HEADERS, 'Origin': self.base_url}
+        # Learned from responses: True once a response carries more than the requested duration
+        self.server_returns_all_durations = False
+        # Whether a duration index has already probed the server with a single request
+        self._durations_probed = False
 
         # Set default headers (matching browser exactly)
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36',
+        self.transport.headers.update({
+            'User-Agent': USER_AGENT,
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'en-CA,en;q=0.9,zh-CN;q=0.8,zh;q=0.7,en-GB;q=0.6,en-US;q=0.5',
             'Accept-Encoding': 'gzip, deflate, br, zstd',
@@ -28,45 +102,214 @@ class PerfectMindSession:
 
     def get_verification_token(self, facility_id):
         """Get verification token from the facility page"""
+        venue = self._venue_for(facility_id)
         url = f"{self.base_url}/Clients/BookMe4LandingPages/Facility"
         params = {
             'facilityId': facility_id,
-            'widgetId': 'f3086c1c-7fa3-47fd-9976-0e777c8a7456',
-            'calendarId': '7998c433-21f7-4914-8b85-9c61d6392511',
+            'widgetId': venue.widget_id,
+            'calendarId': venue.calendar_id,
             'arrivalDate': self._get_current_datetime(),
-            'landingPageBackUrl': 'https://cityofmarkham.perfectmind.com/Clients/BookMe4FacilityList/List?widgetId=f3086c1c-7fa3-47fd-9976-0e777c8a7456&calendarId=7998c433-21f7-4914-8b85-9c61d6392511'
+            'landingPageBackUrl': self._landing_page_back_url(venue)
         }
 
         try:
-            response = self.session.get(url, params=params)
+            response, _ = self._send('GET', url, params=params, stream=True)
             response.raise_for_status()
 
-            soup = BeautifulSoup(response.text, 'html.parser')
-
             # Extract verification token
-            form = soup.find('form', id='AjaxAntiForgeryForm')
-            if form:
-                token_input = form.find('input', {'name': '__RequestVerificationToken'})
-                if token_input:
-                    self.verification_token = token_input.get('value')
-                    self.logger.info(f"Got verification token: {self.verification_token[:20]}...")
-                    return True
+            token = self._extract_verification_token(response)
+            if token:
+                self.verification_token = token
+                self.logger.info("Got verification token: %s...", self.verification_token[:20])
+                if self.token_cache:
+                    self.token_cache.save(self.verification_token, self._export_cookies())
+                self._extend_token()
+                return True
 
             # Extract session ID and other cookies
-            if 'PMSessionId' in self.session.cookies:
-                self.session_id = self.session.cookies['PMSessionId']
-                self.logger.info(f"Got session ID: {self.session_id}")
+            if 'PMSessionId' in self.transport.cookies:
+                self.session_id = self.transport.cookies['PMSessionId']
+                self.logger.info("Got session ID: %s", self.session_id)
 
             # Set additional cookies that might be needed
-            self.session.cookies.set('perfectmindmobilefeature', '0')
-            self.session.cookies.set('mobileWidthCookie', '0')
-            self.session.cookies.set('ClusterId', 'ga2-member')
+            self.transport.cookies.set('perfectmindmobilefeature', '0')
+            self.transport.cookies.set('mobileWidthCookie', '0')
+            self.transport.cookies.set('ClusterId', 'ga2-member')
 
             return False
 
         except requests.RequestException as e:
-            self.logger.error(f"Failed to get verification token: {e}")
+            self.logger.error("Failed to get verification token: %s", e)
+            return False
+
+    def register_venue(self, venue):
+        """Use a venue's widget, calendar and service IDs for its courts"""
+        for court in venue.courts:
+            self._facility_venues[court['facilityId']] = venue
+        self._templates.clear()
+
+    def _venue_for(self, facility_id):
+        return self._facility_venues.get(facility_id, self.venue)
+
+    def _landing_page_back_url(self, venue):
+        """Facility list URL the landing pages link back to"""
+        return venue.landing_page_back_url.replace(venue.base_url, self.base_url, 1)
+
+    def _request_template(self, facility_id):
+        """
+        Static parts of a facility's availability request, built on first use
+
+        Returns:
+            Tuple of (Referer up to arrivalDate=, Referer after the arrival date,
+            service form fields)
+        """
+        template = self._templates.get(facility_id)
+        if template is None:
+            venue = self._venue_for(facility_id)
+            landing_page_back_url = quote(self._landing_page_back_url(venue), safe='')
+            template = (
+                f"{self.base_url}/Clients/BookMe4LandingPages/Facility?facilityId={facility_id}"
+                f"&widgetId={venue.widget_id}&calendarId={venue.calendar_id}&arrivalDate=",
+                f"&landingPageBackUrl={landing_page_back_url}",
+                {'serviceId': venue.service_id, 'durationIds[]': list(venue.duration_ids)}
+            )
+            self._templates[facility_id] = template
+        return template
+
+    def _send(self, method, url, key=None, **kwargs):
+        """Send a request, through the upstream controller when one is configured
+
+        Returns:
+            (response, live): live is False when an open circuit served the last good
+            response for key instead of sending the request
+        """
+        if self.upstream is None:
+            return self.transport.request(method, url, **kwargs), True
+
+        sent = []
+
+        def send():
+            sent.append(True)
+            return self.transport.request(method, url, **kwargs)
+
+        response = self.upstream.request(send, key=key)
+        return response, bool(sent)
+
+    def close(self):
+        """Release the transport's connections"""
+        self.transport.close()
+
+    def _extract_verification_token(self, response):
+        """Stream the landing page and stop scanning once the token is found"""
+        chunks = response.iter_content(chunk_size=TOKEN_SCAN_CHUNK_SIZE)
+        token, consumed = scan_verification_token(chunks)
+        if token:
+            # Drain the rest unparsed so the keep-alive connection goes back to the pool
+            for _ in chunks:
+                pass
+            return token
+
+        self.logger.debug("Fast token scan failed, falling back to full HTML parse")
+        return parse_verification_token(consumed + b''.join(chunks))
+
+    def _export_cookies(self):
+        """Serialize session cookies for the token cache"""
+        return [
+            {'name': c.name, 'value': c.value, 'domain': c.domain, 'path': c.path}
+            for c in self.transport.cookies
+        ]
+
+    def _restore_cached_token(self):
+        """Load the token and cookies from the token cache, returns True if restored"""
+        if not self.token_cache:
+            return False
+
+        entry = self.token_cache.load()
+        if not entry:
+            return False
+
+        for cookie in entry.get('cookies', []):
+            self.transport.cookies.set(cookie['name'], cookie['value'],
+                                       domain=cookie.get('domain', ''), path=cookie.get('path', '/'))
+        self.verification_token = entry['token']
+        fetched_at = entry.get('fetched_at')
+        self.token_used_at = fetched_at
+        self.token_expires_at = fetched_at + self.token_cache.get_ttl(entry) if fetched_at else None
+        self.session_id = self.transport.cookies.get('PMSessionId')
+        self.logger.info("Reusing cached verification token")
+        return True
+
+    def _token_ttl(self):
+        """Seconds a token stays usable after its last successful use"""
+        if self.token_cache:
+            return float(self.token_cache.current_ttl())
+        return DEFAULT_TTL_SECONDS
+
+    def _extend_token(self):
+        """Push the token expiry out after the server accepted it; sessions expire on inactivity"""
+        self.token_used_at = time.time()
+        if self.token_cache:
+            self.token_cache.accepted(self.token_used_at)
+        self.token_expires_at = self.token_used_at + self._token_ttl()
+
+    def _token_valid(self, margin=0.0):
+        if not self.verification_token:
             return False
+        return self.token_expires_at is None or time.time() + margin < self.token_expires_at
+
+    def warm(self, facility_id, valid_for=0.0):
+        """Have a token ready that stays valid for the next valid_for seconds, fetching a fresh one if needed
+
+        Returns:
+            True if a token is ready
+        """
+        if self._token_valid(valid_for):
+            return True
+        with self._token_lock:
+            if self._token_valid(valid_for):
+                return True
+            self.verification_token = None
+            with self.metrics.phase('token', facility_id):
+                return self.get_verification_token(facility_id)
+
+    def _ensure_token(self, facility_id):
+        """Make sure a valid verification token is available, from memory, cache or the landing page"""
+        if self._token_valid():
+            return True
+        with self._token_lock:
+            if self._token_valid():
+                return True
+            if self.verification_token:
+                self.logger.info("Verification token expired, re-authenticating")
+                self.verification_token = None
+            if self._restore_cached_token():
+                return True
+            with self.metrics.phase('token', facility_id):
+                return self.get_verification_token(facility_id)
+
+    def _refresh_token(self, facility_id, rejected_token):
+        """Replace a token the server rejected, unless another worker already did
+
+        Returns:
+            (ready, idle): whether a token is ready, and the seconds the rejected token had been
+            idle if this call replaced it (None if another worker did or it was never used)
+        """
+        with self._token_lock:
+            if self.verification_token and self.verification_token != rejected_token:
+                return True, None
+            idle = time.time() - self.token_used_at if self.token_used_at is not None else None
+            self.verification_token = None
+            if self.token_cache:
+                self.token_cache.invalidate()
+            with self.metrics.phase('token', facility_id):
+                return self.get_verification_token(facility_id), idle
+
+    def _is_token_rejected(self, response):
+        """Check whether an availability response means the token or session is no longer valid"""
+        if response.status_code in TOKEN_REJECTED_STATUS_CODES:
+            return True
+        # An expired session gets redirected to an HTML page instead of JSON
+        return response.status_code == 200 and 'text/html' in response.headers.get('Content-Type', '')
 
     def check_availability(self, facility_id, date=None, days_count=7, duration=60):
         """Check court availability for a specific facility
@@ -77,116 +320,192 @@ class PerfectMindSession:
             days_count: Number of days to check from the start date
             duration: Duration in minutes
         """
-        if not self.verification_token:
-            if not self.get_verification_token(facility_id):
-                return None
+        response = self._post_availability(facility_id, date, days_count, duration)
+        if response is None:
+            return None
+        return self._decode_availability(facility_id, response)
+
+    def _post_availability(self, facility_id, date=None, days_count=7, duration=60):
+        """Send the FacilityAvailability request and return the successful response, or None"""
+        if not self._ensure_token(facility_id):
+            return None
 
         url = f"{self.base_url}/Clients/BookMe4LandingPages/FacilityAvailability"
+        referer_prefix, referer_suffix, service_fields = self._request_template(facility_id)
 
-        # Set headers for AJAX request (matching browser exactly)
         # Use current datetime for Referer arrivalDate to match get_verification_token
-        arrival_date = self._get_current_datetime()
-        landing_page_back_url = 'https%3A%2F%2Fcityofmarkham.perfectmind.com%2FClients%2FBookMe4FacilityList%2FList%3FwidgetId%3Df3086c1c-7fa3-47fd-9976-0e777c8a7456%26calendarId%3D7998c433-21f7-4914-8b85-9c61d6392511'
-        referer_url = f"{self.base_url}/Clients/BookMe4LandingPages/Facility?facilityId={facility_id}&widgetId=f3086c1c-7fa3-47fd-9976-0e777c8a7456&calendarId=7998c433-21f7-4914-8b85-9c61d6392511&arrivalDate={arrival_date}&landingPageBackUrl={landing_page_back_url}"
-
-        headers = {
-            'Accept': 'application/json, text/javascript, */*; q=0.01',
-            'Accept-Encoding': 'gzip, deflate, br, zstd',
-            'Accept-Language': 'en-CA,en;q=0.9,zh-CN;q=0.8,zh;q=0.7,en-GB;q=0.6,en-US;q=0.5',
-            'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
-            'Origin': 'https://cityofmarkham.perfectmind.com',
-            'Priority': 'u=0, i',
-            'Referer': referer_url,
-            'Sec-Ch-Ua': '"Chromium";v="140", "Not=A?Brand";v="24", "Google Chrome";v="140"',
-            'Sec-Ch-Ua-Mobile': '?0',
-            'Sec-Ch-Ua-Platform': '"Windows"',
-            'Sec-Fetch-Dest': 'empty',
-            'Sec-Fetch-Mode': 'cors',
-            'Sec-Fetch-Site': 'same-origin',
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36',
-            'X-Requested-With': 'XMLHttpRequest',
-        }
+        headers = {**self._availability_headers,
+                   'Referer': referer_prefix + self._get_current_datetime() + referer_suffix}
 
         # Use provided date or current datetime for API request
         if date:
             api_date = self._format_date_for_api(date)
-            self.logger.info(f"Using specific date for API: {api_date}")
+            self.logger.info("Using specific date for API: %s", api_date)
         else:
             api_date = self._get_current_datetime()
-            self.logger.info(f"Using current datetime for API: {api_date}")
+            self.logger.info("Using current datetime for API: %s", api_date)
         data = {
             'facilityId': facility_id,
             'date': api_date,
             'daysCount': days_count,
             'duration': duration,
-            'serviceId': '308fcf95-0bbc-4fe4-b170-7ca1ad215922',  # Tennis service ID
-            'durationIds[]': [
-                'a828d44f-c2c4-4efa-8c0a-5b4e867f7ded',  # 60 min
-                'c431ba5d-2f05-4036-bc15-62bbe0b493ab',  # Additional duration
-                'ce80014f-da18-47ca-9486-63c770e7590e',  # Additional duration
-                '0af4655c-daef-42d8-8e1c-7bbc02eb49f6',  # 90 min
-                '09184560-08a2-45c5-ba1e-dd0f83842624',  # 120 min
-                '80f3666e-a7d1-4b1b-a891-ff6d8852290e'   # 180 min
-            ],
+            **service_fields,
             '__RequestVerificationToken': self.verification_token
         }
 
         try:
-            self.logger.debug(f"Sending request to {url} with headers: {headers} and data: {data}")
-            response = self.session.post(url, headers=headers, data=data)
+            self.logger.debug("Sending request to %s with headers: %s and data: %s", url, headers, data)
+            request_key = (facility_id, api_date if date else None, days_count, duration)
+            with self.metrics.phase('post', facility_id):
+                response, live = self._send('POST', url, key=request_key, headers=headers, data=data)
+            if self._is_token_rejected(response):
+                self.logger.warning("Verification token rejected (status %s), re-authenticating", response.status_code,
+                                    extra={'facility_id': facility_id, 'status': response.status_code})
+                ready, idle = self._refresh_token(facility_id, data['__RequestVerificationToken'])
+                if not ready:
+                    return None
+                data['__RequestVerificationToken'] = self.verification_token
+                with self.metrics.phase('post', facility_id):
+                    response, live = self._send('POST', url, key=request_key, headers=headers, data=data)
+                # A 400/403 can be a bad request as well as a stale token; only a fresh token that
+                # fixes the request shows the old one had timed out, so only then learn the TTL
+                if (self.token_cache and live and idle is not None and 200 <= response.status_code < 300
+                        and not self._is_token_rejected(response)):
+                    self.token_cache.learn(idle)
+            if not live:
+                # Served from the last good result of an open circuit: the server saw no
+                # request, so the token was not used and no new bytes arrived
+                return response
+            if self.capture is not None:
+                self.capture.capture(facility_id, response.content, response.status_code,
+                                     response.headers.get('Content-Type'))
             response.raise_for_status()
 
             if response.status_code == 200:
-                availability_data = response.json()
-                self.logger.info(f"Got availability data for facility {facility_id}")
-                self.logger.debug(f"Response: {availability_data}")
-                return availability_data
+                self._extend_token()
+                if self.metrics.enabled:
+                    self.metrics.add('bytes', len(response.content), facility_id)
+                return response
             else:
-                self.logger.error(f"Request failed with status code: {response.status_code}")
+                self.logger.error("Request failed with status code: %s", response.status_code,
+                                  extra={'facility_id': facility_id, 'status': response.status_code})
                 return None
 
         except requests.RequestException as e:
-            self.logger.error(f"Failed to check availability: {e}")
+            self.logger.error("Failed to check availability: %s", e, extra={'facility_id': facility_id})
             return None
-        except json.JSONDecodeError as e:
-            self.logger.error(f"Failed to parse JSON response: {e}")
+
+    def _decode_availability(self, facility_id, response):
+        """Decode an availability response body into JSON"""
+        try:
+            with self.metrics.phase('decode', facility_id):
+                availability_data = response.json()
+            self.logger.info("Got availability data for facility %s", facility_id)
+            self.logger.debug("Response: %s", availability_data)
+            return availability_data
+        except (requests.RequestException, json.JSONDecodeError) as e:
+            self.logger.error("Failed to parse JSON response: %s", e)
             return None
 
-    def check_all_courts(self, courts_config):
-        """Check availability for all courts"""
-        results = {}
+    def _check_availability_cached(self, facility_id, availability_cache):
+        """Check availability but skip decoding when the body matches the cached fingerprint
 
-        for court in courts_config['courts']:
-            court_num = court['court']
-            facility_id = court['facilityId']
+        The fingerprint covers self.watch as well as the body: a cached result was
+        parsed with the watch of its day, so a changed spec or horizon is a miss.
 
-            self.logger.info(f"Checking Court {court_num} (ID: {facility_id})")
-            availability = self.check_availability(facility_id)
+        Returns:
+            Tuple of (raw response body, fingerprint, cached value); the body is None on a cache hit
+        """
+        response = self._post_availability(facility_id)
+        if response is None:
+            return None, None, None
+
+        body = response.content
+        fingerprint = AvailabilityCache.fingerprint(body)
+        if self.watch is not None:
+            fingerprint = (fingerprint, self.watch.key)
+        cached = availability_cache.get(facility_id, fingerprint)
+        if cached is not None:
+            self.logger.info("Availability for facility %s unchanged, reusing cached result", facility_id,
+                             extra={'facility_id': facility_id, 'bytes': len(body), 'cached': True})
+            return None, fingerprint, cached
+
+        # Hand back the raw body; parse_availability_data decodes only the fields it needs
+        if not body.lstrip().startswith(b'{'):
+            self.logger.error("Unexpected availability response for facility %s", facility_id)
+            return None, fingerprint, None
+        self.logger.info("Got availability data for facility %s", facility_id,
+                         extra={'facility_id': facility_id, 'bytes': len(body), 'cached': False})
+        return body, fingerprint, None
+
+    def check_all_courts(self, courts_config, max_concurrency=1, availability_cache=None):
+        """Check availability for all courts
 
-            if availability:
-                results[court_num] = {
-                    'facility_id': facility_id,
-                    'availability': availability
-                }
-            else:
-                results[court_num] = {
-                    'facility_id': facility_id,
-                    'availability': None,
-                    'error': 'Failed to get availability data'
-                }
+        Args:
+            courts_config: Court configuration with a 'courts' list
+            max_concurrency: Maximum number of facilities fetched in parallel (1 = sequential)
+            availability_cache: Optional AvailabilityCache; 'availability' then holds the raw
+                response body for parse_availability_data, and unchanged responses carry the
+                cached value under 'cached' instead
+        """
+        courts = courts_config['courts']
+        check_court = partial(self._check_court, availability_cache=availability_cache)
+
+        if max_concurrency <= 1 or len(courts) <= 1:
+            return dict(check_court(court) for court in courts)
+
+        # Fetch the token once up front so all workers share it instead of racing to scrape it
+        self._ensure_token(courts[0]['facilityId'])
+
+        workers = min(max_concurrency, len(courts))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return dict(executor.map(check_court, courts))
 
-        return results
+    def _check_court(self, court, availability_cache=None):
+        """Check a single court entry and return (court_num, result) with its elapsed time"""
+        court_num = court['court']
+        facility_id = court['facilityId']
+
+        self.logger.info("Checking Court %s (ID: %s)", court_num, facility_id)
+        started = time.perf_counter()
+        if availability_cache is None:
+            availability, fingerprint, cached = self.check_availability(facility_id), None, None
+        else:
+            availability, fingerprint, cached = self._check_availability_cached(facility_id, availability_cache)
+        elapsed = time.perf_counter() - started
+        self.logger.info("Court %s took %.3fs", court_num, elapsed,
+                         extra={'court': court_num, 'facility_id': facility_id, 'elapsed': elapsed})
+
+        if cached is not None:
+            result = {
+                'facility_id': facility_id,
+                'availability': None,
+                'cached': cached
+            }
+        elif availability:
+            result = {
+                'facility_id': facility_id,
+                'availability': availability
+            }
+        else:
+            result = {
+                'facility_id': facility_id,
+                'availability': None,
+                'error': 'Failed to get availability data'
+            }
+        result['elapsed'] = elapsed
+        if fingerprint:
+            result['fingerprint'] = fingerprint
+
+        return court_num, result
 
     def _get_current_datetime(self):
         """Get current datetime in the required format using Toronto time"""
-        toronto_tz = pytz.timezone('America/Toronto')
-        toronto_now = datetime.now(toronto_tz)
-        return toronto_now.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+        return toronto_now().strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
 
     def _format_date_for_api(self, date_str):
         """Format a specific date string to API format (start of day)"""
         try:
-            from datetime import datetime
             input_date = datetime.strptime(date_str, '%Y-%m-%d')
             formatted_date = input_date.replace(hour=0, minute=0, second=0, microsecond=0)
             return formatted_date.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
@@ -194,76 +513,111 @@ class PerfectMindSession:
             return self._get_current_datetime()
 
     def get_complete_availability(self, facility_id, duration=60):
-        """Get complete availability by making two API calls to cover 8 days total"""
-        all_slots = []
+        """Get complete availability for the next 8 days (one full window plus the 8th day)"""
+        return self.get_horizon_availability([facility_id], 8, durations=[duration]).get(facility_id, [])
+
+    def get_horizon_availability(self, facility_ids, horizon_days, durations=(60,), max_concurrency=1):
+        """Get availability for several facilities over a date horizon with the fewest requests
+
+        Args:
+            facility_ids: Facility IDs to check
+            horizon_days: Number of days to cover, starting today (Toronto time)
+            durations: Booking durations in minutes
+            max_concurrency: Maximum number of requests in flight (1 = sequential)
+
+        Returns:
+            Dict of facility_id to parsed slots, deduplicated across window boundaries
+        """
+        start_date = toronto_now().date()
+        windows = plan_requests(facility_ids, horizon_days, durations, start_date=start_date)
+        window_slots = self._run_windows(windows, max_concurrency)
+        return merge_window_slots(window_slots, start_date=start_date, horizon_days=horizon_days)
 
-        # First call: current datetime (gets next 6-7 days)
-        availability_1 = self.check_availability(facility_id, duration=duration)
-        if availability_1:
-            slots_1 = self.parse_availability_data(availability_1)
-            all_slots.extend(slots_1)
+    def get_duration_index(self, facility_ids, durations=(60, 90, 120), horizon_days=7, max_concurrency=1):
+        """Build an index of which durations can be booked at each (facility, date, start)
 
-        # Second call: 7 days from now (gets 8th day)
-        from datetime import datetime, timedelta
-        toronto_tz = pytz.timezone('America/Toronto')
-        future_date = datetime.now(toronto_tz) + timedelta(days=7)
-        future_date_str = future_date.strftime('%Y-%m-%d')
+        Every request already sends all durationIds[]. Once a response is seen that
+        carries spots of more than the requested duration, the server is known to
+        return every duration at once and indexes cost one request per window
+        instead of one per window and duration. The first index learns this from a
+        single probe request before planning the rest, so it is cheap as well.
 
-        availability_2 = self.check_availability(facility_id, date=future_date_str, duration=duration)
-        if availability_2:
-            slots_2 = self.parse_availability_data(availability_2)
-            all_slots.extend(slots_2)
+        Args:
+            facility_ids: Facility IDs to check
+            durations: Booking durations in minutes to index
+            horizon_days: Number of days to cover, starting today (Toronto time)
+            max_concurrency: Maximum number of requests in flight (1 = sequential)
 
-        return all_slots
+        Returns:
+            DurationIndex limited to the requested durations
+        """
+        durations = list(dict.fromkeys(durations))
+        start_date = toronto_now().date()
+
+        probed = []
+        if not self.server_returns_all_durations and not self._durations_probed and len(durations) > 1:
+            probe = plan_requests(facility_ids, horizon_days, durations[:1], start_date=start_date)[:1]
+            probed = self._run_windows(probe)
+            # A probe without any spots shows nothing, so the next index probes again
+            self._durations_probed = any(slots for _, slots in probed)
+
+        request_durations = durations[:1] if self.server_returns_all_durations else durations
+        windows = plan_requests(facility_ids, horizon_days, request_durations, start_date=start_date)
+        done = {window for window, _ in probed}
+        window_slots = probed + self._run_windows([w for w in windows if w not in done], max_concurrency)
+        merged = merge_window_slots(window_slots, start_date=start_date, horizon_days=horizon_days)
+
+        index = DurationIndex(durations)
+        for facility_id, slots in merged.items():
+            index.add_slots(facility_id, slots)
+        return index
+
+    def _run_windows(self, windows, max_concurrency=1):
+        """Run planned requests, returning (window, parsed slots) pairs in plan order"""
+        self.logger.info("Running %s planned request(s)", len(windows))
+
+        if max_concurrency <= 1 or len(windows) <= 1:
+            return [self._check_window(window) for window in windows]
+
+        self._ensure_token(windows[0].facility_id)
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(windows))) as executor:
+            return list(executor.map(self._check_window, windows))
+
+    def _check_window(self, window):
+        """Run one planned request and return (window, parsed slots)"""
+        # A window starting today asks from the current time, as a single request always has,
+        # rather than from midnight, so slots that have already started are not returned
+        date = None if window.date == toronto_now().date().isoformat() else window.date
+        availability = self.check_availability(window.facility_id, date=date,
+                                               days_count=window.days_count, duration=window.duration)
+        slots = self.parse_availability_data(availability)
+
+        requested = duration_label(window.duration)
+        if not self.server_returns_all_durations and any(slot['duration'] != requested for slot in slots):
+            self.logger.info("Server returns all durations in one response, using one request per window")
+            self.server_returns_all_durations = True
+
+        return window, slots
 
     def display_availability_table(self, slots):
-        """Display availability in table format with dates as columns"""
+        """Display availability in table format with dates as columns
+
+        Args:
+            slots: Slot dicts or SlotTable rows; slots carrying a 'court' key are
+                shown together, with each cell listing the available courts
+        """
         if not slots:
             self.logger.info("No availability data to display")
             return
 
-        # Group slots by date
-        slots_by_date = {}
-        for slot in slots:
-            date = slot['date']
-            if date not in slots_by_date:
-                slots_by_date[date] = []
-            slots_by_date[date].append(slot)
-
-        # Get sorted dates
-        dates = sorted(slots_by_date.keys())
-
-        # Build table
-        table_lines = []
-        table_lines.append("\nCourt Availability Table")
-        table_lines.append("=" * (12 + len(dates) * 12))
-
-        # Date headers
-        header = "Time        "
-        for date in dates:
-            header += f"{date[-5:]:>11} "  # Show MM-DD only
-        table_lines.append(header)
-        table_lines.append("-" * len(header))
-
-        # Get all unique times
-        all_times = set()
-        for date_slots in slots_by_date.values():
-            for slot in date_slots:
-                all_times.add(slot['time'])
-
-        # Availability for each time slot
-        for time in sorted(all_times):
-            row = f"{time:>11} "
-            for date in dates:
-                # Check if this time is available on this date
-                available = any(slot['time'] == time for slot in slots_by_date.get(date, []))
-                row += "     ✓     " if available else "     -     "
-            table_lines.append(row)
-
-        table_lines.append("\n✓ = Available, - = Not Available")
-
-        # Log the entire table
-        self.logger.info("\n".join(table_lines))
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+
+        if isinstance(slots, SlotTable):
+            grid = AvailabilityGrid.from_table(slots)
+        else:
+            grid = AvailabilityGrid.from_slots(slots)
+        self.logger.info("%s", grid.render_table())
 
     def check_and_display_availability(self, facility_id, duration=60):
         """Check availability and display in table format"""
@@ -275,63 +629,36 @@ class PerfectMindSession:
         return []
 
     def parse_availability_data(self, availability_data):
-        """Parse the availability data to extract available time slots"""
+        """Parse the availability data to extract available time slots
+
+        Args:
+            availability_data: Decoded response JSON, or the raw response body, which is
+                scanned for the fields we use without building the full nested dicts
+
+        Spots outside self.watch, when set, are skipped before any slot is built.
+        """
         if not availability_data:
             return []
 
+        try:
+            with self.metrics.phase('decode'):
+                spots = decode_spots(availability_data, self.watch)
+        except ValueError as e:
+            self.logger.error("Failed to parse JSON response: %s", e)
+            return []
+
         available_slots = []
 
-        # Parse the actual response structure
-        if isinstance(availability_data, dict) and 'availabilities' in availability_data:
-            days = availability_data['availabilities']
-
-            for day in days:
-                if isinstance(day, dict) and 'BookingGroups' in day:
-                    # Extract date from /Date(timestamp)/ format using Toronto timezone
-                    # Note: API returns UTC timestamp but browser displays date that is one day ahead
-                    # So we need to add one day to match browser behavior
-                    date_str = day.get('Date', '')
-                    if date_str.startswith('/Date(') and date_str.endswith(')/'):
-                        timestamp = int(date_str[6:-2])  # Extract timestamp
-                        from datetime import datetime, timedelta
-                        # Convert UTC timestamp to Toronto time
-                        utc_date = datetime.fromtimestamp(timestamp / 1000, tz=pytz.UTC)
-                        toronto_tz = pytz.timezone('America/Toronto')
-                        toronto_date = utc_date.astimezone(toronto_tz)
-                        # Add one day to match browser display (API timestamp represents previous day)
-                        toronto_date = toronto_date + timedelta(days=1)
-                        date_formatted = toronto_date.strftime('%Y-%m-%d')
-                    else:
-                        date_formatted = 'Unknown'
-
-                    # Process each booking group (Morning, Afternoon, Late)
-                    for group in day['BookingGroups']:
-                        group_name = group.get('Name', 'Unknown')
-
-                        # Process each available spot in the group
-                        for spot in group.get('AvailableSpots', []):
-                            time_info = spot.get('Time', {})
-                            duration_info = spot.get('Duration', {})
-
-                            # Format time
-                            hours = time_info.get('Hours', 0)
-                            minutes = time_info.get('Minutes', 0)
-                            time_formatted = f"{hours:02d}:{minutes:02d}"
-
-                            # Format duration
-                            duration_hours = duration_info.get('Hours', 0)
-                            duration_minutes = duration_info.get('Minutes', 0)
-                            duration_formatted = f"{duration_hours * 60 + duration_minutes}min"
-
-                            available_slots.append({
-                                'date': date_formatted,
-                                'time': time_formatted,
-                                'duration': duration_formatted,
-                                'group': group_name,
-                                'title': spot.get('Title', 'Book Now!'),
-                                'ticks': spot.get('Ticks'),
-                                'is_disabled': spot.get('IsDisabled', False)
-                            })
+        for spot in spots:
+            available_slots.append({
+                'date': api_date_to_str(spot.date_ms),
+                'time': format_time(spot.hours, spot.minutes),
+                'duration': duration_label(spot.duration_minutes),
+                'group': spot.group,
+                'title': spot.title,
+                'ticks': spot.ticks,
+                'is_disabled': spot.is_disabled
+            })
 
         return available_slots
 
@@ -359,17 +686,17 @@ def main():
     logger.info("\nAvailability Results:")
     for court_num, data in results.items():
         if data['availability']:
-            logger.info(f"Court {court_num}: Data received")
+            logger.info("Court %s: Data received", court_num)
             # Parse and display available slots
             slots = session.parse_availability_data(data['availability'])
             if slots:
-                logger.info(f"  Available slots: {len(slots)}")
+                logger.info("  Available slots: %s", len(slots))
                 for slot in slots[:3]:  # Show first 3 slots
-                    logger.info(f"    - {slot.get('date')} {slot.get('time')}")
+                    logger.info("    - %s %s", slot.get('date'), slot.get('time'))
             else:
                 logger.info("  No available slots found")
         else:
-            logger.error(f"Court {court_num}: {data.get('error', 'Unknown error')}")
+            logger.error("Court %s: %s", court_num, data.get('error', 'Unknown error'))
 
 
 if __name__ == "__main__":
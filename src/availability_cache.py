@@ -0,0 +1,74 @@
+"""
+Availability Cache
+Fingerprints raw FacilityAvailability bodies so unchanged payloads skip parsing
+"""
+
+import hashlib
+import threading
+from typing import Any, Optional
+
+
+class AvailabilityCache:
+    """Per-facility cache of the last response fingerprint and the result derived from it"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.cycle_changed = False
+
+    @staticmethod
+    def fingerprint(body: bytes) -> str:
+        """Return a short digest of a raw response body"""
+        return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+    def begin_cycle(self):
+        """Reset the per-cycle change flag before polling all facilities"""
+        self.cycle_changed = False
+
+    @property
+    def cycle_unchanged(self) -> bool:
+        """True if every facility checked this cycle returned its previous payload"""
+        return not self.cycle_changed
+
+    def get(self, facility_id: str, fingerprint: str) -> Optional[Any]:
+        """
+        Look up the cached result for a facility
+
+        Args:
+            facility_id: Facility the response belongs to
+            fingerprint: Fingerprint of the new response body
+
+        Returns:
+            The cached result if the body is unchanged, None otherwise
+        """
+        with self._lock:
+            entry = self._entries.get(facility_id)
+            if entry and entry[0] == fingerprint:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            self.cycle_changed = True
+            return None
+
+    def put(self, facility_id: str, fingerprint: str, value: Any):
+        """Store the result derived from a response body"""
+        with self._lock:
+            self._entries[facility_id] = (fingerprint, value)
+
+    def mark_changed(self, facility_id: Optional[str] = None):
+        """Flag the cycle as changed, e.g. when a facility failed; drops its entry if given"""
+        with self._lock:
+            self.cycle_changed = True
+            if facility_id is not None:
+                self._entries.pop(facility_id, None)
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the hit rate"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
@@ -0,0 +1,154 @@
+"""
+Availability Decoder
+Decodes only the fields we use from a FacilityAvailability response into typed records
+"""
+
+import json
+import re
+from typing import List, NamedTuple, Optional, Union
+
+
+class Spot(NamedTuple):
+    """One available spot with just the fields the checker reads"""
+    date_ms: Optional[int]  # Epoch milliseconds from the day's /Date(ms)/ value
+    group: str
+    hours: int
+    minutes: int
+    duration_minutes: int
+    ticks: Optional[int]
+    title: str
+    is_disabled: bool
+
+
+_STRING = rb'"((?:[^"\\]|\\.)*)"'
+_TIME_SPAN = rb'\{\s*"Hours"\s*:\s*(\d+)\s*,\s*"Minutes"\s*:\s*(\d+)[^}]*\}'
+
+# One pass over the body picks up, in document order, each day's date, each booking
+# group's name and every spot. Spot keys come out of the server serializer in a fixed order.
+# The shared leading quote is factored out so the engine can skip ahead between keys.
+TOKEN_PATTERN = re.compile(
+    rb'"(?:Date"\s*:\s*"\\?/Date\((-?\d+)[^)]*\)\\?/"'
+    rb'|Name"\s*:\s*' + _STRING +
+    rb'|Ticks"\s*:\s*(\d+)\s*,\s*"Time"\s*:\s*' + _TIME_SPAN +
+    rb'\s*,\s*"Duration"\s*:\s*' + _TIME_SPAN +
+    rb'[^{}]*?"IsDisabled"\s*:\s*(true|false)\s*,\s*"Title"\s*:\s*' + _STRING + rb')'
+)
+SPOT_MARKER = b'"IsDisabled"'
+
+
+def _decode_string(raw: bytes) -> str:
+    if b'\\' in raw:
+        return json.loads(b'"' + raw + b'"')
+    return raw.decode('utf-8')
+
+
+def _spots_from_bytes(body: bytes, keep=None) -> Optional[List[Spot]]:
+    spots = []
+    seen = 0
+    date_ms = None
+    day_wanted = True
+    group = 'Unknown'
+    for match in TOKEN_PATTERN.finditer(body):
+        date, name, ticks, hours, minutes, dur_hours, dur_minutes, disabled, title = match.groups()
+        if date is not None:
+            date_ms = int(date)
+            day_wanted = keep is None or keep.wants_api_date(date_ms)
+        elif name is not None:
+            group = _decode_string(name)
+        else:
+            seen += 1
+            if not day_wanted:
+                continue
+            hours, minutes = int(hours), int(minutes)
+            duration = int(dur_hours) * 60 + int(dur_minutes)
+            if keep is not None and not keep.wants_time(hours * 60 + minutes, duration):
+                continue
+            spots.append(Spot(
+                date_ms,
+                group,
+                hours,
+                minutes,
+                duration,
+                int(ticks),
+                _decode_string(title),
+                disabled == b'true'
+            ))
+
+    # Every spot carries exactly one IsDisabled key; a mismatch means the layout changed
+    if seen != body.count(SPOT_MARKER):
+        return None
+    return spots
+
+
+def spots_from_json(availability_data: dict, keep=None) -> List[Spot]:
+    """
+    Walk an already decoded response and extract typed spots
+
+    Args:
+        availability_data: Decoded FacilityAvailability JSON
+        keep: Optional SlotFilter; days and spots it rejects are skipped
+
+    Returns:
+        List of Spot records
+    """
+    spots = []
+    if not isinstance(availability_data, dict):
+        return spots
+
+    for day in availability_data.get('availabilities') or []:
+        if not isinstance(day, dict) or 'BookingGroups' not in day:
+            continue
+
+        date_str = day.get('Date', '')
+        date_ms = None
+        if date_str.startswith('/Date(') and date_str.endswith(')/'):
+            date_ms = int(date_str[6:-2])
+        if keep is not None and not keep.wants_api_date(date_ms):
+            continue
+
+        for group in day['BookingGroups']:
+            group_name = group.get('Name', 'Unknown')
+            for spot in group.get('AvailableSpots', []):
+                time_info = spot.get('Time', {})
+                duration_info = spot.get('Duration', {})
+                hours, minutes = time_info.get('Hours', 0), time_info.get('Minutes', 0)
+                duration = duration_info.get('Hours', 0) * 60 + duration_info.get('Minutes', 0)
+                if keep is not None and not keep.wants_time(hours * 60 + minutes, duration):
+                    continue
+                spots.append(Spot(
+                    date_ms,
+                    group_name,
+                    hours,
+                    minutes,
+                    duration,
+                    spot.get('Ticks'),
+                    spot.get('Title', 'Book Now!'),
+                    spot.get('IsDisabled', False)
+                ))
+    return spots
+
+
+def decode_spots(body: Union[bytes, dict], keep=None) -> List[Spot]:
+    """
+    Decode a FacilityAvailability response into typed spots
+
+    Raw bodies are scanned directly without building the nested dicts; if the
+    scan does not account for every spot, the body is decoded with json instead.
+
+    Args:
+        body: Raw response body, or an already decoded response
+        keep: Optional SlotFilter (see watch_spec); spots it rejects are never built
+
+    Returns:
+        List of Spot records
+
+    Raises:
+        ValueError: If a raw body is not valid JSON and cannot be scanned
+    """
+    if not isinstance(body, (bytes, bytearray)):
+        return spots_from_json(body, keep)
+
+    spots = _spots_from_bytes(body, keep)
+    if spots is None:
+        spots = spots_from_json(json.loads(body), keep)
+    return spots
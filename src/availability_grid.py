@@ -0,0 +1,151 @@
+"""
+Availability Grid
+Per-date bitmaps of available start times, used to render tables, compact text and JSON
+"""
+
+import json
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .time_conversion import format_minute, minute_of_day, weekday_abbr
+
+CELL_WIDTH = 11
+
+
+def _bits(bitmap: int) -> List[int]:
+    """Positions of the set bits, lowest first"""
+    positions = []
+    while bitmap:
+        low = bitmap & -bitmap
+        positions.append(low.bit_length() - 1)
+        bitmap ^= low
+    return positions
+
+
+def _court_key(court) -> Tuple:
+    """Natural sort key, so int and str labels mix and 'North 10' follows 'North 9'"""
+    return tuple((0, int(part)) if part.isdigit() else (1, part) for part in re.split(r'(\d+)', str(court)) if part)
+
+
+class AvailabilityGrid:
+    """Availability index: one bitmap over minutes of the day per (date, court)"""
+
+    def __init__(self):
+        self._bitmaps: Dict[Tuple[str, object], int] = {}
+        self._by_date: Dict[str, int] = {}
+
+    def add(self, date: str, start: int, court=None):
+        """Mark a start time (minutes after midnight) available on a date, optionally for a court"""
+        bit = 1 << start
+        key = (date, court)
+        self._bitmaps[key] = self._bitmaps.get(key, 0) | bit
+        self._by_date[date] = self._by_date.get(date, 0) | bit
+
+    @classmethod
+    def from_slots(cls, slots: Iterable, court=None) -> 'AvailabilityGrid':
+        """
+        Build a grid from slot dicts or SlotTable rows
+
+        Args:
+            slots: Items with 'date' and 'time' keys and optionally 'court'
+            court: Court to use for slots without a 'court' key
+        """
+        grid = cls()
+        for slot in slots:
+            slot_court = slot.get('court', court) if hasattr(slot, 'get') else court
+            grid.add(slot['date'], minute_of_day(slot['time']), slot_court)
+        return grid
+
+    @classmethod
+    def from_table(cls, table) -> 'AvailabilityGrid':
+        """Build a grid straight from SlotTable columns"""
+        grid = cls()
+        for date, start, court in zip(table.dates, table.starts, table.courts):
+            grid.add(date, start, court)
+        return grid
+
+    def __len__(self):
+        return len(self._by_date)
+
+    def dates(self) -> List[str]:
+        return sorted(self._by_date)
+
+    def courts(self) -> List:
+        return sorted({court for _, court in self._bitmaps if court is not None}, key=_court_key)
+
+    def times(self) -> List[int]:
+        """Every start time available on any date, as sorted minutes after midnight"""
+        combined = 0
+        for bitmap in self._by_date.values():
+            combined |= bitmap
+        return _bits(combined)
+
+    def is_available(self, date: str, start: int, court=None) -> bool:
+        """Check a start time on a date, for one court or any court"""
+        bitmap = self._by_date.get(date, 0) if court is None else self._bitmaps.get((date, court), 0)
+        return bool(bitmap >> start & 1)
+
+    def courts_at(self, date: str, start: int, courts: Optional[List] = None) -> List:
+        """Courts available at a start time on a date; pass courts() when asking for many cells"""
+        courts = self.courts() if courts is None else courts
+        return [court for court in courts if self._bitmaps.get((date, court), 0) >> start & 1]
+
+    def _cell(self, date: str, start: int, courts: List) -> str:
+        if not self._by_date.get(date, 0) >> start & 1:
+            return '-'
+        if not courts:
+            return '✓'
+        available = [str(court) for court in self.courts_at(date, start, courts)]
+        label = ','.join(available)
+        return label if len(label) <= CELL_WIDTH - 2 else f"{len(available)} courts"
+
+    def render_table(self, title: str = "Court Availability Table") -> str:
+        """Render times as rows and dates as columns; cells list the available courts"""
+        dates = self.dates()
+        courts = self.courts()
+        lines = [f"\n{title}", "=" * (12 + len(dates) * 12)]
+
+        header = "Time        " + "".join(f"{date[-5:]:>11} " for date in dates)  # Show MM-DD only
+        lines.append(header)
+        lines.append("-" * len(header))
+
+        for start in self.times():
+            cells = "".join(f"{self._cell(date, start, courts):^{CELL_WIDTH}} " for date in dates)
+            lines.append(f"{format_minute(start):>11} {cells}")
+
+        if courts:
+            lines.append("\nCourt numbers = Available, - = Not Available")
+        else:
+            lines.append("\n✓ = Available, - = Not Available")
+        return "\n".join(lines)
+
+    def render_compact(self) -> str:
+        """Render one line per date, e.g. '2025-10-15 Wed: 08:30[1,2] 09:30[3]'"""
+        courts = self.courts()
+        lines = []
+        for date in self.dates():
+            entries = []
+            for start in _bits(self._by_date[date]):
+                if courts:
+                    at = ','.join(str(court) for court in self.courts_at(date, start, courts))
+                    entries.append(f"{format_minute(start)}[{at}]")
+                else:
+                    entries.append(format_minute(start))
+            weekday = weekday_abbr(date)
+            prefix = f"{date} {weekday}" if weekday else date
+            lines.append(f"{prefix}: {' '.join(entries)}")
+        return "\n".join(lines)
+
+    def to_dict(self) -> Dict[str, Dict[str, Optional[List]]]:
+        """Nested {date: {'HH:MM': [courts] or None}} form"""
+        courts = self.courts()
+        result = {}
+        for date in self.dates():
+            result[date] = {
+                format_minute(start): self.courts_at(date, start, courts) if courts else None
+                for start in _bits(self._by_date[date])
+            }
+        return result
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False)
@@ -0,0 +1,198 @@
+"""
+Burst Poller
+Polls only the newly released date at sub-second intervals around a known booking release time
+"""
+
+import contextlib
+import logging
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from datetime import time as time_of_day
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from .slot_table import SlotTable
+
+# Bookings open a week ahead, so the day released is a week from today; that is
+# one day past the regular poll's window (today and the six days after it)
+DEFAULT_DAYS_AHEAD = 7
+
+
+def parse_release_times(value: str) -> List[time_of_day]:
+    """Parse a comma-separated list of HH:MM[:SS] local times"""
+    times = []
+    for part in value.split(','):
+        part = part.strip()
+        if part:
+            times.append(time_of_day.fromisoformat(part))
+    return sorted(times)
+
+
+class BurstPoller:
+    """Pre-warms sessions before a release and polls the released date until the window closes"""
+
+    def __init__(self, release_times: Sequence[time_of_day], window: float = 120, lead: float = 30,
+                 interval: float = 0.5, days_ahead: int = DEFAULT_DAYS_AHEAD, duration: int = 60,
+                 courts: Optional[Sequence[str]] = None, logger: Optional[logging.Logger] = None,
+                 clock: Callable[[], datetime] = datetime.now, sleep: Callable[[float], None] = time.sleep):
+        """
+        Initialize the poller
+
+        Args:
+            release_times: Local times at which a new booking day opens
+            window: Seconds after the release to keep bursting
+            lead: Seconds before the release to warm sessions and tokens
+            interval: Seconds between burst rounds
+            days_ahead: Days from today of the date that opens at a release
+            duration: Booking duration in minutes to query
+            courts: Court labels to burst; None means every court
+            logger: Optional logger instance
+            clock: Returns the current local time
+            sleep: Sleeps for a number of seconds
+        """
+        self.release_times = sorted(release_times)
+        self.window = window
+        self.lead = lead
+        self.interval = interval
+        self.days_ahead = days_ahead
+        self.duration = duration
+        self.courts = {str(court) for court in courts} if courts else None
+        self.logger = logger or logging.getLogger(__name__)
+        self.clock = clock
+        self.sleep = sleep
+
+    @classmethod
+    def from_env(cls, logger: Optional[logging.Logger] = None) -> Optional['BurstPoller']:
+        """
+        Build from BURST_RELEASE_TIMES and the other BURST_* settings
+
+        Returns:
+            BurstPoller, or None when BURST_RELEASE_TIMES is not set
+        """
+        release_str = os.getenv('BURST_RELEASE_TIMES')
+        if not release_str:
+            return None
+        settings = {
+            'window': ('BURST_WINDOW_SECONDS', float),
+            'lead': ('BURST_LEAD_SECONDS', float),
+            'interval': ('BURST_INTERVAL_SECONDS', float),
+            'days_ahead': ('BURST_DAYS_AHEAD', int),
+        }
+        kwargs = {}
+        for name, (env, convert) in settings.items():
+            value = os.getenv(env)
+            if value:
+                kwargs[name] = convert(value)
+        courts_str = os.getenv('BURST_COURTS')
+        if courts_str:
+            kwargs['courts'] = [court.strip() for court in courts_str.split(',') if court.strip()]
+        return cls(parse_release_times(release_str), logger=logger, **kwargs)
+
+    def next_release(self, now: datetime) -> Optional[datetime]:
+        """The release whose burst window has not closed yet, soonest first"""
+        for days in (0, 1):
+            day = (now + timedelta(days=days)).date()
+            for release_time in self.release_times:
+                release = datetime.combine(day, release_time)
+                if release + timedelta(seconds=self.window) > now:
+                    return release
+        return None
+
+    def wake_time(self, now: datetime) -> Optional[datetime]:
+        """When the main loop has to hand over for the next burst"""
+        release = self.next_release(now)
+        return release - timedelta(seconds=self.lead) if release else None
+
+    def due(self, now: datetime) -> Optional[datetime]:
+        """The release to burst for now, if now is inside its lead time or window"""
+        release = self.next_release(now)
+        if release is not None and release - timedelta(seconds=self.lead) <= now:
+            return release
+        return None
+
+    def wants(self, court) -> bool:
+        return self.courts is None or str(court['court']) in self.courts
+
+    def _fetch(self, target: Tuple[object, dict], release_date: str) -> SlotTable:
+        session, court = target
+        table = SlotTable()
+        data = session.check_availability(court['facilityId'], date=release_date, days_count=1, duration=self.duration)
+        if data:
+            slots = session.parse_availability_data(data)
+            table.extend_slots([slot for slot in slots if slot.get('date') == release_date], court['court'])
+        return table
+
+    def run(self, release: datetime, targets: Sequence[Tuple[object, dict]],
+            on_new: Callable[[SlotTable], None]) -> SlotTable:
+        """
+        Burst for one release
+
+        Warms every target's session so the first round goes out at the release
+        time, then polls the released date for every target each interval until
+        the window closes, passing slots not seen before to on_new as they appear.
+        Each host's upstream rate limit is raised to one round per interval for
+        the burst, so the sustained limit does not stretch the rounds.
+
+        Args:
+            release: Release time from due()
+            targets: (PerfectMindSession, court entry) pairs
+            on_new: Called with a table of newly found slots after each round that found any
+
+        Returns:
+            Every slot found on the released date
+        """
+        targets = [(session, court) for session, court in targets if self.wants(court)]
+        closes = release + timedelta(seconds=self.window)
+        if not targets:
+            return SlotTable()
+        release_date = (release.date() + timedelta(days=self.days_ahead)).isoformat()
+        self.logger.info("Burst for %s release of %s on %d court(s)", release.strftime('%H:%M:%S'),
+                         release_date, len(targets))
+
+        per_upstream = Counter(session.upstream for session, _ in targets
+                               if getattr(session, 'upstream', None) is not None)
+        with contextlib.ExitStack() as stack:
+            for upstream, count in per_upstream.items():
+                stack.enter_context(upstream.raised_rate(count / self.interval, count))
+            return self._burst(release, release_date, closes, targets, on_new)
+
+    def _burst(self, release: datetime, release_date: str, closes: datetime,
+               targets: Sequence[Tuple[object, dict]], on_new: Callable[[SlotTable], None]) -> SlotTable:
+        # A token that outlives the whole window, and a warm connection per host; the
+        # pre-release answer is the baseline so only slots that open count as new
+        valid_for = max(0.0, (closes - self.clock()).total_seconds())
+        first_court = {}
+        for session, court in targets:
+            first_court.setdefault(id(session), (session, court))
+        for session, court in first_court.values():
+            if not session.warm(court['facilityId'], valid_for=valid_for):
+                self.logger.warning("Burst pre-warm could not get a verification token for court %s", court['court'])
+
+        with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+            seen = SlotTable.concat(executor.map(lambda target: self._fetch(target, release_date), targets)).keys()
+            found = SlotTable()
+            rounds = 0
+
+            wait = (release - self.clock()).total_seconds()
+            if wait > 0:
+                self.sleep(wait)
+
+            while self.clock() < closes:
+                started = self.clock()
+                current = SlotTable.concat(executor.map(lambda target: self._fetch(target, release_date), targets))
+                rounds += 1
+                new = current.filter(lambda row: row.key() not in seen)
+                if new:
+                    self.logger.info("Burst round %d found %d new slot(s) at T+%.1fs", rounds, len(new),
+                                     (started - release).total_seconds())
+                    seen |= new.keys()
+                    found.extend(new)
+                    on_new(new.sorted())
+                remaining = self.interval - (self.clock() - started).total_seconds()
+                if remaining > 0:
+                    self.sleep(remaining)
+
+        self.logger.info("Burst for %s done after %d round(s), %d new slot(s)", release_date, rounds, len(found))
+        return found.sorted()
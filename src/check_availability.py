@@ -4,15 +4,36 @@ Court Availability Checker
 Checks availability for all 4 tennis courts at Angus Glen Tennis Centre
 """
 
+import asyncio
 import json
 import os
 import random
+import signal
 import sys
-import time
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
 from .PerfectMindSession import PerfectMindSession
+from .availability_cache import AvailabilityCache
+from .burst_poller import BurstPoller
+from .instrumentation import CycleMetrics, Instrumentation
+from .payload_capture import PayloadCapture
+from .pipeline import Pipeline, PipelineStalled, Stage
+from .poll_scheduler import PollScheduler
+from .slot_event_log import SlotEventLog
+from .slot_state import SlotStateStore
+from .slot_table import SlotTable
 from .sms_notifier import SMSNotifier
+from .structured_logging import use_json_logging
+from .subscriptions import Subscription, SubscriptionRegistry
+from .token_cache import TokenCache
+from .transport import make_transport, timeouts_from_env
+from .time_conversion import toronto_now
+from .upstream_controller import UpstreamController, backoff_delay
+from .venue_config import group_by_host, load_venues
+from .watch_spec import SlotFilter, WatchSpec
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -23,6 +44,75 @@ logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
+if os.getenv('LOG_FORMAT') == 'json':
+    use_json_logging()
+
+# Fingerprints of the last availability response per facility, kept across poll cycles
+availability_cache = AvailabilityCache()
+
+# Per-phase timings and counts for each cycle (METRICS_EXPORTERS enables it)
+metrics = Instrumentation.from_env(logger=logging.getLogger(__name__))
+
+# Sampled raw response capture (PAYLOAD_CAPTURE_DIR enables it)
+payload_capture = PayloadCapture.from_env(logger=logging.getLogger(__name__))
+
+# Rate limit, concurrency limit and circuit breaker per PerfectMind host, kept across poll cycles
+upstreams = {}
+_upstreams_lock = threading.Lock()
+
+
+def get_upstream(host: str) -> UpstreamController:
+    """Return the upstream controller for a host, creating it on first use"""
+    with _upstreams_lock:
+        if host not in upstreams:
+            upstreams[host] = UpstreamController.from_env(logger=logging.getLogger(__name__))
+        return upstreams[host]
+
+
+# Facility ID of every court seen so far, for the slot event log
+court_facilities = {}
+
+# One long-lived PerfectMindSession per host, reused across poll cycles: (venues, session)
+host_sessions = {}
+_host_sessions_lock = threading.Lock()
+
+
+def get_host_session(host: str, venues: list, separate_token_cache: bool = False) -> PerfectMindSession:
+    """
+    Return the session for a host, creating it on first use or when its venues change
+
+    Keeping the session alive keeps its connection pool, cookies, token and
+    per-facility request templates warm between cycles.
+    """
+    key = tuple(venues)
+    with _host_sessions_lock:
+        entry = host_sessions.get(host)
+        if entry is not None and entry[0] == key:
+            return entry[1]
+
+        logger = logging.getLogger(__name__)
+        session = PerfectMindSession(
+            logger=logger,
+            token_cache=TokenCache.from_env(logger=logger, host=host if separate_token_cache else None),
+            upstream=get_upstream(host),
+            base_url=os.getenv('PERFECTMIND_BASE_URL') or None,
+            venue=venues[0],
+            metrics=metrics,
+            capture=payload_capture,
+            transport=make_transport(os.getenv('PERFECTMIND_TRANSPORT'), timeout=timeouts_from_env(), logger=logger)
+        )
+        for venue in venues:
+            session.register_venue(venue)
+        host_sessions[host] = (key, session)
+        return session
+
+
+def drop_host_session(host: str):
+    """Forget a host's session so the next cycle starts from a fresh one"""
+    with _host_sessions_lock:
+        entry = host_sessions.pop(host, None)
+    if entry is not None:
+        entry[1].close()
 
 
 def format_slot_output(slot, court_num):
@@ -92,64 +182,283 @@ def find_new_slots(current_slots: list, previous_slot_keys: set) -> list:
     return new_slots
 
 
-def check_court_availability():
+def load_court_config():
     """
-    Check availability for all courts
+    Load court-info.json: its venues grouped by PerfectMind host, and its watch spec
+
+    Courts the watch spec leaves out are dropped here, so they are never polled.
 
     Returns:
-        Tuple of (success: bool, slots: list)
+        Tuple of (dict of host to list of Venue, WatchSpec or None), or (None, None)
+        if the file is missing or invalid
     """
-    # Initialize session with logger
     logger = logging.getLogger(__name__)
-    session = PerfectMindSession(logger=logger)
-
-    # Load court configuration
     try:
         with open('court-info.json', 'r') as f:
             courts_config = json.load(f)
+        watch = WatchSpec.from_config(courts_config.get('watch'))
     except FileNotFoundError:
         logger.error("Error: court-info.json not found!")
-        return False, []
+        return None, None
     except json.JSONDecodeError as e:
-        logger.error(f"Error parsing court-info.json: {e}")
-        return False, []
+        logger.error("Error parsing court-info.json: %s", e)
+        return None, None
+    except (ValueError, TypeError, KeyError) as e:
+        logger.error("Invalid watch spec in court-info.json: %s", e)
+        return None, None
+
+    venues = load_venues(courts_config)
+    if watch is not None and watch.courts is not None:
+        venues = [venue._replace(courts=tuple(court for court in venue.courts if watch.wants_court(court['court'])))
+                  for venue in venues]
+        venues = [venue for venue in venues if venue.courts]
+    return group_by_host(venues), watch
+
 
-    # Check all courts
-    results = session.check_all_courts(courts_config)
+def compile_watch(watch: WatchSpec):
+    """Compile a watch spec for today in Toronto, or return None when there is none"""
+    return watch.compile(toronto_now().date()) if watch is not None else None
+
+
+def check_court_availability(cache=None, failed_courts: set = None):
+    """
+    Check availability for all courts
+
+    Courts whose response body is unchanged since the last check reuse their
+    previous slot table instead of being decoded and parsed again. With a watch
+    spec in court-info.json only the slots it wants are parsed and returned.
+
+    Args:
+        cache: AvailabilityCache to use (defaults to the module-level cache)
+        failed_courts: Optional set to add the courts that could not be checked
+            to; their slots are unknown this cycle, not gone
+
+    Returns:
+        Tuple of (success: bool, slots: SlotTable sorted by date, time and court)
+    """
+    if cache is None:
+        cache = availability_cache
+
+    # Begin the cycle before anything can fail, so a config error reports an
+    # unchanged cycle rather than the last one's change flag and no stored slot
+    # is taken for gone
+    cache.begin_cycle()
+    hosts, watch = load_court_config()
+    if hosts is None:
+        return False, SlotTable()
+    slot_filter = compile_watch(watch)
+
+    # Poll every host at once; each gets its own session, token and concurrency limit
+    separate_token_cache = len(hosts) > 1
+    if len(hosts) <= 1:
+        host_results = [check_host_courts(host, venues, cache, slot_filter=slot_filter)
+                        for host, venues in hosts.items()]
+    else:
+        with ThreadPoolExecutor(max_workers=len(hosts)) as executor:
+            host_results = list(executor.map(
+                lambda item: check_host_courts(item[0], item[1], cache, separate_token_cache, slot_filter),
+                hosts.items()
+            ))
 
     # Collect all available slots
-    all_slots = []
-
-    for court_num, data in results.items():
-        if data['availability']:
-            # Parse availability data
-            slots = session.parse_availability_data(data['availability'])
-
-            if slots:
-                # Format each slot and add court number
-                for slot in slots:
-                    formatted = format_slot_output(slot, court_num)
-                    all_slots.append({
-                        'formatted': formatted,
-                        'date': slot.get('date', ''),
-                        'time': slot.get('time', ''),
-                        'court': court_num
-                    })
+    court_tables = []
+
+    for (host, venues), (session, results) in zip(hosts.items(), host_results):
+        if session is None and failed_courts is not None:
+            failed_courts.update(court['court'] for venue in venues for court in venue.courts)
+        for court_num, data in results.items():
+            court_facilities[court_num] = data.get('facility_id')
+            if data.get('cached') is not None:
+                # Response unchanged since last check, reuse the slot table
+                court_tables.append(data['cached'])
+            elif data['availability']:
+                # Parse availability data into a compact table for this court
+                court_slots = SlotTable()
+                with metrics.phase('parse', data.get('facility_id')):
+                    court_slots.extend_slots(session.parse_availability_data(data['availability']), court_num)
+                court_tables.append(court_slots)
+                metrics.add('slots', len(court_slots), data.get('facility_id'))
+
+                if data.get('fingerprint'):
+                    cache.put(data['facility_id'], data['fingerprint'], court_slots)
+            else:
+                cache.mark_changed(data.get('facility_id'))
+                if data.get('error') and failed_courts is not None:
+                    failed_courts.add(court_num)
+
+    # Tables were parsed with slot_filter (cached ones are keyed by it); filtering the
+    # rows as well drops anything a backend returned unparsed by the watch
+    all_slots = SlotTable.concat(court_tables)
+    if slot_filter is not None:
+        all_slots = slot_filter.apply(all_slots)
 
     # Sort by date and time
-    all_slots.sort(key=lambda x: (x['date'], x['time'], x['court']))
+    all_slots = all_slots.sorted()
 
     # Display results header
     print("\n📊 Angus Glen Tennis Court Availability:")
     print("-" * 60)
 
     # Display formatted output
-    for slot in all_slots:
-        print(slot['formatted'])
+    with metrics.phase('format'):
+        for line in all_slots.iter_formatted():
+            print(line)
 
     return len(all_slots) > 0, all_slots
 
 
+def check_host_courts(host: str, venues: list, cache: AvailabilityCache, separate_token_cache: bool = False,
+                      slot_filter: SlotFilter = None):
+    """
+    Check every court of the venues on one PerfectMind host
+
+    A failure here only affects this host's courts; they are reported as
+    unavailable and the other hosts are unaffected.
+
+    Args:
+        host: PerfectMind host name
+        venues: Venues on the host
+        cache: AvailabilityCache for this cycle
+        separate_token_cache: Keep this host's token in its own cache file
+        slot_filter: Compiled watch spec the session parses with
+
+    Returns:
+        Tuple of (session, {court: result}) as returned by check_all_courts
+    """
+    logger = logging.getLogger(__name__)
+    courts = [court for venue in venues for court in venue.courts]
+    try:
+        session = get_host_session(host, venues, separate_token_cache)
+        session.watch = slot_filter
+
+        # Check courts in parallel (COURT_CHECK_CONCURRENCY=1 restores sequential checks)
+        concurrency_str = os.getenv('COURT_CHECK_CONCURRENCY')
+        limits = [venue.max_concurrency for venue in venues if venue.max_concurrency]
+        max_concurrency = int(concurrency_str) if concurrency_str else min(limits or [len(courts)])
+        return session, session.check_all_courts({'courts': courts}, max_concurrency=max(1, max_concurrency),
+                                                 availability_cache=cache)
+    except Exception as e:
+        logger.error("Checking courts on %s failed: %s", host, e, exc_info=True)
+        drop_host_session(host)
+        for court in courts:
+            cache.mark_changed(court.get('facilityId'))
+        return None, {}
+
+
+# One SMSNotifier per subscriber phone number, so each recipient's Twilio client is built once
+subscriber_notifiers = {}
+_subscriber_notifiers_lock = threading.Lock()
+
+
+def match_subscribers(subscriptions: SubscriptionRegistry, new_slots: SlotTable) -> list:
+    """
+    Match new slots to the subscribers whose watch spec asks for them
+
+    Args:
+        subscriptions: Subscription registry, reloaded here if its file changed
+        new_slots: Slots that appeared this cycle
+
+    Returns:
+        List of (Subscription, SlotTable) pairs
+    """
+    logger = logging.getLogger(__name__)
+    subscriptions.refresh()
+    with metrics.phase('match'):
+        matches = subscriptions.match(new_slots, toronto_now().date())
+    logger.info("%s new slot(s) matched %s of %s subscription(s)", len(new_slots), len(matches), len(subscriptions))
+    return matches
+
+
+def send_to_subscriber(subscription: Subscription, slots: SlotTable) -> bool:
+    """Send one subscriber their matched slots; returns True if the SMS went out"""
+    logger = logging.getLogger(__name__)
+    with _subscriber_notifiers_lock:
+        notifier = subscriber_notifiers.get(subscription.phone)
+        if notifier is None:
+            notifier = SMSNotifier(logger=logger, to_number=subscription.phone)
+            subscriber_notifiers[subscription.phone] = notifier
+    if not notifier.is_configured():
+        return False
+    with metrics.phase('twilio'):
+        if notifier.send_availability_notification(slots):
+            return True
+    logger.warning("Failed to notify %s of %s slot(s)", subscription.name, len(slots))
+    return False
+
+
+def notify_subscribers(subscriptions: SubscriptionRegistry, new_slots: SlotTable) -> int:
+    """
+    Send every subscriber the new slots their watch spec asks for
+
+    Args:
+        subscriptions: Subscription registry, reloaded here if its file changed
+        new_slots: Slots that appeared this cycle
+
+    Returns:
+        Number of messages sent
+    """
+    return sum(send_to_subscriber(subscription, slots)
+               for subscription, slots in match_subscribers(subscriptions, new_slots))
+
+
+def notify_recipient(current_slots: SlotTable, new_count: int) -> bool:
+    """Send every open slot to TWILIO_TO_PHONE_NUMBER after new ones were found"""
+    logger = logging.getLogger(__name__)
+    logger.info("Found %s new slot(s), sending SMS notification...", new_count)
+    sms_notifier = SMSNotifier(logger=logger)
+    if not sms_notifier.is_configured():
+        logger.info("SMS notifier not configured, skipping SMS notification")
+        return False
+    with metrics.phase('twilio'):
+        sms_sent = sms_notifier.send_availability_notification(current_slots)
+    if sms_sent:
+        print(f"\n📱 SMS notification sent for {len(current_slots)} time slot(s)!")
+    else:
+        print("\n⚠️  Failed to send SMS notification")
+    return sms_sent
+
+
+def run_burst(burst: BurstPoller, release: datetime, notified: set,
+              subscriptions: SubscriptionRegistry = None) -> SlotTable:
+    """
+    Burst-poll the date opening at release on the long-lived host sessions
+
+    Slots found are sent by SMS straight away, to the subscribers who want them
+    when there is a subscription registry, and their keys added to notified, so
+    regular cycles do not send them again once the date comes into their window.
+
+    Returns:
+        The slots that opened during the burst
+    """
+    logger = logging.getLogger(__name__)
+    hosts, watch = load_court_config()
+    if hosts is None:
+        return SlotTable()
+    separate_token_cache = len(hosts) > 1
+    slot_filter = compile_watch(watch)
+    sessions = {host: get_host_session(host, venues, separate_token_cache) for host, venues in hosts.items()}
+    for session in sessions.values():
+        session.watch = slot_filter
+    targets = [
+        (sessions[host], court)
+        for host, venues in hosts.items() for venue in venues for court in venue.courts
+    ]
+
+    def notify(new_slots: SlotTable):
+        notified.update(new_slots.keys())
+        for line in new_slots.iter_formatted():
+            print(f"🚀 {line}")
+        if subscriptions is not None:
+            notify_subscribers(subscriptions, new_slots)
+            return
+        sms_notifier = SMSNotifier(logger=logger)
+        if sms_notifier.is_configured():
+            with metrics.phase('twilio'):
+                sms_notifier.send_availability_notification(new_slots)
+
+    return burst.run(release, targets, notify)
+
+
 def is_quiet_hours(now: datetime) -> bool:
     """
     Check if current time is within quiet hours (22:30 PM - 07:30 AM)
@@ -224,80 +533,245 @@ def main():
         check_interval_minutes = int(check_interval_str)
     else:
         check_interval_minutes = random.randint(10, 30)
-        logger.info(f"CHECK_INTERVAL_MINUTES not set, using random value: {check_interval_minutes} minutes")
-    logger.info(f"Check interval set to {check_interval_minutes} minutes")
-
-    # Keep previous slots in memory for comparison
-    previous_slot_keys = set()
-
-    while True:
+        logger.info("CHECK_INTERVAL_MINUTES not set, using random value: %s minutes", check_interval_minutes)
+    logger.info("Check interval set to %s minutes", check_interval_minutes)
+
+    # Slots open after the last cycle survive restarts, so a restart does not re-alert them
+    state_store = SlotStateStore.from_env(logger=logger)
+    logger.info("Slot state at %s: %s open slot(s) after cycle %s",
+                state_store.path, len(state_store), state_store.cycle)
+    # Outside the pipeline, turn SIGTERM into SystemExit so the store is still checkpointed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    event_log = SlotEventLog.from_env(logger=logger)
+    scheduler = PollScheduler.from_env(check_interval_minutes, is_quiet=is_quiet_hours, logger=logger)
+    if scheduler is not None and event_log is not None:
+        scheduler.learn_from_events(event_log.events())
+        logger.info("Adaptive poll scheduler learned from event log; busiest windows: %s",
+                    ', '.join(scheduler.hottest()) or 'none yet')
+
+    burst = BurstPoller.from_env(logger=logger)
+    # Members' watch specs (SUBSCRIPTIONS_PATH); without it TWILIO_TO_PHONE_NUMBER gets every alert
+    subscriptions = SubscriptionRegistry.from_env(logger=logger)
+
+    stalled = False
+    try:
+        asyncio.run(run_pipeline(state_store, check_interval_minutes, event_log, scheduler, burst, subscriptions))
+    except PipelineStalled as e:
+        logger.critical("%s; exiting so a supervisor can restart the checker", e)
+        stalled = True
+    finally:
+        state_store.close()
+        logger.info("Slot state checkpointed")
+        if event_log is not None:
+            event_log.close()
+    if stalled:
+        # A normal exit joins every worker thread, the stuck ones included
+        logging.shutdown()
+        os._exit(1)
+
+
+class Cycle(NamedTuple):
+    """One poll on its way from the fetch stage to the diff stage"""
+    started: datetime
+    release: Optional[datetime] = None  # Burst release to run before the poll
+    success: bool = False
+    slots: Optional[SlotTable] = None
+    unchanged: bool = False  # Every court returned the same payload as last cycle
+    failed_courts: frozenset = frozenset()  # Courts whose check failed; their stored slots carry forward
+    burst_opened: int = 0  # Slots the burst before the poll found and already sent
+    metrics: Optional[CycleMetrics] = None  # This poll's metrics, exported after its last SMS
+
+
+class Notification(NamedTuple):
+    """One SMS for the notify stage: a subscriber's matches, or every open slot for TWILIO_TO_PHONE_NUMBER"""
+    slots: SlotTable
+    new_count: int
+    subscription: Optional[Subscription] = None
+    metrics: Optional[CycleMetrics] = None
+
+
+def _env_number(name: str, default, convert=float):
+    value = os.getenv(name)
+    return convert(value) if value else default
+
+
+async def run_pipeline(state_store: SlotStateStore, check_interval_minutes: int, event_log: SlotEventLog = None,
+                       scheduler: PollScheduler = None, burst: BurstPoller = None,
+                       subscriptions: SubscriptionRegistry = None):
+    """
+    Poll loop of main, as fetch, diff and notify stages joined by bounded queues
+
+    A ticker queues a poll at each check time. The fetch stage runs bursts and
+    polls; the diff stage applies each poll to state_store, records the changes
+    in event_log and feeds the adaptive scheduler; the notify stage sends SMS,
+    several at once, per subscriber when there is a subscription registry. A
+    slow Twilio call or court therefore never moves the next poll. Each stage
+    has its own timeout (PIPELINE_*_TIMEOUT_SECONDS). SIGINT or SIGTERM stops
+    the ticker and lets queued work finish within PIPELINE_SHUTDOWN_TIMEOUT_SECONDS.
+
+    Raises:
+        PipelineStalled: When a stage's threads all stay stuck after timing out
+            for PIPELINE_STALL_TIMEOUT_SECONDS
+    """
+    logger = logging.getLogger(__name__)
+    # Keys of slots already sent by a burst, kept until a regular poll has seen
+    # them: the released date is past the regular seven-day window until tomorrow
+    burst_notified = set()
+    consecutive_errors = 0
+    last_release = None
+
+    def fetch(cycle: Cycle) -> Cycle:
+        metrics.begin_cycle()
+        if cycle.release is not None:
+            found = run_burst(burst, cycle.release, burst_notified, subscriptions)
+            cycle = cycle._replace(started=datetime.now(), burst_opened=len(found))
+
+        logger.info("Checking court availability at %s", cycle.started.strftime('%Y-%m-%d %H:%M:%S'))
+        failed_courts = set()
+        success, current_slots = check_court_availability(failed_courts=failed_courts)
+
+        if success:
+            print("\n✅ Availability check completed successfully!")
+        else:
+            print("\n❌ No courts available or check failed!")
+
+        cache_stats = availability_cache.stats()
+        logger.info(
+            "Availability cache: %s hits, %s misses (%.0f%% hit rate)",
+            cache_stats['hits'], cache_stats['misses'], cache_stats['hit_rate'] * 100
+        )
+        if failed_courts:
+            logger.warning("Keeping the stored slots of %d court(s) that could not be checked", len(failed_courts))
+        # The next fetch may begin while this poll is diffed and sent, so it takes its metrics along
+        return cycle._replace(success=success, slots=current_slots, unchanged=availability_cache.cycle_unchanged,
+                              failed_courts=frozenset(failed_courts), metrics=metrics.detach_cycle())
+
+    def diff(cycle: Cycle):
+        try:
+            with cycle.metrics.use():
+                notifications = compare(cycle)
+            cycle.metrics.expect(len(notifications))
+            return [notification._replace(metrics=cycle.metrics) for notification in notifications] or None
+        finally:
+            cycle.metrics.done()
+
+    def compare(cycle: Cycle) -> list:
+        nonlocal consecutive_errors
+        current_slots = cycle.slots
+
+        # Compare with the stored slots to find new ones; if every court returned
+        # the same payload as last cycle there is nothing new to diff
+        if cycle.unchanged and state_store.cycle:
+            new_slots = SlotTable()
+        else:
+            with metrics.phase('diff'):
+                new_slots, gone_slots = state_store.apply(current_slots, cycle.failed_courts)
+            if event_log is not None:
+                event_log.append_diff(new_slots, gone_slots, court_facilities.get)
+            if burst_notified:
+                sent = set(burst_notified)
+                new_slots = new_slots.filter(lambda row: row.key() not in sent)
+                today = toronto_now().date().isoformat()
+                burst_notified.difference_update(
+                    {key for key in sent if key[0] < today} | (sent & current_slots.keys()))
+
+        metrics.add('new_slots', len(new_slots))
+        consecutive_errors = 0
+
+        if scheduler is not None:
+            scheduler.set_requests_per_poll(len(court_facilities))
+            # The first cycle against an empty store sees every open slot as new
+            opened = len(new_slots) if state_store.cycle > 1 else 0
+            scheduler.observe(cycle.started, opened + cycle.burst_opened)
+
+        if not new_slots:
+            if current_slots:
+                logger.info("No new slots found (%s existing slots)", len(current_slots))
+            else:
+                logger.info("No available slots found")
+            return []
+        if subscriptions is not None:
+            return [Notification(slots, len(slots), subscription)
+                    for subscription, slots in match_subscribers(subscriptions, new_slots)]
+        return [Notification(current_slots, len(new_slots))]
+
+    def notify(notification: Notification):
         try:
+            with notification.metrics.use():
+                if notification.subscription is not None:
+                    send_to_subscriber(notification.subscription, notification.slots)
+                else:
+                    notify_recipient(notification.slots, notification.new_count)
+        finally:
+            notification.metrics.done()
+
+    def on_error(stage: str, error: BaseException):
+        nonlocal consecutive_errors
+        if stage != 'notify':
+            consecutive_errors += 1
+
+    def until_burst(next_check: datetime) -> datetime:
+        if burst is None:
+            return next_check
+        after = datetime.now()
+        if last_release is not None:
+            after = max(after, last_release + timedelta(seconds=burst.window))
+        wake = burst.wake_time(after)
+        return min(next_check, wake) if wake is not None else next_check
+
+    async def ticks():
+        nonlocal last_release
+        while True:
             now = datetime.now()
-
-            # Skip check if in quiet hours
-            if is_quiet_hours(now):
-                next_check = get_next_check_time(now, check_interval_minutes)
-                wait_seconds = (next_check - now).total_seconds()
-                logger.info(
-                    f"Quiet hours (22:30-07:30). Next check at {next_check.strftime('%Y-%m-%d %H:%M:%S')}"
-                )
-                time.sleep(wait_seconds)
+            release = burst.due(now) if burst is not None else None
+            if release is not None and release == last_release:
+                release = None
+            if release is None and is_quiet_hours(now):
+                # Skip check in quiet hours
+                next_check = until_burst(get_next_check_time(now, check_interval_minutes))
+                logger.info("Quiet hours (22:30-07:30). Next check at %s", next_check.strftime('%Y-%m-%d %H:%M:%S'))
+                if not await pipeline.sleep((next_check - now).total_seconds()):
+                    return
                 continue
 
-            # Perform check
-            logger.info(f"Checking court availability at {now.strftime('%Y-%m-%d %H:%M:%S')}")
-            success, current_slots = check_court_availability()
-
-            if success:
-                print("\n✅ Availability check completed successfully!")
-            else:
-                print("\n❌ No courts available or check failed!")
-
-            # Compare with previous slots to find new ones
-            new_slots = find_new_slots(current_slots, previous_slot_keys)
-
-            # Update previous slots in memory
-            previous_slot_keys = {get_slot_key(slot) for slot in current_slots}
-
-            # Send SMS notification only if there are new slots
-            if new_slots:
-                logger.info(f"Found {len(new_slots)} new slot(s), sending SMS notification...")
-                sms_notifier = SMSNotifier(logger=logger)
-                if sms_notifier.is_configured():
-                    sms_sent = sms_notifier.send_availability_notification(current_slots)
-                    if sms_sent:
-                        print(f"\n📱 SMS notification sent for {len(current_slots)} time slot(s)!")
-                    else:
-                        print("\n⚠️  Failed to send SMS notification")
-                else:
-                    logger.info("SMS notifier not configured, skipping SMS notification")
-            else:
-                if current_slots:
-                    logger.info(f"No new slots found ({len(current_slots)} existing slots)")
-                else:
-                    logger.info("No available slots found")
+            if release is not None:
+                last_release = release
+            yield Cycle(now, release)
 
             # Calculate next check time
-            next_check = get_next_check_time(datetime.now(), check_interval_minutes)
+            if scheduler is not None:
+                next_check = scheduler.next_check_time(datetime.now())
+            else:
+                next_check = get_next_check_time(datetime.now(), check_interval_minutes)
+            if consecutive_errors:
+                # Back off with jitter on repeated errors instead of a fixed wait
+                delay = backoff_delay(consecutive_errors, base=60, cap=30 * 60)
+                next_check = max(next_check, datetime.now() + timedelta(seconds=delay))
+            next_check = until_burst(next_check)
             wait_seconds = (next_check - datetime.now()).total_seconds()
 
             if wait_seconds > 0:
                 logger.info(
-                    f"Next check scheduled at {next_check.strftime('%Y-%m-%d %H:%M:%S')} "
-                    f"(in {wait_seconds:.0f} seconds)"
+                    "Next check scheduled at %s (in %.0f seconds)",
+                    next_check.strftime('%Y-%m-%d %H:%M:%S'), wait_seconds
                 )
-                time.sleep(wait_seconds)
-            else:
-                # If wait time is negative or zero, wait at least 1 second
-                time.sleep(1)
-
-        except KeyboardInterrupt:
-            print("\n\n⏹️  Check cancelled by user")
-            sys.exit(1)
-        except Exception as e:
-            logger.error(f"Unexpected error: {e}", exc_info=True)
-            # Wait a bit before retrying on error
-            time.sleep(60)
+            # If wait time is negative or zero, wait at least 1 second
+            if not await pipeline.sleep(max(wait_seconds, 1)):
+                return
+
+    notify_concurrency = _env_number('PIPELINE_NOTIFY_CONCURRENCY', 4, int)
+    # A stage whose threads are all stuck past their timeout for this long ends the run
+    stall_timeout = _env_number('PIPELINE_STALL_TIMEOUT_SECONDS', 300)
+    pipeline = Pipeline([
+        # One poll at a time: polls share the host sessions and the availability cache
+        Stage('fetch', fetch, timeout=_env_number('PIPELINE_FETCH_TIMEOUT_SECONDS', 600), stall_timeout=stall_timeout),
+        # Diffs are applied to the state store in poll order
+        Stage('diff', diff, timeout=_env_number('PIPELINE_DIFF_TIMEOUT_SECONDS', 60), stall_timeout=stall_timeout),
+        Stage('notify', notify, concurrency=notify_concurrency,
+              timeout=_env_number('PIPELINE_NOTIFY_TIMEOUT_SECONDS', 60), queue_size=16 * notify_concurrency,
+              stall_timeout=stall_timeout),
+    ], logger=logger, on_error=on_error)
+    await pipeline.run(ticks(), shutdown_timeout=_env_number('PIPELINE_SHUTDOWN_TIMEOUT_SECONDS', 60))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,79 @@
+"""
+Duration Index
+Maps each (facility, date, start time) to the set of booking durations available there
+"""
+
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .time_conversion import format_minute, minute_of_day
+
+IndexKey = Tuple[str, str, int]  # (facility_id, date, start minute)
+
+
+class DurationIndex:
+    """Index of bookable durations keyed by (facility_id, date, start minute)"""
+
+    def __init__(self, durations: Optional[Iterable[int]] = None):
+        """
+        Initialize an empty index
+
+        Args:
+            durations: Durations (minutes) to keep; others are ignored. None keeps all.
+        """
+        self.wanted = frozenset(durations) if durations is not None else None
+        self._index: Dict[IndexKey, Set[int]] = {}
+
+    def add(self, facility_id: str, date: str, start: int, duration: int):
+        """Record that a start time can be booked for a duration"""
+        if self.wanted is not None and duration not in self.wanted:
+            return
+        self._index.setdefault((facility_id, date, start), set()).add(duration)
+
+    def add_slots(self, facility_id: str, slots: Iterable[dict]):
+        """Record parsed slot dicts from parse_availability_data"""
+        for slot in slots:
+            duration = int((slot.get('duration') or '60min').replace('min', ''))
+            self.add(facility_id, slot['date'], minute_of_day(slot['time']), duration)
+
+    def durations(self, facility_id: str, date: str, start) -> FrozenSet[int]:
+        """
+        Return the bookable durations for a start time
+
+        Args:
+            facility_id: Facility ID
+            date: Date as YYYY-MM-DD
+            start: Start as minutes after midnight or 'HH:MM'
+
+        Returns:
+            Frozen set of durations in minutes (empty if the start is not bookable)
+        """
+        if isinstance(start, str):
+            start = minute_of_day(start)
+        return frozenset(self._index.get((facility_id, date, start), ()))
+
+    def starts_for(self, duration: int) -> List[IndexKey]:
+        """Return the sorted keys that can be booked for a duration"""
+        return sorted(key for key, durations in self._index.items() if duration in durations)
+
+    def durations_seen(self) -> Set[int]:
+        """Every duration present in the index"""
+        seen = set()
+        for durations in self._index.values():
+            seen |= durations
+        return seen
+
+    def to_dict(self) -> Dict[Tuple[str, str, str], List[int]]:
+        """Readable form keyed by (facility_id, date, 'HH:MM') with sorted durations"""
+        return {
+            (facility_id, date, format_minute(start)): sorted(durations)
+            for (facility_id, date, start), durations in sorted(self._index.items())
+        }
+
+    def __len__(self):
+        return len(self._index)
+
+    def __iter__(self) -> Iterator[IndexKey]:
+        return iter(sorted(self._index))
+
+    def __contains__(self, key):
+        return key in self._index
@@ -0,0 +1,365 @@
+"""
+Instrumentation
+Per-phase timings, byte counts and slot counts for each poll cycle, with pluggable exporters
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Phases recorded by the checker, in pipeline order
+PHASES = ('token', 'post', 'decode', 'parse', 'format', 'diff', 'match', 'twilio')
+
+_current = threading.local()
+
+
+class _NullPhase:
+    """Shared no-op context used while instrumentation is disabled"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+    """
+    Times one phase; nested phases without a facility inherit this one's
+
+    Time spent in a nested phase counts only towards the nested phase, so phases
+    never overlap and their totals add up to the time spent in them.
+    """
+
+    __slots__ = ('metrics', 'name', 'facility', 'started', 'outer_facility', 'outer', 'nested')
+
+    def __init__(self, metrics: 'Instrumentation', name: str, facility: Optional[str]):
+        self.metrics = metrics
+        self.name = name
+        self.facility = facility
+
+    def __enter__(self):
+        self.outer_facility = getattr(_current, 'facility', None)
+        if self.facility is None:
+            self.facility = self.outer_facility
+        _current.facility = self.facility
+        self.outer = getattr(_current, 'phase', None)
+        _current.phase = self
+        self.nested = 0.0
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.started
+        self.metrics.record(self.name, elapsed - self.nested, self.facility)
+        if self.outer is not None:
+            self.outer.nested += elapsed
+        _current.phase = self.outer
+        _current.facility = self.outer_facility
+        return False
+
+
+class _UseCycle:
+    """Routes the current thread's phases and counters to one cycle"""
+
+    __slots__ = ('cycle', 'outer')
+
+    def __init__(self, cycle: 'CycleMetrics'):
+        self.cycle = cycle
+
+    def __enter__(self):
+        self.outer = getattr(_current, 'cycle', None)
+        _current.cycle = self.cycle
+        return self.cycle
+
+    def __exit__(self, *exc):
+        _current.cycle = self.outer
+        return False
+
+
+class CycleMetrics:
+    """
+    Phases and counters of one cycle
+
+    Instrumentation collects into an open cycle. detach_cycle() takes it out so
+    the next cycle can begin while this one's later stages still run: they
+    record into it inside use(), and it is exported when every part that was
+    expected has called done().
+    """
+
+    def __init__(self, metrics: 'Instrumentation'):
+        self.metrics = metrics
+        self.phases: Dict[Tuple[str, Optional[str]], List[float]] = {}
+        self.counters: Dict[Tuple[str, Optional[str]], float] = {}
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self._pending = 1
+
+    def use(self) -> _UseCycle:
+        """Context manager recording this thread's phases and counters in this cycle"""
+        return _UseCycle(self)
+
+    def expect(self, parts: int):
+        """Wait for parts more done() calls before exporting"""
+        with self.metrics._lock:
+            self._pending += parts
+
+    def done(self) -> Optional[dict]:
+        """
+        Mark one part of the cycle finished, exporting the cycle after the last
+
+        Returns:
+            The cycle report once exported, otherwise None
+        """
+        with self.metrics._lock:
+            self._pending -= 1
+            if self._pending > 0:
+                return None
+        return self.metrics._export(self)
+
+
+class Instrumentation:
+    """Collects phase timings and counters for the current cycle and hands them to exporters"""
+
+    def __init__(self, exporters: Optional[List] = None, enabled: Optional[bool] = None):
+        """
+        Initialize the collector
+
+        Args:
+            exporters: Objects with export(report) called at the end of each cycle
+            enabled: Defaults to True when there is at least one exporter
+        """
+        self.exporters = exporters or []
+        self.enabled = bool(self.exporters) if enabled is None else enabled
+        self.cycle = 0
+        self._lock = threading.Lock()
+        self._open = CycleMetrics(self)
+
+    @classmethod
+    def from_env(cls, logger: Optional[logging.Logger] = None) -> 'Instrumentation':
+        """
+        Build from METRICS_EXPORTERS (comma-separated: prometheus, jsonl, log)
+
+        METRICS_PROMETHEUS_PATH and METRICS_JSONL_PATH set the output files.
+        Unset or empty METRICS_EXPORTERS disables instrumentation.
+        """
+        exporters = []
+        for name in (os.getenv('METRICS_EXPORTERS') or '').split(','):
+            name = name.strip().lower()
+            if name == 'prometheus':
+                exporters.append(PrometheusTextExporter(os.getenv('METRICS_PROMETHEUS_PATH') or 'court_checker.prom'))
+            elif name == 'jsonl':
+                exporters.append(JsonLinesExporter(os.getenv('METRICS_JSONL_PATH') or 'court_checker_metrics.jsonl'))
+            elif name == 'log':
+                exporters.append(LogSummaryExporter(logger))
+            elif name:
+                (logger or logging.getLogger(__name__)).warning("Unknown metrics exporter: %s", name)
+        return cls(exporters)
+
+    def _target(self) -> CycleMetrics:
+        return getattr(_current, 'cycle', None) or self._open
+
+    def phase(self, name: str, facility: Optional[str] = None):
+        """Context manager timing one phase, optionally for a facility"""
+        if not self.enabled:
+            return NULL_PHASE
+        return _Phase(self, name, facility)
+
+    def record(self, name: str, seconds: float, facility: Optional[str] = None):
+        """Add a timing measured elsewhere"""
+        if not self.enabled:
+            return
+        with self._lock:
+            phases = self._target().phases
+            entry = phases.get((name, facility))
+            if entry is None:
+                phases[(name, facility)] = [1, seconds, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+                entry[2] = max(entry[2], seconds)
+
+    def add(self, name: str, value: float, facility: Optional[str] = None):
+        """Add to a counter such as 'bytes' or 'slots'"""
+        if not self.enabled:
+            return
+        if facility is None:
+            facility = getattr(_current, 'facility', None)
+        with self._lock:
+            counters = self._target().counters
+            key = (name, facility)
+            counters[key] = counters.get(key, 0) + value
+
+    def begin_cycle(self):
+        """Start collecting a new cycle"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._open = CycleMetrics(self)
+
+    def detach_cycle(self) -> CycleMetrics:
+        """Take the open cycle out of the collector and start a new one; export it with done()"""
+        with self._lock:
+            cycle, self._open = self._open, CycleMetrics(self)
+        return cycle
+
+    def end_cycle(self) -> Optional[dict]:
+        """
+        Close the cycle and export it
+
+        Returns:
+            The cycle report, or None when disabled
+        """
+        return self.detach_cycle().done()
+
+    def _export(self, cycle: CycleMetrics) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            self.cycle += 1
+            report = {
+                'cycle': self.cycle,
+                'started_at': cycle.started_at,
+                'seconds': time.perf_counter() - cycle.started,
+                'phases': [
+                    {'phase': name, 'facility': facility, 'count': count, 'seconds': total, 'max_seconds': longest}
+                    for (name, facility), (count, total, longest) in cycle.phases.items()
+                ],
+                'counters': [
+                    {'name': name, 'facility': facility, 'value': value}
+                    for (name, facility), value in cycle.counters.items()
+                ]
+            }
+
+        for exporter in self.exporters:
+            try:
+                exporter.export(report)
+            except Exception as e:
+                logging.getLogger(__name__).warning("Metrics exporter %s failed: %s", type(exporter).__name__, e)
+        return report
+
+
+# Shared disabled instance for components created without instrumentation
+DISABLED = Instrumentation(enabled=False)
+
+
+def phase_totals(report: dict) -> Dict[str, float]:
+    """Seconds per phase summed over facilities"""
+    totals = {}
+    for entry in report['phases']:
+        totals[entry['phase']] = totals.get(entry['phase'], 0.0) + entry['seconds']
+    return totals
+
+
+def counter_totals(report: dict) -> Dict[str, float]:
+    """Counter values summed over facilities"""
+    totals = {}
+    for entry in report['counters']:
+        totals[entry['name']] = totals.get(entry['name'], 0) + entry['value']
+    return totals
+
+
+class LogSummaryExporter:
+    """Logs one summary line per cycle"""
+
+    def __init__(self, logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger(__name__)
+
+    def export(self, report: dict):
+        phases = phase_totals(report)
+        ordered = [name for name in PHASES if name in phases] + sorted(set(phases) - set(PHASES))
+        counters = counter_totals(report)
+        self.logger.info(
+            "Cycle %d took %.0f ms: %s; %s",
+            report['cycle'], report['seconds'] * 1000,
+            ', '.join(f"{name} {phases[name] * 1000:.0f} ms" for name in ordered) or 'no phases',
+            ', '.join(f"{name} {value:g}" for name, value in sorted(counters.items())) or 'no counters'
+        )
+
+
+class JsonLinesExporter:
+    """Appends one JSON object per cycle to a file"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, report: dict):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(report, separators=(',', ':')) + '\n')
+
+
+def _labels(**labels) -> str:
+    parts = [f'{key}="{value}"' for key, value in labels.items() if value is not None]
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+class PrometheusTextExporter:
+    """
+    Writes the Prometheus text format for the node_exporter textfile collector
+
+    Phase time and call counts and counters accumulate across cycles; the last
+    cycle's values are exported as gauges too.
+    """
+
+    PREFIX = 'court_checker'
+
+    def __init__(self, path: str):
+        self.path = path
+        self.cycles = 0
+        self.phase_seconds: Dict[Tuple[str, Optional[str]], float] = {}
+        self.phase_calls: Dict[Tuple[str, Optional[str]], int] = {}
+        self.counters: Dict[Tuple[str, Optional[str]], float] = {}
+
+    def export(self, report: dict):
+        self.cycles += 1
+        for entry in report['phases']:
+            key = (entry['phase'], entry['facility'])
+            self.phase_seconds[key] = self.phase_seconds.get(key, 0.0) + entry['seconds']
+            self.phase_calls[key] = self.phase_calls.get(key, 0) + entry['count']
+        for entry in report['counters']:
+            key = (entry['name'], entry['facility'])
+            self.counters[key] = self.counters.get(key, 0) + entry['value']
+
+        p = self.PREFIX
+        lines = [
+            f"# HELP {p}_cycles_total Poll cycles completed",
+            f"# TYPE {p}_cycles_total counter",
+            f"{p}_cycles_total {self.cycles}",
+            f"# HELP {p}_last_cycle_seconds Duration of the last poll cycle",
+            f"# TYPE {p}_last_cycle_seconds gauge",
+            f"{p}_last_cycle_seconds {report['seconds']:.6f}",
+            f"# HELP {p}_phase_seconds_total Time spent per phase",
+            f"# TYPE {p}_phase_seconds_total counter",
+        ]
+        lines += [f"{p}_phase_seconds_total{_labels(phase=name, facility=facility)} {value:.6f}"
+                  for (name, facility), value in sorted(self.phase_seconds.items(), key=str)]
+        lines += [f"# HELP {p}_phase_calls_total Times each phase ran",
+                  f"# TYPE {p}_phase_calls_total counter"]
+        lines += [f"{p}_phase_calls_total{_labels(phase=name, facility=facility)} {value}"
+                  for (name, facility), value in sorted(self.phase_calls.items(), key=str)]
+        lines += [f"# HELP {p}_last_cycle_phase_seconds Time per phase in the last cycle",
+                  f"# TYPE {p}_last_cycle_phase_seconds gauge"]
+        lines += [f"{p}_last_cycle_phase_seconds{_labels(phase=e['phase'], facility=e['facility'])} {e['seconds']:.6f}"
+                  for e in report['phases']]
+
+        for name in sorted({name for name, _ in self.counters}):
+            lines += [f"# TYPE {p}_{name}_total counter"]
+            lines += [f"{p}_{name}_total{_labels(facility=facility)} {value:g}"
+                      for (counter, facility), value in sorted(self.counters.items(), key=str) if counter == name]
+            lines += [f"# TYPE {p}_last_cycle_{name} gauge"]
+            lines += [f"{p}_last_cycle_{name}{_labels(facility=e['facility'])} {e['value']:g}"
+                      for e in report['counters'] if e['name'] == name]
+
+        # Write then rename so the collector never reads a partial file
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,129 @@
+"""
+Payload Capture
+Keeps the raw bytes of 1 in N availability responses in a rotating directory for later inspection
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from typing import Optional
+
+# File extension per response content type; anything else is kept as .bin
+EXTENSIONS = (('json', '.json'), ('html', '.html'), ('xml', '.xml'), ('text/', '.txt'))
+
+# Names capture() writes; rotation leaves every other file in the directory alone
+CAPTURE_NAME = re.compile(r'^\d{8}T\d{6}-\d{8}-.+-\d{3}\.(?:json|html|xml|txt|bin)$')
+
+
+def extension_for(content_type: Optional[str]) -> str:
+    """File extension for a Content-Type header value; JSON when it is missing"""
+    if not content_type:
+        return '.json'
+    content_type = content_type.lower()
+    for marker, extension in EXTENSIONS:
+        if marker in content_type:
+            return extension
+    return '.bin'
+
+
+class PayloadCapture:
+    """Sampled, size-bounded store of raw response bodies"""
+
+    def __init__(self, directory: str, sample_every: int = 100, max_files: int = 200,
+                 max_bytes: int = 50 * 1024 * 1024, logger: Optional[logging.Logger] = None):
+        """
+        Initialize the store
+
+        Args:
+            directory: Where captured bodies are written
+            sample_every: Capture one response in this many
+            max_files: Oldest captures are removed beyond this many files
+            max_bytes: Oldest captures are removed beyond this many bytes in total
+            logger: Optional logger instance
+        """
+        self.directory = directory
+        self.sample_every = max(1, sample_every)
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.logger = logger or logging.getLogger(__name__)
+        self._seen = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_env(cls, logger: Optional[logging.Logger] = None) -> Optional['PayloadCapture']:
+        """
+        Build from PAYLOAD_CAPTURE_DIR, PAYLOAD_CAPTURE_SAMPLE_EVERY and PAYLOAD_CAPTURE_MAX_FILES
+
+        Returns:
+            PayloadCapture, or None when PAYLOAD_CAPTURE_DIR is not set
+        """
+        directory = os.getenv('PAYLOAD_CAPTURE_DIR')
+        if not directory:
+            return None
+        sample_str = os.getenv('PAYLOAD_CAPTURE_SAMPLE_EVERY')
+        max_files_str = os.getenv('PAYLOAD_CAPTURE_MAX_FILES')
+        kwargs = {}
+        if sample_str:
+            kwargs['sample_every'] = int(sample_str)
+        if max_files_str:
+            kwargs['max_files'] = int(max_files_str)
+        return cls(directory, logger=logger, **kwargs)
+
+    def _next_sample(self) -> int:
+        """Count a response; returns its sequence number if it is sampled, else 0"""
+        with self._lock:
+            self._seen += 1
+            return self._seen if self._seen % self.sample_every == 0 else 0
+
+    def capture(self, facility_id: str, body: bytes, status_code: int = 200,
+                content_type: Optional[str] = None) -> Optional[str]:
+        """
+        Count a response and write it out if it is sampled
+
+        Args:
+            facility_id: Facility the response is for
+            body: Raw response body
+            status_code: HTTP status, part of the file name
+            content_type: Content-Type header, picks the file extension (e.g. .html for a login page)
+
+        Returns:
+            Path of the written file, or None if this response was not sampled
+        """
+        sequence = self._next_sample()
+        if not sequence:
+            return None
+
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{sequence:08d}-{facility_id}-{status_code}" \
+               f"{extension_for(content_type)}"
+        path = os.path.join(self.directory, name)
+        try:
+            with open(path, 'wb') as f:
+                f.write(body)
+            self._rotate()
+        except OSError as e:
+            self.logger.warning("Payload capture to %s failed: %s", path, e)
+            return None
+        self.logger.debug("Captured %d byte payload for facility %s", len(body), facility_id,
+                          extra={'facility_id': facility_id, 'capture_path': path})
+        return path
+
+    def _rotate(self):
+        """Drop the oldest captures beyond the file and byte limits; other files are not touched"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and CAPTURE_NAME.match(entry.name):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name, stat.st_size))
+        entries.sort()
+
+        total = sum(size for _, _, size in entries)
+        while entries and (len(entries) > self.max_files or total > self.max_bytes):
+            _, name, size = entries.pop(0)
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+            total -= size
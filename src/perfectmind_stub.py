@@ -0,0 +1,408 @@
+"""
+PerfectMind Stub
+Local stand-in for the PerfectMind landing page and FacilityAvailability endpoints, with record/replay,
+and an in-memory transport serving the same endpoints without a socket
+
+Usage:
+    python -m src.perfectmind_stub serve --port 8080 --latency 0.2 --error-rate 0.05 --churn 0.1
+    python -m src.perfectmind_stub record --out tests/fixtures/recorded
+"""
+
+import argparse
+import ast
+import json
+import logging
+import os
+import random
+import secrets
+import threading
+import time
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from .synthetic_availability import FIRST_START, LAST_END, generate_availability, generate_body
+from .transport import Transport, make_response
+
+LANDING_PATH = '/Clients/BookMe4LandingPages/Facility'
+AVAILABILITY_PATH = '/Clients/BookMe4LandingPages/FacilityAvailability'
+
+LANDING_PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="utf-8" />
+    <title>PerfectMind Stub - {facility_id}</title>
+</head>
+<body class="bm-landing-page">
+    <form id="AjaxAntiForgeryForm" action="" method="post">
+        <input name="__RequestVerificationToken" type="hidden" value="{token}" />
+    </form>
+    <div class="bm-facility-details">
+        <h1 class="bm-facility-name">{facility_id}</h1>
+    </div>
+</body>
+</html>
+"""
+
+
+def load_fixture(path: str) -> bytes:
+    """
+    Load a recorded response as compact JSON bytes
+
+    Accepts raw JSON as recorded from the server, or the Python literal form
+    used by tests/fixtures/response.json.
+    """
+    with open(path, 'rb') as f:
+        raw = f.read()
+    try:
+        data = json.loads(raw)
+    except ValueError:
+        data = ast.literal_eval(raw.decode('utf-8'))
+    return json.dumps(data, separators=(',', ':')).encode()
+
+
+class PerfectMindStub:
+    """Threaded HTTP server imitating the two PerfectMind endpoints the checker uses"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, fixtures: Optional[str] = None,
+                 synthetic: bool = True, density: float = 0.5, seed=0,
+                 latency: float = 0.0, latency_jitter: float = 0.0, error_rate: float = 0.0,
+                 churn: float = 0.0, token_ttl: Optional[float] = None,
+                 logger: Optional[logging.Logger] = None):
+        """
+        Initialize the stub
+
+        Args:
+            host: Interface to bind
+            port: Port to bind, 0 picks a free one
+            fixtures: A recorded response file served for every facility, or a directory
+                of <facilityId>.json files
+            synthetic: Generate responses for facilities without a fixture
+            density: Fraction of start times open in synthetic responses
+            seed: Seed for synthetic responses, errors and churn
+            latency: Added delay per request in seconds
+            latency_jitter: Extra uniform random delay per request, up to this many seconds
+            error_rate: Fraction of availability requests answered with 503
+            churn: Probability that each synthetic slot flips open/closed between requests
+            token_ttl: Seconds after which an issued token is rejected with 403
+            logger: Optional logger instance
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        self.fixtures = fixtures
+        self.synthetic = synthetic
+        self.density = density
+        self.seed = seed
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.churn = churn
+        self.token_ttl = token_ttl
+        self.rng = random.Random(seed)
+        self.stats = {'landing': 0, 'availability': 0, 'errors': 0, 'rejected': 0}
+        self._tokens: Dict[str, float] = {}
+        self._fixture_cache: Dict[str, Optional[bytes]] = {}
+        self._open: Dict[tuple, bool] = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+        self.httpd = ThreadingHTTPServer((host, port), _StubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.stub = self
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'PerfectMindStub':
+        """Serve in a background thread"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def delay(self):
+        """Sleep for the configured latency"""
+        with self._lock:
+            jitter = self.rng.uniform(0, self.latency_jitter) if self.latency_jitter else 0.0
+        if self.latency or jitter:
+            time.sleep(self.latency + jitter)
+
+    def issue_token(self) -> str:
+        token = 'CfDJ8' + secrets.token_urlsafe(72)
+        with self._lock:
+            self._tokens[token] = time.monotonic()
+            self.stats['landing'] += 1
+        return token
+
+    def token_valid(self, token: Optional[str]) -> bool:
+        with self._lock:
+            issued = self._tokens.get(token)
+            if issued is None:
+                return False
+            if self.token_ttl is not None and time.monotonic() - issued >= self.token_ttl:
+                del self._tokens[token]
+                return False
+            return True
+
+    def inject_error(self) -> bool:
+        with self._lock:
+            return self.error_rate > 0 and self.rng.random() < self.error_rate
+
+    def fixture_body(self, facility_id: str) -> Optional[bytes]:
+        """Recorded response for a facility, if any"""
+        if not self.fixtures:
+            return None
+        if os.path.isfile(self.fixtures):
+            path = self.fixtures
+        else:
+            path = os.path.join(self.fixtures, f"{facility_id}.json")
+        with self._lock:
+            if path not in self._fixture_cache:
+                self._fixture_cache[path] = load_fixture(path) if os.path.exists(path) else None
+            return self._fixture_cache[path]
+
+    def availability_body(self, facility_id: str, start_date: date, days_count: int, duration: int) -> Optional[bytes]:
+        """Recorded or generated response body for one FacilityAvailability request"""
+        body = self.fixture_body(facility_id)
+        if body is not None or not self.synthetic:
+            return body
+
+        def is_open(day, start):
+            key = (facility_id, day, start, duration)
+            state = self._open.get(key)
+            if state is None:
+                state = random.Random(f"{self.seed}:{facility_id}:{day}:{start}:{duration}").random() < self.density
+            elif self.churn and self.rng.random() < self.churn:
+                state = not state
+            self._open[key] = state
+            return state
+
+        with self._lock:
+            data = generate_availability(start_date, days_count, duration,
+                                         first_start=FIRST_START, last_end=LAST_END, is_open=is_open)
+        return json.dumps(data, separators=(',', ':')).encode()
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        self.server.stub.logger.debug("%s - " + format, self.address_string(), *args)
+
+    def _reply(self, status: int, body: bytes, content_type: str, extra_headers: Iterable = ()):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in extra_headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        stub = self.server.stub
+        parsed = urlparse(self.path)
+        if parsed.path != LANDING_PATH:
+            self._reply(404, b'Not Found', 'text/plain')
+            return
+
+        stub.delay()
+        facility_id = parse_qs(parsed.query).get('facilityId', [''])[0]
+        page = LANDING_PAGE_TEMPLATE.format(facility_id=facility_id, token=stub.issue_token())
+        cookie = ('Set-Cookie', f"PMSessionId={secrets.token_hex(16)}; path=/; HttpOnly")
+        self._reply(200, page.encode('utf-8'), 'text/html; charset=utf-8', [cookie])
+
+    def do_POST(self):
+        stub = self.server.stub
+        length = int(self.headers.get('Content-Length') or 0)
+        form = parse_qs(self.rfile.read(length).decode('utf-8'))
+        if urlparse(self.path).path != AVAILABILITY_PATH:
+            self._reply(404, b'Not Found', 'text/plain')
+            return
+
+        stub.delay()
+        with stub._lock:
+            stub.stats['availability'] += 1
+
+        if not stub.token_valid(form.get('__RequestVerificationToken', [None])[0]):
+            with stub._lock:
+                stub.stats['rejected'] += 1
+            self._reply(403, b'Invalid anti-forgery token', 'text/html; charset=utf-8')
+            return
+
+        if stub.inject_error():
+            with stub._lock:
+                stub.stats['errors'] += 1
+            self._reply(503, b'Service Unavailable', 'text/plain', [('Retry-After', '1')])
+            return
+
+        facility_id = form.get('facilityId', [''])[0]
+        try:
+            start_date = datetime.strptime(form.get('date', [''])[0][:10], '%Y-%m-%d').date()
+        except ValueError:
+            start_date = date.today()
+        days_count = int(form.get('daysCount', ['7'])[0])
+        duration = int(form.get('duration', ['60'])[0])
+
+        body = stub.availability_body(facility_id, start_date, days_count, duration)
+        if body is None:
+            self._reply(404, b'No fixture for facility', 'text/plain')
+            return
+        self._reply(200, body, 'application/json; charset=utf-8')
+
+
+class FakeTransport(Transport):
+    """
+    In-memory PerfectMind for tests and benchmarks
+
+    Serves a landing page carrying a token and synthetic availability for any
+    facility, or whatever a custom handler returns, without touching the network.
+    """
+
+    def __init__(self, handler: Optional[Callable[..., Tuple[int, Dict[str, str], bytes]]] = None,
+                 density: float = 0.5, seed=0, latency: float = 0.0):
+        """
+        Initialize the fake
+
+        Args:
+            handler: Optional callable(method, url, params, data) returning
+                (status_code, headers, body); replaces the built-in endpoints
+            density: Fraction of start times open in synthetic responses
+            seed: Seed for synthetic responses
+            latency: Added delay per request in seconds
+        """
+        super().__init__()
+        self.handler = handler
+        self.density = density
+        self.seed = seed
+        self.latency = latency
+        self.tokens = set()
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def request(self, method, url, params=None, data=None, headers=None, stream=False):
+        with self._lock:
+            self.calls.append((method, url, params, data))
+        if self.latency:
+            time.sleep(self.latency)
+        status_code, response_headers, body = (self.handler or self._serve)(method, url, params, data)
+        if params:
+            url = f"{url}?{urlencode(params)}"
+        return make_response(status_code, response_headers, body, url)
+
+    def _serve(self, method, url, params, data):
+        path = urlparse(url).path
+        if method == 'GET' and path == LANDING_PATH:
+            token = 'CfDJ8' + secrets.token_urlsafe(72)
+            with self._lock:
+                self.tokens.add(token)
+            self.cookies.set('PMSessionId', secrets.token_hex(16))
+            page = LANDING_PAGE_TEMPLATE.format(facility_id=(params or {}).get('facilityId', ''), token=token)
+            return 200, {'Content-Type': 'text/html; charset=utf-8'}, page.encode('utf-8')
+
+        if method == 'POST' and path == AVAILABILITY_PATH:
+            form = data if isinstance(data, dict) else {key: values[0] for key, values in parse_qs(data or '').items()}
+            if form.get('__RequestVerificationToken') not in self.tokens:
+                return 403, {'Content-Type': 'text/html; charset=utf-8'}, b'Invalid anti-forgery token'
+            try:
+                start_date = datetime.strptime(str(form.get('date', ''))[:10], '%Y-%m-%d').date()
+            except ValueError:
+                start_date = date.today()
+            body = generate_body(start_date, int(form.get('daysCount', 7)), int(form.get('duration', 60)),
+                                 density=self.density, seed=f"{self.seed}:{form.get('facilityId')}")
+            return 200, {'Content-Type': 'application/json; charset=utf-8'}, body
+
+        return 404, {'Content-Type': 'text/plain'}, b'Not Found'
+
+
+def record_fixtures(session, facility_ids: Iterable[str], out_dir: str,
+                    days_count: int = 7, duration: int = 60) -> List[str]:
+    """
+    Save live FacilityAvailability responses as replayable fixtures
+
+    Args:
+        session: PerfectMindSession pointed at the real server
+        facility_ids: Facilities to record
+        out_dir: Directory to write <facilityId>.json files into
+        days_count: Days per request
+        duration: Booking duration in minutes
+
+    Returns:
+        Paths of the recorded files
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for facility_id in facility_ids:
+        response = session._post_availability(facility_id, None, days_count, duration)
+        if response is None:
+            session.logger.error("Could not record facility %s", facility_id)
+            continue
+        path = os.path.join(out_dir, f"{facility_id}.json")
+        with open(path, 'wb') as f:
+            f.write(response.content)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local PerfectMind stand-in server")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve = commands.add_parser('serve', help='Serve fixtures or synthetic availability')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8080)
+    serve.add_argument('--fixtures', help='Response file or directory of <facilityId>.json files')
+    serve.add_argument('--no-synthetic', action='store_true', help='Answer 404 for facilities without a fixture')
+    serve.add_argument('--density', type=float, default=0.5)
+    serve.add_argument('--seed', default='0')
+    serve.add_argument('--latency', type=float, default=0.0, help='Seconds added to every request')
+    serve.add_argument('--jitter', type=float, default=0.0, help='Extra random seconds, up to this value')
+    serve.add_argument('--error-rate', type=float, default=0.0)
+    serve.add_argument('--churn', type=float, default=0.0)
+    serve.add_argument('--token-ttl', type=float, default=None)
+
+    record = commands.add_parser('record', help='Record live responses as fixtures')
+    record.add_argument('--courts', default='court-info.json')
+    record.add_argument('--out', required=True)
+    record.add_argument('--days', type=int, default=7)
+    record.add_argument('--duration', type=int, default=60)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if args.command == 'record':
+        from .PerfectMindSession import PerfectMindSession
+        with open(args.courts, 'r') as f:
+            facility_ids = [court['facilityId'] for court in json.load(f)['courts']]
+        paths = record_fixtures(PerfectMindSession(), facility_ids, args.out, args.days, args.duration)
+        print(f"Recorded {len(paths)} fixture(s) to {args.out}")
+        return
+
+    stub = PerfectMindStub(
+        host=args.host, port=args.port, fixtures=args.fixtures, synthetic=not args.no_synthetic,
+        density=args.density, seed=args.seed, latency=args.latency, latency_jitter=args.jitter,
+        error_rate=args.error_rate, churn=args.churn, token_ttl=args.token_ttl
+    )
+    print(f"PerfectMind stub listening on {stub.url} (set PERFECTMIND_BASE_URL={stub.url})")
+    try:
+        stub.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
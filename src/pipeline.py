@@ -0,0 +1,302 @@
+"""
+Pipeline
+Asyncio stages joined by bounded queues, each with its own workers, timeout and clean shutdown
+"""
+
+import asyncio
+import inspect
+import logging
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+# Queued after the last item; each worker that takes one exits
+_STOP = object()
+
+
+class PipelineStalled(RuntimeError):
+    """Every thread of a stage is stuck in an item that timed out, so the stage can take no more"""
+
+
+class Stage(NamedTuple):
+    """
+    One step of a Pipeline
+
+    The handler gets one item and returns the item for the next stage, a list
+    of items, or None to pass nothing on. Plain functions run on the stage's own
+    threads, so a slow stage never holds up the event loop or the other stages;
+    coroutine functions run on the loop.
+
+    A thread whose item timed out keeps running and holds its slot. When all of
+    the stage's threads are stuck like that for stall_timeout seconds, run()
+    gives up with PipelineStalled; with no stall_timeout they are only logged.
+    """
+    name: str
+    handler: Callable
+    concurrency: int = 1
+    timeout: Optional[float] = None
+    queue_size: int = 1
+    stall_timeout: Optional[float] = None
+
+
+class Pipeline:
+    """Runs items from a source through a sequence of stages"""
+
+    def __init__(self, stages: Sequence[Stage], logger: Optional[logging.Logger] = None,
+                 on_error: Optional[Callable[[str, BaseException], None]] = None):
+        """
+        Initialize the pipeline
+
+        Args:
+            stages: Stages in order; each one's output is queued for the next
+            logger: Optional logger instance
+            on_error: Called with the stage name and exception when a handler fails
+                or times out; the item is dropped either way
+        """
+        self.stages = list(stages)
+        self.logger = logger or logging.getLogger(__name__)
+        self.on_error = on_error
+        self._stopping: Optional[asyncio.Event] = None
+        self._abandoned = False
+        # Name of the stage whose threads all got stuck, once run() has given up on it
+        self.stalled: Optional[str] = None
+        self._leaked: Dict[str, int] = {}
+        self._stall_timers: Dict[str, asyncio.TimerHandle] = {}
+        self._feeder: Optional[asyncio.Task] = None
+        self._workers: List[asyncio.Task] = []
+        self._closers: List[asyncio.Task] = []
+
+    @property
+    def stopping(self) -> bool:
+        return self._stopping is not None and self._stopping.is_set()
+
+    def stop(self):
+        """
+        Stop taking items from the source and let the stages finish what is queued
+
+        A second call cancels whatever is still running.
+        """
+        if self._stopping is None:
+            return
+        if self._stopping.is_set():
+            self._abandon()
+            return
+        self.logger.info("Pipeline stopping; finishing queued work")
+        self._stopping.set()
+        if self._feeder is not None:
+            self._feeder.cancel()
+
+    def _abandon(self):
+        self._abandoned = True
+        self._stopping.set()
+        self.logger.warning("Stopping now, abandoning %d running worker(s)",
+                            sum(not task.done() for task in self._workers))
+        for task in [self._feeder] + self._workers + self._closers:
+            if task is not None:
+                task.cancel()
+
+    async def sleep(self, seconds: float) -> bool:
+        """
+        Sleep for the source, waking early on stop
+
+        Returns:
+            False if the pipeline is stopping
+        """
+        if seconds > 0:
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+            except asyncio.TimeoutError:
+                pass
+        return not self.stopping
+
+    async def run(self, source: AsyncIterator, shutdown_timeout: Optional[float] = None,
+                  signals: Sequence[int] = (signal.SIGINT, signal.SIGTERM)):
+        """
+        Feed items from source through the stages until it ends or stop() is called
+
+        Args:
+            source: Async iterator of items for the first stage
+            shutdown_timeout: Seconds to let queued work finish after the source
+                ends before cancelling it; None waits for everything
+            signals: Signals that call stop() while running
+
+        Raises:
+            PipelineStalled: When every thread of a stage stayed stuck in a timed out
+                item for its stall_timeout; the stuck threads are left running, so the
+                caller should exit the process rather than run again
+        """
+        loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        self._abandoned = False
+        self.stalled = None
+        self._leaked = {}
+        queues = [asyncio.Queue(maxsize=max(1, stage.queue_size)) for stage in self.stages]
+        executors = [
+            None if inspect.iscoroutinefunction(stage.handler)
+            else ThreadPoolExecutor(max_workers=max(1, stage.concurrency), thread_name_prefix=f"pipeline-{stage.name}")
+            for stage in self.stages
+        ]
+        # Held until a handler thread returns, even one whose item timed out
+        slots = [asyncio.Semaphore(max(1, stage.concurrency)) for stage in self.stages]
+
+        installed = []
+        for signum in signals:
+            try:
+                loop.add_signal_handler(signum, self.stop)
+                installed.append(signum)
+            except (NotImplementedError, RuntimeError, ValueError):
+                # Not the main thread, or a platform without loop signal handlers
+                pass
+
+        for i, stage in enumerate(self.stages):
+            outbox = queues[i + 1] if i + 1 < len(queues) else None
+            workers = [
+                asyncio.create_task(self._work(stage, queues[i], outbox, executors[i], slots[i]),
+                                    name=f"{stage.name}-{n}")
+                for n in range(max(1, stage.concurrency))
+            ]
+            self._workers.extend(workers)
+            self._closers.append(asyncio.create_task(self._close_after(workers, i + 1, queues)))
+        self._feeder = asyncio.create_task(self._feed(source, queues[0], max(1, self.stages[0].concurrency)))
+
+        try:
+            await asyncio.gather(self._feeder, return_exceptions=True)
+            try:
+                await asyncio.wait_for(asyncio.gather(*self._closers, return_exceptions=True), timeout=shutdown_timeout)
+            except asyncio.TimeoutError:
+                self.logger.warning("Pipeline did not drain within %.0fs, cancelling the rest", shutdown_timeout)
+        finally:
+            for timer in self._stall_timers.values():
+                timer.cancel()
+            self._stall_timers = {}
+            tasks = self._workers + self._closers
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for signum in installed:
+                loop.remove_signal_handler(signum)
+            for executor in executors:
+                if executor is not None:
+                    executor.shutdown(wait=False, cancel_futures=True)
+            self._feeder = None
+            self._workers = []
+            self._closers = []
+        if self.stalled is not None:
+            raise PipelineStalled(f"Stage {self.stalled} stalled: every thread is stuck in an item that timed out")
+        self.logger.info("Pipeline stopped")
+
+    async def _feed(self, source: AsyncIterator, inbox: asyncio.Queue, workers: int):
+        try:
+            async for item in source:
+                await inbox.put(item)
+                if self.stopping:
+                    break
+        except asyncio.CancelledError:
+            if self._abandoned:
+                raise
+        finally:
+            aclose = getattr(source, 'aclose', None)
+            if aclose is not None:
+                await aclose()
+        for _ in range(workers):
+            await inbox.put(_STOP)
+
+    async def _close_after(self, workers: List[asyncio.Task], next_index: int, queues: List[asyncio.Queue]):
+        await asyncio.gather(*workers, return_exceptions=True)
+        if next_index < len(queues):
+            for _ in range(max(1, self.stages[next_index].concurrency)):
+                await queues[next_index].put(_STOP)
+
+    async def _work(self, stage: Stage, inbox: asyncio.Queue, outbox: Optional[asyncio.Queue],
+                    executor: Optional[ThreadPoolExecutor], slot: asyncio.Semaphore):
+        while True:
+            item = await inbox.get()
+            if item is _STOP:
+                return
+            future = None
+            try:
+                if executor is None:
+                    call = stage.handler(item)
+                else:
+                    # A thread cannot be interrupted, so on timeout it runs on and
+                    # keeps its slot; the timeout only counts time spent running
+                    await slot.acquire()
+                    call, future = self._in_thread(executor, slot, stage.handler, item)
+                result = await asyncio.wait_for(call, timeout=stage.timeout)
+            except asyncio.TimeoutError as e:
+                self.logger.error("Stage %s timed out after %.0fs", stage.name, stage.timeout,
+                                  extra={'stage': stage.name})
+                if future is not None and not future.done():
+                    self._leaked_thread(stage, future)
+                self._failed(stage, e)
+                continue
+            except Exception as e:
+                self.logger.error("Stage %s failed: %s", stage.name, e, exc_info=True, extra={'stage': stage.name})
+                self._failed(stage, e)
+                continue
+
+            if result is None or outbox is None:
+                continue
+            for output in (result if isinstance(result, list) else [result]):
+                await outbox.put(output)
+
+    @staticmethod
+    def _in_thread(executor: ThreadPoolExecutor, slot: asyncio.Semaphore, handler: Callable, item):
+        loop = asyncio.get_running_loop()
+
+        def release(_):
+            try:
+                loop.call_soon_threadsafe(slot.release)
+            except RuntimeError:
+                # The loop has closed; nothing is waiting for the slot any more
+                pass
+
+        future = executor.submit(handler, item)
+        future.add_done_callback(release)
+        return asyncio.wrap_future(future), future
+
+    def _leaked_thread(self, stage: Stage, future):
+        """
+        Count a thread still running after its item timed out
+
+        It holds one of the stage's slots until it returns. Once every slot is
+        held that way the stage cannot take another item; if none has returned
+        within the stage's stall_timeout the pipeline gives up (see run()).
+        """
+        loop = asyncio.get_running_loop()
+        slots = max(1, stage.concurrency)
+        leaked = self._leaked[stage.name] = self._leaked.get(stage.name, 0) + 1
+        self.logger.error("Stage %s has %d of %d thread(s) stuck after timing out", stage.name, leaked, slots,
+                          extra={'stage': stage.name})
+
+        def returned(_):
+            try:
+                loop.call_soon_threadsafe(self._thread_returned, stage)
+            except RuntimeError:
+                # The loop has closed; nothing is counting any more
+                pass
+
+        future.add_done_callback(returned)
+        if leaked >= slots and stage.stall_timeout is not None and stage.name not in self._stall_timers:
+            self._stall_timers[stage.name] = loop.call_later(stage.stall_timeout, self._stall, stage)
+
+    def _thread_returned(self, stage: Stage):
+        self._leaked[stage.name] -= 1
+        timer = self._stall_timers.pop(stage.name, None)
+        if timer is not None:
+            timer.cancel()
+        self.logger.info("A timed out thread of stage %s returned", stage.name, extra={'stage': stage.name})
+
+    def _stall(self, stage: Stage):
+        self._stall_timers.pop(stage.name, None)
+        self.stalled = stage.name
+        self.logger.critical("Stage %s stalled: all %d thread(s) are stuck", stage.name, max(1, stage.concurrency),
+                             extra={'stage': stage.name})
+        self._abandon()
+
+    def _failed(self, stage: Stage, error: BaseException):
+        if self.on_error is not None:
+            try:
+                self.on_error(stage.name, error)
+            except Exception as e:
+                self.logger.warning("Error callback failed for stage %s: %s", stage.name, e)
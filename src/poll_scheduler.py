@@ -0,0 +1,259 @@
+"""
+Poll Scheduler
+Learns when slots tend to open and spends a daily request budget on those times
+"""
+
+import logging
+import math
+import os
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, List, Optional
+
+BUCKET_MINUTES = 15
+BUCKETS_PER_DAY = 24 * 60 // BUCKET_MINUTES
+BUCKETS_PER_WEEK = 7 * BUCKETS_PER_DAY
+
+
+def bucket_of(moment: datetime) -> int:
+    """Minute-of-week bucket a local time falls in"""
+    return moment.weekday() * BUCKETS_PER_DAY + (moment.hour * 60 + moment.minute) // BUCKET_MINUTES
+
+
+def bucket_start(moment: datetime) -> datetime:
+    minute = (moment.hour * 60 + moment.minute) // BUCKET_MINUTES * BUCKET_MINUTES
+    return moment.replace(hour=minute // 60, minute=minute % 60, second=0, microsecond=0)
+
+
+class PollScheduler:
+    """
+    Adaptive replacement for get_next_check_time
+
+    Openings seen at each poll are spread over the time since the previous poll
+    and added to decaying per-bucket counts, for the week and for the day. Poll
+    density follows the square root of the learned opening rate, which minimises
+    the expected delay to detection for a fixed number of polls; a share of the
+    budget stays spread evenly so unexpected cancellations are still found.
+    """
+
+    def __init__(self, requests_per_day: Optional[float] = None, polls_per_day: Optional[float] = None,
+                 requests_per_poll: int = 1,
+                 is_quiet: Callable[[datetime], bool] = lambda moment: False,
+                 min_interval: float = 60, max_interval: float = 3600, half_life_days: float = 14,
+                 uniform_share: float = 0.25, logger: Optional[logging.Logger] = None):
+        """
+        Initialize the scheduler
+
+        Args:
+            requests_per_day: Upstream requests to spend per day
+            polls_per_day: Polls to spend per day when there is no request budget
+            requests_per_poll: Requests one poll costs (one per court)
+            is_quiet: Returns True for times that must not be polled
+            min_interval: Shortest gap between polls in seconds
+            max_interval: Longest gap between polls outside quiet hours in seconds, when
+                the budget allows it
+            half_life_days: Age at which an observed opening counts half
+            uniform_share: Fraction of the budget spread evenly over active time
+            logger: Optional logger instance
+        """
+        self.requests_per_day = requests_per_day
+        self.polls_per_day = polls_per_day
+        self.requests_per_poll = max(1, requests_per_poll)
+        self.is_quiet = is_quiet
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.half_life_days = half_life_days
+        self.uniform_share = uniform_share
+        self.logger = logger or logging.getLogger(__name__)
+        self.weekly = [0.0] * BUCKETS_PER_WEEK
+        self.daily = [0.0] * BUCKETS_PER_DAY
+        self.last_poll: Optional[datetime] = None
+        self._decayed_at: Optional[datetime] = None
+        self._intervals: Optional[List[Optional[float]]] = None
+
+    @classmethod
+    def from_env(cls, check_interval_minutes: int, requests_per_poll: int = 1,
+                 is_quiet: Callable[[datetime], bool] = lambda moment: False,
+                 logger: Optional[logging.Logger] = None) -> Optional['PollScheduler']:
+        """
+        Build from POLL_SCHEDULER, POLL_REQUEST_BUDGET_PER_DAY and POLL_MIN_INTERVAL_SECONDS
+
+        Without a budget the scheduler spends what the fixed check interval would.
+
+        Returns:
+            PollScheduler, or None unless POLL_SCHEDULER is 'adaptive'
+        """
+        if (os.getenv('POLL_SCHEDULER') or 'fixed').strip().lower() != 'adaptive':
+            return None
+        budget_str = os.getenv('POLL_REQUEST_BUDGET_PER_DAY')
+        min_interval_str = os.getenv('POLL_MIN_INTERVAL_SECONDS')
+        scheduler = cls(float(budget_str) if budget_str else None, requests_per_poll=requests_per_poll,
+                        is_quiet=is_quiet, logger=logger,
+                        **({'min_interval': float(min_interval_str)} if min_interval_str else {}))
+        if not budget_str:
+            scheduler.polls_per_day = scheduler.active_seconds() / (check_interval_minutes * 60)
+        return scheduler
+
+    def set_requests_per_poll(self, requests_per_poll: int):
+        """Update the cost of one poll, e.g. when courts are added to court-info.json"""
+        requests_per_poll = max(1, requests_per_poll)
+        if requests_per_poll != self.requests_per_poll:
+            self.requests_per_poll = requests_per_poll
+            self._intervals = None
+
+    def polls_per_day_budget(self) -> float:
+        if self.requests_per_day is not None:
+            return self.requests_per_day / self.requests_per_poll
+        return self.polls_per_day or 0.0
+
+    def active_seconds(self) -> float:
+        """Seconds per day outside quiet hours"""
+        return sum(BUCKET_MINUTES * 60 for b in range(BUCKETS_PER_DAY) if not self._bucket_quiet(b))
+
+    def _bucket_quiet(self, bucket: int) -> bool:
+        # Any Monday will do for the time of day; the quiet hours do not depend on the weekday
+        day, index = divmod(bucket, BUCKETS_PER_DAY)
+        minute = index * BUCKET_MINUTES
+        return self.is_quiet(datetime(2024, 1, 1 + day, minute // 60, minute % 60))
+
+    def _decay(self, now: datetime):
+        if self._decayed_at is not None and now > self._decayed_at:
+            factor = 0.5 ** ((now - self._decayed_at).total_seconds() / 86400 / self.half_life_days)
+            self.weekly = [w * factor for w in self.weekly]
+            self.daily = [w * factor for w in self.daily]
+        if self._decayed_at is None or now > self._decayed_at:
+            self._decayed_at = now
+
+    def observe(self, now: datetime, opened: int, since: Optional[datetime] = None):
+        """
+        Record the slots that opened between the previous poll and this one
+
+        Args:
+            now: Time of this poll
+            opened: Number of slots that appeared
+            since: Time of the previous poll (defaults to the last observed poll)
+        """
+        since = since or self.last_poll or now
+        since = max(since, now - timedelta(days=1))
+        self.last_poll = now
+        if opened <= 0:
+            return
+
+        self._decay(now)
+        span = (now - since).total_seconds()
+        if span <= 0:
+            self._add(bucket_of(now), opened)
+        else:
+            t = since
+            while t < now:
+                end = min(bucket_start(t) + timedelta(minutes=BUCKET_MINUTES), now)
+                self._add(bucket_of(t), opened * (end - t).total_seconds() / span)
+                t = end
+        self._intervals = None
+
+    def _add(self, bucket: int, weight: float):
+        self.weekly[bucket] += weight
+        self.daily[bucket % BUCKETS_PER_DAY] += weight
+
+    def learn_from_events(self, events: Iterable):
+        """
+        Replay opening events from the slot event log
+
+        Args:
+            events: SlotEvent tuples in time order
+        """
+        counts = {}
+        for event in events:
+            if event.opened:
+                counts[event.timestamp] = counts.get(event.timestamp, 0) + 1
+        # Quiet polls are not logged, so assume the previous poll was at most one long interval earlier
+        previous = None
+        for timestamp in sorted(counts):
+            moment = datetime.fromtimestamp(timestamp)
+            earliest = moment - timedelta(seconds=self.max_interval)
+            self.observe(moment, counts[timestamp], since=max(previous, earliest) if previous else earliest)
+            previous = moment
+        self.last_poll = None
+
+    def _rates(self) -> List[float]:
+        # Weekly pattern plus the same time on other days, so a daily release is learned in days, not weeks
+        return [self.weekly[b] + self.daily[b % BUCKETS_PER_DAY] / 7 for b in range(BUCKETS_PER_WEEK)]
+
+    def intervals(self) -> List[Optional[float]]:
+        """Seconds between polls for every bucket of the week; None when the bucket is not polled"""
+        if self._intervals is not None:
+            return self._intervals
+
+        active = [b for b in range(BUCKETS_PER_WEEK) if not self._bucket_quiet(b)]
+        polls_per_week = self.polls_per_day_budget() * 7
+        bucket_seconds = BUCKET_MINUTES * 60
+        rates = self._rates()
+        roots = {b: math.sqrt(rates[b]) for b in active}
+        total_root = sum(roots.values())
+        shares = {
+            b: self.uniform_share / len(active) + (1 - self.uniform_share) * roots[b] / total_root
+            if total_root > 0 else 1 / len(active)
+            for b in active
+        }
+
+        # Water-fill the budget: buckets pinned at the shortest interval hand their surplus
+        # to the rest, and the longest interval is only guaranteed if the budget covers it
+        most = bucket_seconds / self.min_interval
+        least = bucket_seconds / self.max_interval
+        if least * len(active) > polls_per_week:
+            least = 0.0
+        polls = {}
+        pinned = {}
+        while True:
+            free = [b for b in active if b not in pinned]
+            remaining = polls_per_week - sum(pinned.values())
+            free_share = sum(shares[b] for b in free)
+            polls = {b: remaining * shares[b] / free_share if free_share > 0 else 0.0 for b in free}
+            newly_pinned = {b: most for b, p in polls.items() if p > most}
+            if not newly_pinned:
+                newly_pinned = {b: least for b, p in polls.items() if p < least}
+            if not newly_pinned:
+                break
+            pinned.update(newly_pinned)
+        polls.update(pinned)
+
+        intervals: List[Optional[float]] = [None] * BUCKETS_PER_WEEK
+        for b in active:
+            intervals[b] = bucket_seconds / polls[b] if polls[b] > 0 else None
+        self._intervals = intervals
+        return intervals
+
+    def next_check_time(self, now: datetime) -> datetime:
+        """
+        When to poll next: one poll's worth of the scheduled poll rate from now
+
+        Walks forward bucket by bucket, so a busy window starting soon pulls the
+        next poll into it and a quiet period is skipped entirely.
+        """
+        intervals = self.intervals()
+        needed = 1.0
+        t = now
+        horizon = now + timedelta(days=8)
+        while t < horizon:
+            end = bucket_start(t) + timedelta(minutes=BUCKET_MINUTES)
+            interval = intervals[bucket_of(t)]
+            if interval is not None:
+                available = (end - t).total_seconds() / interval
+                if available >= needed:
+                    return t + timedelta(seconds=needed * interval)
+                needed -= available
+            t = end
+        return now + timedelta(seconds=self.max_interval)
+
+    def hottest(self, count: int = 3) -> List[str]:
+        """Labels of the busiest learned windows, for logging"""
+        rates = self._rates()
+        top = sorted(range(BUCKETS_PER_WEEK), key=lambda b: -rates[b])[:count]
+        labels = []
+        for b in top:
+            if rates[b] <= 0:
+                break
+            day, index = divmod(b, BUCKETS_PER_DAY)
+            minute = index * BUCKET_MINUTES
+            weekday = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')[day]
+            labels.append(f"{weekday} {minute // 60:02d}:{minute % 60:02d}")
+        return labels
@@ -0,0 +1,89 @@
+"""
+Request Planner
+Plans the fewest FacilityAvailability requests that cover a date horizon and merges their slots
+"""
+
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Most days a single FacilityAvailability request returns
+MAX_DAYS_PER_REQUEST = 7
+
+
+class RequestWindow(NamedTuple):
+    """One FacilityAvailability request"""
+    facility_id: str
+    date: str        # First day, YYYY-MM-DD
+    days_count: int
+    duration: int    # Minutes
+
+
+def plan_requests(facility_ids: Iterable[str], horizon_days: int, durations: Iterable[int] = (60,),
+                  start_date: Optional[date] = None,
+                  max_days_per_request: int = MAX_DAYS_PER_REQUEST) -> List[RequestWindow]:
+    """
+    Tile the horizon into back-to-back windows for every facility and duration
+
+    Windows never overlap and the last one only asks for the days that are left,
+    so each (facility, duration) costs ceil(horizon_days / max_days_per_request) requests.
+
+    Args:
+        facility_ids: Facilities to cover
+        horizon_days: Number of days to cover, starting at start_date
+        durations: Booking durations in minutes; duplicates are ignored
+        start_date: First day to cover (defaults to today)
+        max_days_per_request: Most days one request can return
+
+    Returns:
+        List of RequestWindow, grouped by facility then duration then date
+    """
+    if horizon_days <= 0:
+        return []
+
+    start_date = start_date or date.today()
+    unique_durations = list(dict.fromkeys(durations))
+    windows = []
+
+    for facility_id in dict.fromkeys(facility_ids):
+        for duration in unique_durations:
+            offset = 0
+            while offset < horizon_days:
+                days_count = min(max_days_per_request, horizon_days - offset)
+                window_start = start_date + timedelta(days=offset)
+                windows.append(RequestWindow(facility_id, window_start.isoformat(), days_count, duration))
+                offset += days_count
+
+    return windows
+
+
+def merge_window_slots(window_slots: Iterable[Tuple[RequestWindow, List[dict]]],
+                       start_date: Optional[date] = None,
+                       horizon_days: Optional[int] = None) -> Dict[str, List[dict]]:
+    """
+    Merge parsed slots from several windows, dropping duplicates at window boundaries
+
+    Args:
+        window_slots: Pairs of (window, slots parsed from its response)
+        start_date: First day of the horizon; slots before it are dropped if given
+        horizon_days: Length of the horizon; slots after it are dropped if given
+
+    Returns:
+        Dict of facility_id to slots sorted by date, time and duration
+    """
+    first_day = start_date.isoformat() if start_date else None
+    last_day = (start_date + timedelta(days=horizon_days - 1)).isoformat() \
+        if start_date and horizon_days else None
+
+    merged = {}
+    for window, slots in window_slots:
+        facility_slots = merged.setdefault(window.facility_id, {})
+        for slot in slots:
+            slot_date = slot['date']
+            if first_day and slot_date < first_day or last_day and slot_date > last_day:
+                continue
+            facility_slots.setdefault((slot_date, slot['time'], slot['duration']), slot)
+
+    def order(key):
+        return key[0], key[1], int(key[2].replace('min', '') or 0)
+
+    return {facility_id: [slots[key] for key in sorted(slots, key=order)] for facility_id, slots in merged.items()}
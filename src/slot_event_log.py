@@ -0,0 +1,268 @@
+"""
+Slot Event Log
+Append-only fixed-width binary log of slots opening, closing and expiring, read back through mmap
+"""
+
+import calendar
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Iterator, List, NamedTuple, Optional
+
+from .slot_table import SlotTable
+from .time_conversion import TORONTO_TZ
+
+MAGIC = b'SLEV'
+VERSION = 1
+# magic, version, record size
+HEADER = struct.Struct('<4sHH')
+# timestamp (epoch seconds), facility index, date (days since 1970-01-01), start minute,
+# duration minutes, event kind, padding
+RECORD = struct.Struct('<IHHHHBx')
+
+# Event kinds; an expired slot disappeared because its start time passed, which
+# is also how a whole day drops out of the horizon, not because it was booked
+CLOSED = 0
+OPENED = 1
+EXPIRED = 2
+
+EPOCH = date(1970, 1, 1)
+FACILITIES_FILE = 'facilities.txt'
+SEGMENT_PREFIX = 'events-'
+SEGMENT_SUFFIX = '.bin'
+
+
+class SlotEvent(NamedTuple):
+    """One slot opening, closing or expiring"""
+    timestamp: int
+    facility: str
+    date: str
+    start: int
+    duration: int
+    opened: bool
+    expired: bool = False
+
+
+def _day_number(date_str: str) -> Optional[int]:
+    """Days since 1970-01-01, or None for an undated slot such as 'Unknown'"""
+    try:
+        return (date.fromisoformat(date_str) - EPOCH).days
+    except (ValueError, TypeError):
+        return None
+
+
+def iter_records(path: str) -> Iterator[tuple]:
+    """
+    Raw (timestamp, facility index, day number, start, duration, kind) tuples of one segment
+
+    A record cut short by a crash at the end of the file is ignored.
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size <= HEADER.size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            magic, version, record_size = HEADER.unpack_from(mm)
+            if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+                raise ValueError(f"{path} is not a version {VERSION} slot event log")
+            end = HEADER.size + (size - HEADER.size) // RECORD.size * RECORD.size
+            view = memoryview(mm)[HEADER.size:end]
+            try:
+                yield from RECORD.iter_unpack(view)
+            finally:
+                view.release()
+
+
+def _segment_started_at(path: str) -> float:
+    """Creation time encoded in a segment's name"""
+    stamp = os.path.basename(path)[len(SEGMENT_PREFIX):len(SEGMENT_PREFIX) + 15]
+    try:
+        return float(calendar.timegm(time.strptime(stamp, '%Y%m%dT%H%M%S')))
+    except ValueError:
+        return time.time()
+
+
+class SlotEventLog:
+    """Directory of size- and age-rotated event segments plus a facility name table"""
+
+    def __init__(self, directory: str, max_bytes: int = 16 * 1024 * 1024, max_age: float = 24 * 3600,
+                 max_segments: Optional[int] = None, logger: Optional[logging.Logger] = None):
+        """
+        Open or create the log
+
+        Args:
+            directory: Where segments and the facility table are kept
+            max_bytes: Start a new segment once the current one reaches this size
+            max_age: Start a new segment once the current one is this many seconds old
+            max_segments: Oldest segments are removed beyond this many; None keeps all
+            logger: Optional logger instance
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.max_segments = max_segments
+        self.logger = logger or logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        self._facilities: List[str] = []
+        self._facility_index = {}
+        facilities_path = os.path.join(directory, FACILITIES_FILE)
+        if os.path.exists(facilities_path):
+            with open(facilities_path, 'r', encoding='utf-8') as f:
+                for line in f.read().splitlines():
+                    self._facility_index[line] = len(self._facilities)
+                    self._facilities.append(line)
+        self._facilities_file = open(facilities_path, 'a', encoding='utf-8')
+
+        self._segment = None
+        self._segment_started = 0.0
+        segments = self.segments()
+        if segments:
+            self._open_segment(segments[-1])
+
+    @classmethod
+    def from_env(cls, logger: Optional[logging.Logger] = None) -> Optional['SlotEventLog']:
+        """
+        Build from SLOT_EVENT_LOG_DIR, SLOT_EVENT_LOG_MAX_BYTES and SLOT_EVENT_LOG_MAX_AGE_HOURS
+
+        Returns:
+            SlotEventLog, or None when SLOT_EVENT_LOG_DIR is not set
+        """
+        directory = os.getenv('SLOT_EVENT_LOG_DIR')
+        if not directory:
+            return None
+        max_bytes_str = os.getenv('SLOT_EVENT_LOG_MAX_BYTES')
+        max_age_str = os.getenv('SLOT_EVENT_LOG_MAX_AGE_HOURS')
+        kwargs = {}
+        if max_bytes_str:
+            kwargs['max_bytes'] = int(max_bytes_str)
+        if max_age_str:
+            kwargs['max_age'] = float(max_age_str) * 3600
+        return cls(directory, logger=logger, **kwargs)
+
+    def segments(self) -> List[str]:
+        """Segment paths, oldest first"""
+        names = sorted(name for name in os.listdir(self.directory)
+                       if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX))
+        return [os.path.join(self.directory, name) for name in names]
+
+    def _open_segment(self, path: str):
+        self._segment = open(path, 'ab')
+        size = self._segment.tell()
+        if size < HEADER.size:
+            self._segment.truncate(0)
+            self._segment.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+        elif (size - HEADER.size) % RECORD.size:
+            # Drop a record cut short by a crash so later records stay aligned
+            self._segment.truncate(size - (size - HEADER.size) % RECORD.size)
+        self._segment_started = _segment_started_at(path)
+
+    def _rotate_if_needed(self, now: float, incoming: int):
+        if self._segment is not None:
+            size = self._segment.tell()
+            if size + incoming <= self.max_bytes and now - self._segment_started < self.max_age:
+                return
+            self._segment.close()
+
+        # Nanosecond suffix keeps names unique and ordered when rotating within a second
+        stamp = time.strftime('%Y%m%dT%H%M%S', time.gmtime(now))
+        name = f"{SEGMENT_PREFIX}{stamp}-{time.time_ns() % 10**9:09d}{SEGMENT_SUFFIX}"
+        self._open_segment(os.path.join(self.directory, name))
+
+        if self.max_segments:
+            for path in self.segments()[:-self.max_segments]:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    self.logger.warning("Could not remove old slot event segment %s: %s", path, e)
+
+    def _facility_number(self, facility: str) -> int:
+        index = self._facility_index.get(facility)
+        if index is None:
+            index = len(self._facilities)
+            self._facilities.append(facility)
+            self._facility_index[facility] = index
+            self._facilities_file.write(facility + '\n')
+            self._facilities_file.flush()
+        return index
+
+    def append_diff(self, appeared: SlotTable, disappeared: SlotTable,
+                    facility_of: Callable[[object], Optional[str]] = lambda court: None,
+                    timestamp: Optional[float] = None) -> int:
+        """
+        Append one cycle's openings and closings
+
+        A disappeared slot whose start is not after the cycle's time (in Toronto)
+        is logged as expired rather than closed. Undated slots are skipped.
+
+        Args:
+            appeared: Slots that opened this cycle
+            disappeared: Slots that closed this cycle
+            facility_of: Maps a slot's court to its facility ID; the court label is
+                used when it returns None
+            timestamp: Epoch seconds of the cycle (defaults to now)
+
+        Returns:
+            Number of records written
+        """
+        now = time.time() if timestamp is None else timestamp
+        seconds = int(now)
+        local = datetime.fromtimestamp(now, TORONTO_TZ)
+        expired_before = (local.date().isoformat(), local.hour * 60 + local.minute)
+        skipped = 0
+        with self._lock:
+            chunks = []
+            for table, opened in ((appeared, True), (disappeared, False)):
+                for i in range(len(table)):
+                    day = _day_number(table.dates[i])
+                    if day is None:
+                        skipped += 1
+                        continue
+                    if opened:
+                        kind = OPENED
+                    else:
+                        kind = EXPIRED if (table.dates[i], table.starts[i]) <= expired_before else CLOSED
+                    court = table.courts[i]
+                    facility = facility_of(court) or str(court)
+                    chunks.append(RECORD.pack(seconds, self._facility_number(facility), day,
+                                              table.starts[i], table.durations[i], kind))
+            if skipped:
+                self.logger.debug("Skipped %d undated slot(s) in the event log", skipped)
+            if not chunks:
+                return 0
+            data = b''.join(chunks)
+            self._rotate_if_needed(now, len(data))
+            self._segment.write(data)
+            self._segment.flush()
+        return len(chunks)
+
+    def events(self, since: Optional[float] = None) -> Iterator[SlotEvent]:
+        """
+        Every event in the log, oldest first
+
+        Args:
+            since: Skip events before this epoch second
+        """
+        with self._lock:
+            if self._segment is not None:
+                self._segment.flush()
+            facilities = list(self._facilities)
+            segments = self.segments()
+        for path in segments:
+            for seconds, facility, day, start, duration, kind in iter_records(path):
+                if since is not None and seconds < since:
+                    continue
+                yield SlotEvent(seconds, facilities[facility], (EPOCH + timedelta(days=day)).isoformat(),
+                                start, duration, kind == OPENED, kind == EXPIRED)
+
+    def close(self):
+        with self._lock:
+            if self._segment is not None:
+                self._segment.close()
+                self._segment = None
+            self._facilities_file.close()
@@ -0,0 +1,147 @@
+"""
+Slot State
+Durable record of the slots open after the last cycle, so restarts do not re-alert them
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from typing import Iterable, Optional, Tuple
+
+from .slot_table import NO_TICKS, SlotTable
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS slots (
+    date TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    court NOT NULL,
+    duration INTEGER NOT NULL,
+    grp TEXT NOT NULL,
+    ticks INTEGER NOT NULL,
+    first_seen INTEGER NOT NULL,
+    last_seen INTEGER NOT NULL,
+    PRIMARY KEY (date, start, court)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS slots_first_seen ON slots (first_seen);
+CREATE INDEX IF NOT EXISTS slots_last_seen ON slots (last_seen);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+UPSERT = """
+INSERT INTO slots (date, start, court, duration, grp, ticks, first_seen, last_seen)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (date, start, court) DO UPDATE SET
+    duration = excluded.duration, grp = excluded.grp, ticks = excluded.ticks, last_seen = excluded.last_seen
+"""
+
+# Courts that could not be checked keep their rows, as if seen again
+CARRY_FORWARD = "UPDATE slots SET last_seen = ? WHERE court = ?"
+
+# Rows inserted this cycle appeared; rows not touched this cycle disappeared
+CHANGES = """
+SELECT date, start, court, duration, grp, ticks, first_seen = :cycle
+FROM slots
+WHERE first_seen = :cycle OR last_seen < :cycle
+ORDER BY date, start, court
+"""
+
+
+class SlotStateStore:
+    """SQLite (WAL) table of open slots keyed by (date, start minute, court)"""
+
+    def __init__(self, path: str = '.slot_state.sqlite3', logger: Optional[logging.Logger] = None):
+        """
+        Open or create the store
+
+        Args:
+            path: SQLite database file, or ':memory:'
+            logger: Optional logger instance
+        """
+        self.path = path
+        self.logger = logger or logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        # Every commit is durable after a crash of the process; NORMAL only risks the
+        # last commit on power loss, which the next cycle re-applies anyway
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'cycle'").fetchone()
+        self.cycle = row[0] if row else 0
+
+    @classmethod
+    def from_env(cls, logger: Optional[logging.Logger] = None) -> 'SlotStateStore':
+        """Build a store at SLOT_STATE_PATH (default .slot_state.sqlite3)"""
+        return cls(os.getenv('SLOT_STATE_PATH') or '.slot_state.sqlite3', logger=logger)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM slots').fetchone()[0]
+
+    def load(self) -> SlotTable:
+        """Slots open after the last applied cycle"""
+        table = SlotTable()
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT date, start, duration, court, grp, ticks FROM slots ORDER BY date, start, court').fetchall()
+        for date, start, duration, court, group, ticks in rows:
+            table.append(date, start, duration, court, group, None if ticks == NO_TICKS else ticks)
+        return table
+
+    def apply(self, current: SlotTable, unobserved_courts: Iterable = ()) -> Tuple[SlotTable, SlotTable]:
+        """
+        Replace the stored slots with this cycle's slots in one transaction
+
+        Args:
+            current: Every slot open in this cycle
+            unobserved_courts: Courts whose check failed this cycle; their stored
+                slots are carried forward rather than reported as disappeared
+
+        Returns:
+            Tuple of (appeared, disappeared) tables, sorted by date, start and court
+        """
+        with self._lock:
+            cycle = self.cycle + 1
+            rows = zip(current.dates, current.starts, current.courts, current.durations,
+                       current.groups, current.ticks, [cycle] * len(current), [cycle] * len(current))
+            conn = self._conn
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.executemany(UPSERT, rows)
+                conn.executemany(CARRY_FORWARD, [(cycle, court) for court in unobserved_courts])
+                changes = conn.execute(CHANGES, {'cycle': cycle}).fetchall()
+                conn.execute('DELETE FROM slots WHERE last_seen < ?', (cycle,))
+                conn.execute("INSERT INTO meta (key, value) VALUES ('cycle', ?) "
+                             "ON CONFLICT (key) DO UPDATE SET value = excluded.value", (cycle,))
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            self.cycle = cycle
+
+        appeared, disappeared = SlotTable(), SlotTable()
+        for date, start, court, duration, group, ticks, is_new in changes:
+            (appeared if is_new else disappeared).append(
+                date, start, duration, court, group, None if ticks == NO_TICKS else ticks)
+        return appeared, disappeared
+
+    def checkpoint(self):
+        """Fold the write-ahead log into the database file"""
+        with self._lock:
+            self._conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+    def close(self):
+        """Checkpoint and close; safe to call more than once"""
+        if self._conn is None:
+            return
+        try:
+            self.checkpoint()
+        except sqlite3.Error as e:
+            self.logger.warning("Slot state checkpoint failed: %s", e)
+        with self._lock:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,232 @@
+"""
+Slot Table
+Columnar storage for available slots: one array per field instead of one dict per slot
+"""
+
+import sys
+from array import array
+from itertools import compress
+from operator import not_
+from typing import Callable, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .time_conversion import duration_label, format_minute, minute_of_day, weekday_abbr
+
+# Ticks are unknown for slots built from dicts without them
+NO_TICKS = -1
+
+
+class SlotRow:
+    """Read-only view of one slot that supports the legacy slot dict keys"""
+
+    __slots__ = ('table', 'index')
+
+    KEYS = ('date', 'time', 'duration', 'court', 'group', 'ticks', 'formatted')
+
+    def __init__(self, table: 'SlotTable', index: int):
+        self.table = table
+        self.index = index
+
+    def __getitem__(self, key):
+        table, i = self.table, self.index
+        if key == 'date':
+            return table.dates[i]
+        if key == 'time':
+            return format_minute(table.starts[i])
+        if key == 'duration':
+            return duration_label(table.durations[i])
+        if key == 'court':
+            return table.courts[i]
+        if key == 'group':
+            return table.groups[i]
+        if key == 'ticks':
+            ticks = table.ticks[i]
+            return None if ticks == NO_TICKS else ticks
+        if key == 'formatted':
+            return table.formatted(i)
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self.KEYS
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return self.KEYS
+
+    def key(self) -> Tuple[str, int, int]:
+        """Compact identity of the slot: (date, start minute, court)"""
+        return self.table.key(self.index)
+
+    def to_dict(self) -> dict:
+        return {key: self[key] for key in self.KEYS}
+
+    def __eq__(self, other):
+        if isinstance(other, SlotRow):
+            return self.table.row_tuple(self.index) == other.table.row_tuple(other.index)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"SlotRow({self.to_dict()!r})"
+
+
+class SlotTable:
+    """Parallel arrays of slot fields with sorting, filtering and diff operations"""
+
+    __slots__ = ('dates', 'starts', 'durations', 'courts', 'groups', 'ticks')
+
+    def __init__(self):
+        self.dates = []              # Interned 'YYYY-MM-DD' strings
+        self.starts = array('H')     # Start, minutes after midnight
+        self.durations = array('H')  # Duration in minutes
+        self.courts = []             # Court numbers from court-info.json
+        self.groups = []             # Interned booking group names
+        self.ticks = array('q')      # Server ticks, NO_TICKS if unknown
+
+    def append(self, date: str, start: int, duration: int, court, group: str = '', ticks: Optional[int] = None):
+        """Add one slot"""
+        self.dates.append(sys.intern(date))
+        self.starts.append(start)
+        self.durations.append(duration)
+        self.courts.append(court)
+        self.groups.append(sys.intern(group))
+        self.ticks.append(NO_TICKS if ticks is None else ticks)
+
+    def extend_slots(self, slots: Iterable[dict], court):
+        """
+        Add slots in the dict form returned by parse_availability_data
+
+        Args:
+            slots: Slot dicts with 'date', 'time' and 'duration' keys
+            court: Court number the slots belong to
+        """
+        for slot in slots:
+            duration_str = slot.get('duration') or '60min'
+            self.append(
+                slot.get('date', ''),
+                minute_of_day(slot['time']),
+                int(duration_str.replace('min', '')),
+                court,
+                slot.get('group') or '',
+                slot.get('ticks')
+            )
+
+    def extend(self, other: 'SlotTable'):
+        """Append every slot of another table"""
+        self.dates.extend(other.dates)
+        self.starts.extend(other.starts)
+        self.durations.extend(other.durations)
+        self.courts.extend(other.courts)
+        self.groups.extend(other.groups)
+        self.ticks.extend(other.ticks)
+
+    @classmethod
+    def concat(cls, tables: Iterable['SlotTable']) -> 'SlotTable':
+        """Combine several tables into a new one"""
+        combined = cls()
+        for table in tables:
+            combined.extend(table)
+        return combined
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, index: int) -> SlotRow:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return SlotRow(self, index)
+
+    def __iter__(self) -> Iterator[SlotRow]:
+        for i in range(len(self)):
+            yield SlotRow(self, i)
+
+    def __eq__(self, other):
+        if not isinstance(other, SlotTable):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return f"SlotTable({len(self)} slots)"
+
+    def row_tuple(self, i: int) -> tuple:
+        return (self.dates[i], self.starts[i], self.durations[i], self.courts[i], self.groups[i], self.ticks[i])
+
+    def key(self, i: int) -> Tuple[str, int, int]:
+        """Compact identity of slot i: (date, start minute, court)"""
+        return (self.dates[i], self.starts[i], self.courts[i])
+
+    def keys(self) -> Set[Tuple[str, int, int]]:
+        """Identities of every slot"""
+        return set(zip(self.dates, self.starts, self.courts))
+
+    def formatted(self, i: int) -> str:
+        """Format slot i as: date (Day) start_time-end_time court X"""
+        date = self.dates[i]
+        start = self.starts[i]
+        weekday = weekday_abbr(date)
+        times = f"{format_minute(start)}-{format_minute(start + self.durations[i])}"
+        if weekday:
+            return f"{date} {weekday} {times} court {self.courts[i]}"
+        return f"{date} {times} court {self.courts[i]}"
+
+    def iter_formatted(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self.formatted(i)
+
+    def take(self, indices: Iterable[int]) -> 'SlotTable':
+        """Return a new table with the given rows, in the given order"""
+        taken = SlotTable()
+        indices = list(indices)
+        # map() over __getitem__ gathers each column without a Python-level loop
+        taken.dates = list(map(self.dates.__getitem__, indices))
+        taken.starts = array('H', map(self.starts.__getitem__, indices))
+        taken.durations = array('H', map(self.durations.__getitem__, indices))
+        taken.courts = list(map(self.courts.__getitem__, indices))
+        taken.groups = list(map(self.groups.__getitem__, indices))
+        taken.ticks = array('q', map(self.ticks.__getitem__, indices))
+        return taken
+
+    def sorted(self) -> 'SlotTable':
+        """Return a copy sorted by date, start time and court, then duration"""
+        ordered = SlotTable()
+        # Sorting whole rows keeps every comparison in C; a key function per index does not
+        rows = sorted(zip(self.dates, self.starts, self.courts, self.durations, self.groups, self.ticks))
+        if rows:
+            dates, starts, courts, durations, groups, ticks = zip(*rows)
+            ordered.dates = list(dates)
+            ordered.starts = array('H', starts)
+            ordered.courts = list(courts)
+            ordered.durations = array('H', durations)
+            ordered.groups = list(groups)
+            ordered.ticks = array('q', ticks)
+        return ordered
+
+    def filter(self, predicate: Callable[[SlotRow], bool]) -> 'SlotTable':
+        """Return the rows for which predicate(row) is true"""
+        return self.take(i for i in range(len(self)) if predicate(SlotRow(self, i)))
+
+    def diff(self, previous: 'SlotTable') -> Tuple['SlotTable', 'SlotTable']:
+        """
+        Compare against an earlier table by (date, start, court)
+
+        Args:
+            previous: Table from the previous check
+
+        Returns:
+            Tuple of (appeared, disappeared) tables
+        """
+        return self._missing_from(previous.keys()), previous._missing_from(self.keys())
+
+    def _missing_from(self, keys: Set[Tuple[str, int, int]]) -> 'SlotTable':
+        """Rows whose (date, start, court) is not in keys"""
+        present = map(keys.__contains__, zip(self.dates, self.starts, self.courts))
+        return self.take(compress(range(len(self)), map(not_, present)))
+
+    def to_dicts(self) -> List[dict]:
+        """Expand to the legacy list of slot dicts"""
+        return [row.to_dict() for row in self]
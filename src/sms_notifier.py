@@ -18,12 +18,13 @@ load_dotenv()
 class SMSNotifier:
     """SMS notification service using Twilio"""
 
-    def __init__(self, logger: Optional[logging.Logger] = None):
+    def __init__(self, logger: Optional[logging.Logger] = None, to_number: Optional[str] = None):
         """
         Initialize SMS notifier with Twilio credentials
 
         Args:
             logger: Optional logger instance
+            to_number: Recipient phone number (defaults to TWILIO_TO_PHONE_NUMBER)
         """
         self.logger = logger or logging.getLogger(__name__)
 
@@ -32,7 +33,7 @@ class SMSNotifier:
         self.auth_token = os.getenv('TWILIO_AUTH_TOKEN')
         self.messaging_service_sid = os.getenv('TWILIO_MESSAGING_SERVICE_SID')
         self.from_number = os.getenv('TWILIO_PHONE_NUMBER')  # Fallback if no messaging service
-        self.to_number = os.getenv('TWILIO_TO_PHONE_NUMBER')
+        self.to_number = to_number or os.getenv('TWILIO_TO_PHONE_NUMBER')
 
         # Validate credentials
         # Either messaging_service_sid OR from_number is required
@@ -139,4 +140,3 @@ class SMSNotifier:
 
         message = self.format_message(slots)
         return self.send_sms(message)
-
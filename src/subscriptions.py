@@ -0,0 +1,205 @@
+"""
+Subscriptions
+Registry of members' watch specs and an index that matches new slots to the members who want them
+"""
+
+import json
+import logging
+import os
+from array import array
+from bisect import bisect_right
+from datetime import date
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .slot_table import SlotTable
+from .time_conversion import MINUTES_PER_DAY
+from .watch_spec import WatchSpec
+
+
+class Subscription(NamedTuple):
+    """One member and the slots they want to hear about"""
+    name: str
+    phone: str
+    watch: WatchSpec
+
+
+class SubscriptionIndex:
+    """
+    Per-weekday interval index over the subscriptions' time ranges
+
+    The distinct range boundaries of a weekday cut the day into segments; each
+    segment lists the (end, subscription) of every range covering it, longest
+    reaching first. A slot finds its segment by bisection and reads the list
+    until the ranges end before the slot does, so the work per slot grows with
+    the number of matches, not with the number of subscriptions.
+    """
+
+    def __init__(self, subscriptions: Iterable[Subscription]):
+        self.subscriptions = list(subscriptions)
+        self._bounds: List[array] = []
+        self._segments: List[List[List[Tuple[int, int]]]] = []
+
+        ranges_by_weekday = [[] for _ in range(7)]
+        for i, subscription in enumerate(self.subscriptions):
+            ranges = subscription.watch.time_ranges or ((0, MINUTES_PER_DAY),)
+            for weekday in subscription.watch.weekdays:
+                ranges_by_weekday[weekday].extend((start, end, i) for start, end in ranges)
+
+        for ranges in ranges_by_weekday:
+            bounds = array('H', sorted({minute for start, end, _ in ranges for minute in (start, end)}))
+            segments = [[] for _ in range(max(0, len(bounds) - 1))]
+            for start, end, i in ranges:
+                for segment in range(bisect_right(bounds, start) - 1, bisect_right(bounds, end) - 1):
+                    segments[segment].append((end, i))
+            for segment in segments:
+                segment.sort(reverse=True)
+            self._bounds.append(bounds)
+            self._segments.append(segments)
+
+    def __len__(self):
+        return len(self.subscriptions)
+
+    def candidates(self, weekday: int, start: int, duration: int) -> List[int]:
+        """Indexes of the subscriptions with a time range on this weekday holding the whole slot"""
+        bounds = self._bounds[weekday]
+        segment = bisect_right(bounds, start) - 1
+        if segment < 0 or segment >= len(self._segments[weekday]):
+            return []
+        end = start + duration
+        found = []
+        for range_end, i in self._segments[weekday][segment]:
+            if range_end < end:
+                break
+            found.append(i)
+        return found
+
+    def match(self, table: SlotTable, today: date) -> List[Tuple[Subscription, SlotTable]]:
+        """
+        Match slots to subscriptions
+
+        Args:
+            table: Slots to match, usually the new slots of a cycle
+            today: Day the subscriptions' horizons count from
+
+        Returns:
+            (subscription, slots it wants) pairs, in registry order, for every
+            subscription that wants at least one slot
+        """
+        days: Dict[str, Optional[Tuple[int, int]]] = {}
+        rows: Dict[int, List[int]] = {}
+        dates, starts, durations, courts = table.dates, table.starts, table.durations, table.courts
+        for row in range(len(table)):
+            day = days.get(dates[row], False)
+            if day is False:
+                try:
+                    slot_date = date.fromisoformat(dates[row])
+                    day = days[dates[row]] = (slot_date.weekday(), (slot_date - today).days)
+                except ValueError:
+                    day = days[dates[row]] = None
+            if day is None:
+                continue
+            weekday, days_ahead = day
+            duration = durations[row]
+            for i in set(self.candidates(weekday, starts[row], duration)):
+                watch = self.subscriptions[i].watch
+                if duration < watch.min_duration or (watch.max_duration is not None and duration > watch.max_duration):
+                    continue
+                if watch.horizon_days is not None and days_ahead > watch.horizon_days:
+                    continue
+                if not watch.wants_court(courts[row]):
+                    continue
+                rows.setdefault(i, []).append(row)
+        return [(self.subscriptions[i], table.take(rows[i])) for i in sorted(rows)]
+
+
+def load_subscriptions(config: dict) -> List[Subscription]:
+    """
+    Read subscriptions from a parsed subscriptions file
+
+    The file holds {"subscriptions": [{"name": ..., "phone": ..., "watch": {...}}]},
+    where watch takes the same fields as the watch entry of court-info.json.
+
+    Raises:
+        ValueError: If an entry has no phone number or its watch spec does not parse
+    """
+    subscriptions = []
+    for n, entry in enumerate(config.get('subscriptions') or [], start=1):
+        if not entry.get('phone'):
+            raise ValueError(f"Subscription {n} has no phone number")
+        subscriptions.append(Subscription(
+            name=entry.get('name') or entry['phone'],
+            phone=entry['phone'],
+            watch=WatchSpec.from_config(entry.get('watch')) or WatchSpec()
+        ))
+    return subscriptions
+
+
+class SubscriptionRegistry:
+    """Subscriptions file, reloaded and re-indexed when it changes on disk"""
+
+    def __init__(self, path: str, logger: Optional[logging.Logger] = None):
+        """
+        Initialize the registry
+
+        Args:
+            path: JSON file of subscriptions
+            logger: Optional logger instance
+        """
+        self.path = path
+        self.logger = logger or logging.getLogger(__name__)
+        self.index = SubscriptionIndex([])
+        self._mtime = None
+        self.refresh()
+
+    @classmethod
+    def from_env(cls, logger: Optional[logging.Logger] = None) -> Optional['SubscriptionRegistry']:
+        """
+        Build from SUBSCRIPTIONS_PATH
+
+        Returns:
+            SubscriptionRegistry, or None when SUBSCRIPTIONS_PATH is not set
+        """
+        path = os.getenv('SUBSCRIPTIONS_PATH')
+        if not path:
+            return None
+        return cls(path, logger=logger)
+
+    def __len__(self):
+        return len(self.index)
+
+    def refresh(self) -> bool:
+        """
+        Reload the file if it changed since the last load
+
+        An unreadable or invalid file is logged and the subscriptions loaded
+        before it stay in use.
+
+        Returns:
+            True if the subscriptions were reloaded
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            if self._mtime is None:
+                self.logger.error("Cannot read subscriptions file %s: %s", self.path, e)
+                self._mtime = 0
+            return False
+        if mtime == self._mtime:
+            return False
+
+        try:
+            with open(self.path, 'r') as f:
+                subscriptions = load_subscriptions(json.load(f))
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            self.logger.error("Invalid subscriptions file %s: %s", self.path, e)
+            self._mtime = mtime
+            return False
+
+        self.index = SubscriptionIndex(subscriptions)
+        self._mtime = mtime
+        self.logger.info("Loaded %d subscription(s) from %s", len(subscriptions), self.path)
+        return True
+
+    def match(self, table: SlotTable, today: date) -> List[Tuple[Subscription, SlotTable]]:
+        """Match slots against the current subscriptions; see SubscriptionIndex.match"""
+        return self.index.match(table, today)
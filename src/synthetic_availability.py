@@ -0,0 +1,107 @@
+"""
+Synthetic Availability
+Generates FacilityAvailability responses in the PerfectMind wire format for tests, benchmarks and the stub server
+"""
+
+import json
+import random
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Optional
+
+# .NET ticks are 100ns intervals since 0001-01-01
+TICKS_PER_SECOND = 10_000_000
+TICKS_EPOCH = datetime(1, 1, 1)
+EPOCH = date(1970, 1, 1)
+
+# Default opening hours and spacing of start times, in minutes after midnight
+FIRST_START = 7 * 60
+LAST_END = 22 * 60
+
+
+def time_span(total_minutes: int) -> dict:
+    """Serialize a duration the way the server serializes a .NET TimeSpan"""
+    hours, minutes = divmod(total_minutes, 60)
+    seconds = total_minutes * 60
+    return {
+        'Hours': hours % 24, 'Minutes': minutes, 'Seconds': 0, 'Milliseconds': 0,
+        'Ticks': seconds * TICKS_PER_SECOND, 'Days': hours // 24,
+        'TotalDays': seconds / 86400, 'TotalHours': seconds / 3600,
+        'TotalMilliseconds': seconds * 1000, 'TotalMinutes': total_minutes, 'TotalSeconds': seconds
+    }
+
+
+def date_value(day: date) -> str:
+    """
+    The /Date(ms)/ value the server sends for a day
+
+    The server sends UTC midnight of the day; api_date_to_str maps it back to the same date.
+    """
+    return f"/Date({(day - EPOCH).days * 86400000})/"
+
+
+def group_name(start: int) -> str:
+    """Booking group the server puts a start time in"""
+    if start < 12 * 60:
+        return 'Morning'
+    if start < 17 * 60:
+        return 'Afternoon'
+    return 'Late'
+
+
+def make_spot(day: date, start: int, duration: int, is_disabled: bool = False) -> dict:
+    """Build one AvailableSpots entry"""
+    start_at = datetime(day.year, day.month, day.day) + timedelta(minutes=start)
+    return {
+        'Ticks': int((start_at - TICKS_EPOCH).total_seconds()) * TICKS_PER_SECOND,
+        'Time': time_span(start),
+        'Duration': time_span(duration),
+        'ResourceIds': None,
+        'IsDisabled': is_disabled,
+        'Title': 'Book Now!'
+    }
+
+
+def generate_availability(start_date: date, days_count: int = 7, duration: int = 60,
+                          density: float = 0.5, seed=0, step: int = 60,
+                          first_start: int = FIRST_START, last_end: int = LAST_END,
+                          is_open: Optional[Callable[[date, int], bool]] = None) -> Dict:
+    """
+    Generate a FacilityAvailability response
+
+    Args:
+        start_date: First day of the response
+        days_count: Number of days
+        duration: Booking duration in minutes
+        density: Fraction of start times that are open (ignored when is_open is given)
+        seed: Seed so the same arguments always give the same slots
+        step: Minutes between candidate start times
+        first_start: Earliest start time, minutes after midnight
+        last_end: Latest end time, minutes after midnight
+        is_open: Optional callable (day, start) -> bool deciding each candidate
+
+    Returns:
+        Dict with 'availabilities' and 'extraDaysInfo' like the real endpoint
+    """
+    availabilities = []
+    for offset in range(days_count):
+        day = start_date + timedelta(days=offset)
+        rng = random.Random(f"{seed}:{day.isoformat()}:{duration}")
+        groups = {}
+        for start in range(first_start, last_end - duration + 1, step):
+            open_ = is_open(day, start) if is_open else rng.random() < density
+            if open_:
+                groups.setdefault(group_name(start), []).append(make_spot(day, start, duration))
+        availabilities.append({
+            'Date': date_value(day),
+            'BookingGroups': [
+                {'Name': name, 'Order': order, 'AvailableSpots': spots}
+                for order, (name, spots) in enumerate(groups.items())
+            ]
+        })
+    return {'availabilities': availabilities, 'extraDaysInfo': None}
+
+
+def generate_body(start_date: date, days_count: int = 7, duration: int = 60, **kwargs) -> bytes:
+    """Generate a response as the compact JSON bytes the server sends"""
+    data = generate_availability(start_date, days_count, duration, **kwargs)
+    return json.dumps(data, separators=(',', ':')).encode()
@@ -0,0 +1,81 @@
+"""
+Time Conversion
+Shared, memoized date and time conversions for parsing and formatting slots
+"""
+
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Optional
+import pytz
+
+# Resolved once; pytz.timezone() is a lookup plus lock on every call
+TORONTO_TZ = pytz.timezone('America/Toronto')
+
+MINUTES_PER_DAY = 24 * 60
+
+# Precomputed labels: minute of day -> 'HH:MM' and duration minutes -> 'Nmin'
+TIME_LABELS = tuple(f"{minute // 60:02d}:{minute % 60:02d}" for minute in range(MINUTES_PER_DAY))
+DURATION_LABELS = tuple(f"{minutes}min" for minutes in range(MINUTES_PER_DAY + 1))
+
+
+def toronto_now() -> datetime:
+    """Current time in Toronto"""
+    return datetime.now(TORONTO_TZ)
+
+
+def format_minute(minute: int) -> str:
+    """Convert minutes after midnight to 'HH:MM', wrapping past midnight"""
+    return TIME_LABELS[minute % MINUTES_PER_DAY]
+
+
+def format_time(hours: int, minutes: int) -> str:
+    """Convert an hours/minutes pair to 'HH:MM'"""
+    minute = hours * 60 + minutes
+    if 0 <= minute < MINUTES_PER_DAY:
+        return TIME_LABELS[minute]
+    return f"{hours:02d}:{minutes:02d}"
+
+
+def duration_label(minutes: int) -> str:
+    """Convert a duration in minutes to the 'Nmin' label"""
+    if 0 <= minutes <= MINUTES_PER_DAY:
+        return DURATION_LABELS[minutes]
+    return f"{minutes}min"
+
+
+def minute_of_day(time_str: str) -> int:
+    """Convert 'HH:MM' to minutes after midnight"""
+    hours, minutes = time_str.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+@lru_cache(maxsize=4096)
+def api_date_to_str(timestamp: Optional[int]) -> str:
+    """
+    Convert a /Date(ms)/ timestamp to the YYYY-MM-DD date shown in the browser
+
+    Args:
+        timestamp: Epoch milliseconds from the API, or None if it was missing
+
+    Returns:
+        Date string, or 'Unknown'
+    """
+    if timestamp is None:
+        return 'Unknown'
+
+    # Note: API returns UTC timestamp but browser displays date that is one day ahead
+    # So we need to add one day to match browser behavior
+    utc_date = datetime.fromtimestamp(timestamp / 1000, tz=pytz.UTC)
+    toronto_date = utc_date.astimezone(TORONTO_TZ)
+    # Add one day to match browser display (API timestamp represents previous day)
+    toronto_date = toronto_date + timedelta(days=1)
+    return toronto_date.strftime('%Y-%m-%d')
+
+
+@lru_cache(maxsize=1024)
+def weekday_abbr(date: str) -> str:
+    """Return the 3-letter weekday for a YYYY-MM-DD date, or '' if it does not parse"""
+    try:
+        return datetime.strptime(date, '%Y-%m-%d').strftime('%a')
+    except (ValueError, TypeError):
+        return ''
@@ -0,0 +1,230 @@
+"""
+Token Cache
+Persists the PerfectMind verification token and session cookies between runs
+"""
+
+import json
+import os
+import time
+import logging
+from typing import Optional
+
+# ASP.NET sessions expire after 20 minutes of inactivity by default
+DEFAULT_TTL_SECONDS = 20 * 60
+
+# Fraction of an observed token lifetime we trust before refreshing proactively
+LEARNED_TTL_MARGIN = 0.9
+
+# Floor of a learned lifetime, so one early rejection cannot force a fresh token for every request
+MIN_LEARNED_TTL_SECONDS = 60
+
+# A learned lifetime grows back by this factor after each interval of accepted requests without a rejection
+LEARNED_TTL_RECOVERY = 1.25
+LEARNED_TTL_RECOVERY_SECONDS = 60 * 60
+
+
+class TokenCache:
+    """
+    On-disk cache for the anti-forgery token and PMSessionId cookies
+
+    The TTL is an idle timeout, like the server's session: a token stays usable
+    for TTL seconds after its last accepted request. The cache only knows when
+    a token was fetched, which is its last use as far as a restarted process
+    can tell, so load() expires tokens TTL seconds after fetched_at.
+
+    A learned TTL is never below MIN_LEARNED_TTL_SECONDS and grows back towards
+    the default while requests keep being accepted, so a rejection that was
+    not really an idle timeout does not shorten every later token for good.
+    """
+
+    def __init__(self, path: str = '.token_cache.json', ttl_seconds: Optional[float] = None,
+                 logger: Optional[logging.Logger] = None):
+        """
+        Initialize the token cache
+
+        Args:
+            path: File the token and cookies are stored in
+            ttl_seconds: Fixed token lifetime; if None the lifetime is learned from rejections
+            logger: Optional logger instance
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.logger = logger or logging.getLogger(__name__)
+        # TTL of the entry last read or written, so current_ttl() does not hit the disk
+        self._ttl: Optional[float] = None
+        # When the learned TTL was last lowered or raised, None if there is no learned TTL
+        self._learned_at: Optional[float] = None
+
+    @classmethod
+    def from_env(cls, logger: Optional[logging.Logger] = None, host: Optional[str] = None) -> 'TokenCache':
+        """
+        Build a cache from TOKEN_CACHE_PATH and TOKEN_CACHE_TTL_SECONDS
+
+        Args:
+            logger: Optional logger instance
+            host: PerfectMind host, to keep one cache file per host when watching several
+        """
+        ttl_str = os.getenv('TOKEN_CACHE_TTL_SECONDS')
+        path = os.getenv('TOKEN_CACHE_PATH') or '.token_cache.json'
+        if host:
+            root, ext = os.path.splitext(path)
+            path = f"{root}.{host.replace(':', '_')}{ext}"
+        return cls(
+            path=path,
+            ttl_seconds=float(ttl_str) if ttl_str else None,
+            logger=logger
+        )
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return entry if isinstance(entry, dict) else {}
+
+    def _write(self, entry: dict):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self.logger.warning("Failed to write token cache %s: %s", self.path, e)
+        self._remember(entry)
+
+    def _remember(self, entry: dict):
+        self._ttl = self.get_ttl(entry)
+        self._learned_at = entry.get('learned_at', time.time()) if entry.get('learned_ttl') else None
+
+    def get_ttl(self, entry: dict) -> float:
+        """Return the configured lifetime, else the learned one, else the default"""
+        if self.ttl_seconds is not None:
+            return self.ttl_seconds
+        return entry.get('learned_ttl') or DEFAULT_TTL_SECONDS
+
+    def current_ttl(self) -> float:
+        """Token lifetime to apply right now; the file is read only the first time"""
+        if self._ttl is None:
+            self._remember(self._read())
+        return self._ttl
+
+    def load(self, now: Optional[float] = None) -> Optional[dict]:
+        """
+        Load a cached token if it has not expired
+
+        Args:
+            now: Current epoch seconds (defaults to time.time())
+
+        Returns:
+            Dict with 'token' and 'cookies' keys, or None if missing or expired
+        """
+        now = time.time() if now is None else now
+        entry = self._read()
+        self._remember(entry)
+        token = entry.get('token')
+        fetched_at = entry.get('fetched_at')
+        if not token or fetched_at is None:
+            return None
+
+        age = now - fetched_at
+        if age >= self._ttl:
+            self.logger.info("Cached verification token expired (%.0fs old)", age)
+            return None
+        return entry
+
+    def save(self, token: str, cookies: list, now: Optional[float] = None):
+        """
+        Store a freshly scraped token and the session cookies
+
+        Args:
+            token: __RequestVerificationToken value
+            cookies: List of {'name', 'value', 'domain', 'path'} dicts
+            now: Current epoch seconds (defaults to time.time())
+        """
+        entry = self._read()
+        entry.update({
+            'token': token,
+            'cookies': cookies,
+            'fetched_at': time.time() if now is None else now
+        })
+        self._write(entry)
+
+    def invalidate(self, rejected: bool = False, idle_seconds: Optional[float] = None, now: Optional[float] = None):
+        """
+        Drop the cached token
+
+        Args:
+            rejected: True if the server rejected the token, so its idle time is used to learn the TTL
+            idle_seconds: Seconds since the token was last accepted; defaults to its age,
+                for a token that was never used after it was fetched
+            now: Current epoch seconds (defaults to time.time())
+        """
+        entry = self._read()
+        if not entry.get('token'):
+            return
+
+        if rejected and (idle_seconds is not None or entry.get('fetched_at') is not None):
+            now = time.time() if now is None else now
+            self._learn(entry, idle_seconds if idle_seconds is not None else now - entry['fetched_at'], now)
+
+        entry.pop('token', None)
+        entry.pop('cookies', None)
+        entry.pop('fetched_at', None)
+        self._write(entry)
+
+    def learn(self, idle_seconds: float, now: Optional[float] = None):
+        """
+        Learn the TTL from a token the server rejected after idle_seconds without use
+
+        Only call this once the rejection is certain, e.g. after a fresh token made
+        the same request succeed; the current token, if any, is kept.
+
+        Args:
+            idle_seconds: Seconds the rejected token had gone without an accepted request
+            now: Current epoch seconds (defaults to time.time())
+        """
+        entry = self._read()
+        if self._learn(entry, idle_seconds, time.time() if now is None else now):
+            self._write(entry)
+
+    def _learn(self, entry: dict, observed: float, now: float) -> bool:
+        if observed <= 0:
+            return False
+        entry['learned_ttl'] = max(observed * LEARNED_TTL_MARGIN, MIN_LEARNED_TTL_SECONDS)
+        entry['learned_at'] = now
+        self.logger.info("Verification token rejected after %.0fs idle, learned TTL is now %.0fs",
+                         observed, entry['learned_ttl'])
+        return True
+
+    def accepted(self, now: Optional[float] = None):
+        """
+        Note that the server accepted a request made with the current token
+
+        After LEARNED_TTL_RECOVERY_SECONDS of accepted requests without a rejection,
+        a learned TTL grows by LEARNED_TTL_RECOVERY, up to the default. Only those
+        rare steps touch the disk.
+
+        Args:
+            now: Current epoch seconds (defaults to time.time())
+        """
+        self.current_ttl()
+        if self.ttl_seconds is not None or self._learned_at is None:
+            return
+        now = time.time() if now is None else now
+        if now - self._learned_at < LEARNED_TTL_RECOVERY_SECONDS:
+            return
+
+        entry = self._read()
+        learned = entry.get('learned_ttl')
+        if learned:
+            learned *= LEARNED_TTL_RECOVERY
+            if learned >= DEFAULT_TTL_SECONDS:
+                entry.pop('learned_ttl')
+                entry.pop('learned_at', None)
+                self.logger.info("Verification tokens accepted without rejection, TTL is back to the default")
+            else:
+                entry.update({'learned_ttl': learned, 'learned_at': now})
+                self.logger.info("Verification tokens accepted without rejection, learned TTL raised to %.0fs",
+                                 learned)
+        self._write(entry)
@@ -0,0 +1,80 @@
+"""
+Token Extractor
+Pulls the anti-forgery token out of the Facility landing page without a full HTML parse
+"""
+
+import html
+import re
+from typing import Iterable, Optional, Tuple
+from bs4 import BeautifulSoup
+
+FORM_START = re.compile(rb'<form\b[^>]*\bid\s*=\s*["\']?AjaxAntiForgeryForm\b', re.IGNORECASE)
+FORM_END = re.compile(rb'</form\s*>', re.IGNORECASE)
+TOKEN_INPUT = re.compile(rb'<input\b[^>]*\bname\s*=\s*["\']?__RequestVerificationToken\b[^>]*>', re.IGNORECASE)
+VALUE_ATTR = re.compile(rb'\bvalue\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))', re.IGNORECASE)
+
+# Bytes re-scanned from the previous chunk so a tag split across chunks is still found
+SCAN_OVERLAP = 1024
+
+
+def _token_from_tag(tag: bytes) -> Optional[str]:
+    match = VALUE_ATTR.search(tag)
+    if not match:
+        return None
+    value = next(group for group in match.groups() if group is not None)
+    return html.unescape(value.decode('utf-8', errors='replace'))
+
+
+def scan_verification_token(chunks: Iterable[bytes]) -> Tuple[Optional[str], bytes]:
+    """
+    Scan streamed landing page bytes and stop as soon as the token is found
+
+    Args:
+        chunks: Iterable of raw body chunks, e.g. response.iter_content()
+
+    Returns:
+        Tuple of (token or None, bytes consumed so far). The consumed bytes let the
+        caller fall back to a full parse when the form layout is not recognised.
+    """
+    buffer = bytearray()
+    scan_from = 0
+    form_start = None
+
+    for chunk in chunks:
+        buffer += chunk
+
+        if form_start is None:
+            match = FORM_START.search(buffer, scan_from)
+            if not match:
+                scan_from = max(0, len(buffer) - SCAN_OVERLAP)
+                continue
+            form_start = match.end()
+
+        form_end = FORM_END.search(buffer, form_start)
+        tag = TOKEN_INPUT.search(buffer, form_start, form_end.start() if form_end else len(buffer))
+        if tag:
+            return _token_from_tag(tag.group(0)), bytes(buffer)
+        if form_end:
+            # The form closed without a token input: layout changed, let the caller fall back
+            return None, bytes(buffer)
+
+    return None, bytes(buffer)
+
+
+def parse_verification_token(page: bytes) -> Optional[str]:
+    """
+    Extract the token with a full BeautifulSoup parse (slow path)
+
+    Args:
+        page: Full landing page body
+
+    Returns:
+        Token string or None if the form or input is missing
+    """
+    soup = BeautifulSoup(page, 'html.parser')
+    form = soup.find('form', id='AjaxAntiForgeryForm')
+    if form:
+        token_input = form.find('input', {'name': '__RequestVerificationToken'})
+        if token_input:
+            return token_input.get('value')
+    return None
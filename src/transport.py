@@ -0,0 +1,234 @@
+"""
+Transport
+HTTP backends under PerfectMindSession: requests and asyncio HTTP/2 multiplexing
+"""
+
+import abc
+import asyncio
+import logging
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.cookies import RequestsCookieJar
+from requests.structures import CaseInsensitiveDict
+
+TRANSPORTS = ('requests', 'http2')
+
+# Seconds to open a connection, and to wait for the next bytes of a response; a
+# finite read timeout is what lets a hung request fail into the retry and
+# circuit breaker logic instead of holding its thread forever
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 30.0
+
+
+def timeouts_from_env() -> Tuple[float, float]:
+    """(connect, read) timeouts from PERFECTMIND_CONNECT_TIMEOUT_SECONDS and PERFECTMIND_READ_TIMEOUT_SECONDS"""
+    connect_str = os.getenv('PERFECTMIND_CONNECT_TIMEOUT_SECONDS')
+    read_str = os.getenv('PERFECTMIND_READ_TIMEOUT_SECONDS')
+    return (float(connect_str) if connect_str else DEFAULT_CONNECT_TIMEOUT,
+            float(read_str) if read_str else DEFAULT_READ_TIMEOUT)
+
+
+def make_response(status_code: int, headers: Dict[str, str], body: bytes, url: str) -> requests.Response:
+    """Build a fully read requests.Response, so every backend hands back the same type"""
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers = CaseInsensitiveDict(headers)
+    response._content = body
+    response._content_consumed = True
+    response.url = url
+    response.reason = ''
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    return response
+
+
+class Transport(abc.ABC):
+    """
+    What PerfectMindSession needs from an HTTP backend
+
+    Backends keep a cookie jar and default headers shared by every request and
+    return requests.Response objects, raising requests.RequestException subclasses
+    on network errors so retries and the circuit breaker work the same on all of them.
+    """
+
+    def __init__(self):
+        self.cookies = RequestsCookieJar()
+        self.headers = CaseInsensitiveDict()
+
+    @abc.abstractmethod
+    def request(self, method: str, url: str, params: Optional[dict] = None, data: Optional[dict] = None,
+                headers: Optional[dict] = None, stream: bool = False) -> requests.Response:
+        """Send one request and return the fully read response"""
+
+    def close(self):
+        pass
+
+
+class RequestsTransport(Transport):
+    """Synchronous requests.Session with one keep-alive pool shared by all threads"""
+
+    def __init__(self, pool_size: int = 10, connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout: float = DEFAULT_READ_TIMEOUT):
+        super().__init__()
+        self.session = requests.Session()
+        # The session sends the transport's jar and headers, keeping requests' default headers
+        self.headers.update(self.session.headers)
+        self.session.cookies = self.cookies
+        self.session.headers = self.headers
+        self.timeout = (connect_timeout, read_timeout)
+        # One shared pool so concurrent court checks reuse keep-alive connections
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def request(self, method, url, params=None, data=None, headers=None, stream=False):
+        if method == 'GET':
+            return self.session.get(url, params=params, headers=headers, stream=stream, timeout=self.timeout)
+        return self.session.post(url, params=params, data=data, headers=headers, stream=stream, timeout=self.timeout)
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncHttp2Transport(Transport):
+    """
+    httpx over HTTP/2 on a private event loop, one multiplexed connection per host
+
+    Synchronous callers (the worker threads of check_all_courts) block on
+    request(); asyncio callers await arequest(). Either way all in-flight
+    requests to a host share a single connection as concurrent streams.
+    request(stream=True) returns once the headers arrive and reads the body
+    as the caller iterates it; arequest() always reads the whole body. Needs the optional httpx[http2] dependency.
+    """
+
+    def __init__(self, connect_timeout: float = DEFAULT_CONNECT_TIMEOUT, read_timeout: float = DEFAULT_READ_TIMEOUT,
+                 logger: Optional[logging.Logger] = None):
+        try:
+            import httpx
+        except ImportError as e:
+            raise ImportError("The http2 transport needs httpx with HTTP/2 support: pip install 'httpx[http2]'") from e
+        super().__init__()
+        self.logger = logger or logging.getLogger(__name__)
+        self._httpx = httpx
+        self._timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self._client = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='http2-transport', daemon=True)
+        self._thread.start()
+
+    def _get_client(self):
+        # Created on the loop thread; shares the cookie jar so cookies set here are sent and updated
+        if self._client is None:
+            self._client = self._httpx.AsyncClient(
+                http2=True,
+                cookies=self.cookies,
+                timeout=self._timeout,
+                limits=self._httpx.Limits(max_connections=1, max_keepalive_connections=1)
+            )
+        return self._client
+
+    async def arequest(self, method, url, params=None, data=None, headers=None) -> requests.Response:
+        """Send a request from a coroutine running on this transport's loop and read the whole response"""
+        client = self._get_client()
+        try:
+            response = await client.request(method, url, params=params, data=data,
+                                            headers={**self.headers, **(headers or {})})
+        except self._httpx.TimeoutException as e:
+            raise requests.Timeout(str(e)) from e
+        except self._httpx.HTTPError as e:
+            raise requests.ConnectionError(str(e)) from e
+        return make_response(response.status_code, dict(response.headers), response.content, str(response.url))
+
+    def request(self, method, url, params=None, data=None, headers=None, stream=False):
+        if not stream:
+            return self.run(self.arequest(method, url, params=params, data=data, headers=headers))
+
+        streamed = self.run(self._open_stream(method, url, params, data, headers))
+        # Body bytes are pulled from the loop as the caller iterates, like a requests stream
+        response = make_response(streamed.status_code, dict(streamed.headers), b'', str(streamed.url))
+        response._content = False
+        response._content_consumed = False
+        response.raw = _StreamedBody(self, streamed)
+        return response
+
+    async def _open_stream(self, method, url, params, data, headers):
+        """Send a request and return the httpx response once its headers have arrived"""
+        client = self._get_client()
+        outgoing = client.build_request(method, url, params=params, data=data,
+                                        headers={**self.headers, **(headers or {})})
+        return await client.send(outgoing, stream=True)
+
+    def run(self, coroutine):
+        """Run a coroutine on this transport's loop and wait for it, raising httpx errors as requests ones"""
+        try:
+            return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+        except self._httpx.TimeoutException as e:
+            raise requests.Timeout(str(e)) from e
+        except self._httpx.HTTPError as e:
+            raise requests.ConnectionError(str(e)) from e
+
+    def close(self):
+        if self._client is not None:
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+class _StreamedBody:
+    """File-like raw body of a streamed AsyncHttp2Transport response, read chunk by chunk from the loop"""
+
+    def __init__(self, transport: AsyncHttp2Transport, response):
+        self._transport = transport
+        self._response = response
+        self._chunks = response.aiter_bytes()
+        self._buffer = b''
+        self._done = False
+
+    async def _next_chunk(self) -> bytes:
+        try:
+            return await self._chunks.__anext__()
+        except StopAsyncIteration:
+            await self._response.aclose()
+            return b''
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        while not self._done and (amt is None or len(self._buffer) < amt):
+            chunk = self._transport.run(self._next_chunk())
+            self._buffer += chunk
+            self._done = not chunk
+        if amt is None:
+            amt = len(self._buffer)
+        data, self._buffer = self._buffer[:amt], self._buffer[amt:]
+        return data
+
+    def close(self):
+        if not self._done:
+            self._done = True
+            self._transport.run(self._response.aclose())
+
+
+def make_transport(name: Optional[str] = None, pool_size: int = 10,
+                   timeout: Tuple[float, float] = (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT),
+                   logger: Optional[logging.Logger] = None) -> Transport:
+    """
+    Build a transport by name
+
+    Args:
+        name: 'requests' (default) or 'http2'
+        pool_size: Keep-alive pool size of the requests transport
+        timeout: (connect, read) timeouts in seconds
+        logger: Optional logger instance
+
+    Raises:
+        ValueError: For an unknown name
+    """
+    connect_timeout, read_timeout = timeout
+    name = (name or 'requests').strip().lower()
+    if name == 'requests':
+        return RequestsTransport(pool_size=pool_size, connect_timeout=connect_timeout, read_timeout=read_timeout)
+    if name == 'http2':
+        return AsyncHttp2Transport(connect_timeout=connect_timeout, read_timeout=read_timeout, logger=logger)
+    raise ValueError(f"Unknown transport {name!r}, expected one of {', '.join(TRANSPORTS)}")
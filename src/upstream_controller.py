@@ -0,0 +1,313 @@
+"""
+Upstream Controller
+Rate limiting, adaptive concurrency, retries and a circuit breaker for PerfectMind requests
+"""
+
+import contextlib
+import os
+import random
+import threading
+import time
+import logging
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+import requests
+
+# Statuses that mean the upstream is overloaded or failing and the request may be retried
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised when the circuit is open and there is no last good result to serve"""
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 30.0,
+                  rng: Callable[[], float] = random.random) -> float:
+    """
+    Full-jitter exponential backoff
+
+    Args:
+        attempt: Retry number, starting at 1
+        base: Delay scale in seconds
+        cap: Maximum delay in seconds
+        rng: Source of uniform [0, 1) numbers
+
+    Returns:
+        Seconds to wait before the next attempt
+    """
+    return rng() * min(cap, base * (2 ** (attempt - 1)))
+
+
+class TokenBucket:
+    """Token bucket limiting the request start rate"""
+
+    def __init__(self, rate: float, burst: float, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        while True:
+            with self._lock:
+                now = self.clock()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+
+    def set_limits(self, rate: float, burst: float) -> Tuple[float, float]:
+        """Change the rate and burst from now on and return the previous ones"""
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            previous = (self.rate, self.burst)
+            self.rate = rate
+            self.burst = burst
+            self.tokens = min(self.tokens, burst)
+            return previous
+
+
+class AimdLimiter:
+    """Concurrency limit that grows additively on healthy responses and halves on overload"""
+
+    def __init__(self, initial: float, minimum: float, maximum: float, latency_target: float):
+        self.limit = float(initial)
+        self.minimum = float(minimum)
+        self.maximum = float(maximum)
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= max(1, int(self.limit)):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, latency: Optional[float], overloaded: bool):
+        """
+        Return a slot and adjust the limit
+
+        A request that failed without a response and without overload (e.g. a
+        truncated body) says nothing about upstream load and leaves the limit as is.
+
+        Args:
+            latency: Request latency in seconds, None if it failed before a response
+            overloaded: True on 429/5xx/timeouts
+        """
+        with self._cond:
+            self.in_flight -= 1
+            if overloaded or (latency is not None and latency > self.latency_target):
+                self.limit = max(self.minimum, self.limit / 2)
+            elif latency is not None:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures, allows one trial request after a cool-down"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Check whether a request may go out"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+
+    def record_inconclusive(self):
+        """A response that shows neither health nor failure; a half-open trial is handed to the next request"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+
+
+class UpstreamController:
+    """Shared gate that every PerfectMind request goes through"""
+
+    def __init__(self, rate_per_second: float = 5.0, burst: float = 5.0,
+                 initial_concurrency: int = 4, min_concurrency: int = 1, max_concurrency: int = 16,
+                 latency_target: float = 3.0, max_retries: int = 3,
+                 backoff_base: float = 0.5, backoff_cap: float = 30.0,
+                 failure_threshold: int = 5, reset_timeout: float = 60.0,
+                 logger: Optional[logging.Logger] = None,
+                 clock=time.monotonic, sleep=time.sleep, rng=random.random):
+        """
+        Initialize the controller
+
+        Args:
+            rate_per_second: Sustained request start rate
+            burst: Requests that may start back-to-back after an idle period
+            initial_concurrency: Starting concurrency limit
+            min_concurrency: Lower bound for the adaptive limit
+            max_concurrency: Upper bound for the adaptive limit
+            latency_target: Latency in seconds above which the limit is cut
+            max_retries: Retries after the first attempt for retryable failures
+            backoff_base: Backoff scale in seconds
+            backoff_cap: Maximum backoff in seconds
+            failure_threshold: Consecutive failed requests that open the circuit
+            reset_timeout: Seconds the circuit stays open before a trial request
+            logger: Optional logger instance
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        self.bucket = TokenBucket(rate_per_second, burst, clock=clock, sleep=sleep)
+        self.limiter = AimdLimiter(initial_concurrency, min_concurrency, max_concurrency, latency_target)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout, clock=clock)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.clock = clock
+        self.sleep = sleep
+        self.rng = rng
+        self._last_good: Dict[Hashable, requests.Response] = {}
+
+    @classmethod
+    def from_env(cls, logger: Optional[logging.Logger] = None) -> 'UpstreamController':
+        """Build a controller from UPSTREAM_RATE_PER_SECOND and UPSTREAM_MAX_CONCURRENCY"""
+        kwargs = {}
+        rate_str = os.getenv('UPSTREAM_RATE_PER_SECOND')
+        if rate_str:
+            kwargs['rate_per_second'] = float(rate_str)
+            kwargs['burst'] = max(1.0, float(rate_str))
+        concurrency_str = os.getenv('UPSTREAM_MAX_CONCURRENCY')
+        if concurrency_str:
+            kwargs['max_concurrency'] = int(concurrency_str)
+            kwargs['initial_concurrency'] = min(4, int(concurrency_str))
+        return cls(logger=logger, **kwargs)
+
+    def request(self, send: Callable[[], requests.Response], key: Optional[Hashable] = None) -> requests.Response:
+        """
+        Send a request through the rate limit, concurrency limit, retries and circuit breaker
+
+        Args:
+            send: Callable performing the HTTP request
+            key: Identifies the request (e.g. facility and window); the last good response
+                for the key is served while the circuit is open
+
+        Returns:
+            The response (possibly a retryable error status once retries are exhausted)
+
+        Raises:
+            CircuitOpenError: If the circuit is open and no last good response exists
+            requests.RequestException: If the final attempt failed without a response
+        """
+        if not self.breaker.allow():
+            return self._serve_last_good(key)
+
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            self.limiter.acquire()
+            started = self.clock()
+            response = None
+            try:
+                response = send()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.limiter.release(None, overloaded=True)
+                if attempt >= self.max_retries:
+                    self.breaker.record_failure()
+                    raise
+                self.logger.warning("Upstream request failed (%s), retrying", e)
+            except Exception:
+                # Not retried, but still a failed request: counting it also ends a
+                # half-open trial, which would otherwise block every later request
+                self.limiter.release(None, overloaded=False)
+                self.breaker.record_failure()
+                raise
+            else:
+                latency = self.clock() - started
+                overloaded = response.status_code in RETRYABLE_STATUS_CODES
+                self.limiter.release(latency, overloaded)
+                if 200 <= response.status_code < 300:
+                    self.breaker.record_success()
+                    if key is not None:
+                        self._last_good[key] = response
+                    return response
+                if not overloaded:
+                    # A 4xx such as a rejected token is the caller's to handle; it is neither
+                    # proof of a healthy upstream nor a good result to serve while the circuit is open
+                    self.breaker.record_inconclusive()
+                    return response
+                if attempt >= self.max_retries:
+                    self.breaker.record_failure()
+                    return response
+                self.logger.warning("Upstream returned %s, retrying", response.status_code)
+
+            attempt += 1
+            self.sleep(self._retry_delay(attempt, response))
+
+    @contextlib.contextmanager
+    def raised_rate(self, rate_per_second: float, burst: float):
+        """
+        Allow at least this request start rate and burst inside the block
+
+        For short planned bursts, such as polling a booking release, that need more
+        than the sustained rate; the configured limits are restored afterwards.
+        """
+        previous = self.bucket.set_limits(max(self.bucket.rate, rate_per_second), max(self.bucket.burst, burst))
+        try:
+            yield
+        finally:
+            self.bucket.set_limits(*previous)
+
+    def _retry_delay(self, attempt: int, response: Optional[requests.Response]) -> float:
+        delay = backoff_delay(attempt, self.backoff_base, self.backoff_cap, self.rng)
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                delay = max(delay, min(self.backoff_cap, float(retry_after)))
+            except ValueError:
+                pass
+        return delay
+
+    def _serve_last_good(self, key: Optional[Hashable]) -> requests.Response:
+        response = self._last_good.get(key) if key is not None else None
+        if response is None:
+            raise CircuitOpenError("Upstream circuit is open")
+        self.logger.warning("Upstream circuit is open, serving last good result for %s", key)
+        return response
+
+    def stats(self) -> dict:
+        """Current limiter and breaker state"""
+        return {
+            'concurrency_limit': self.limiter.limit,
+            'in_flight': self.limiter.in_flight,
+            'circuit': self.breaker.state,
+            'consecutive_failures': self.breaker.failures
+        }
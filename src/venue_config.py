@@ -0,0 +1,102 @@
+"""
+Venue Config
+Venues (PerfectMind tenants, widgets and their courts) loaded from court-info.json
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlparse
+
+DEFAULT_BASE_URL = "https://cityofmarkham.perfectmind.com"
+DEFAULT_WIDGET_ID = 'f3086c1c-7fa3-47fd-9976-0e777c8a7456'
+DEFAULT_CALENDAR_ID = '7998c433-21f7-4914-8b85-9c61d6392511'
+DEFAULT_SERVICE_ID = '308fcf95-0bbc-4fe4-b170-7ca1ad215922'  # Tennis service ID
+DEFAULT_DURATION_IDS = (
+    'a828d44f-c2c4-4efa-8c0a-5b4e867f7ded',  # 60 min
+    'c431ba5d-2f05-4036-bc15-62bbe0b493ab',  # Additional duration
+    'ce80014f-da18-47ca-9486-63c770e7590e',  # Additional duration
+    '0af4655c-daef-42d8-8e1c-7bbc02eb49f6',  # 90 min
+    '09184560-08a2-45c5-ba1e-dd0f83842624',  # 120 min
+    '80f3666e-a7d1-4b1b-a891-ff6d8852290e'   # 180 min
+)
+
+
+class Venue(NamedTuple):
+    """One PerfectMind booking widget and the courts listed on it"""
+    name: str
+    base_url: str
+    widget_id: str = DEFAULT_WIDGET_ID
+    calendar_id: str = DEFAULT_CALENDAR_ID
+    service_id: str = DEFAULT_SERVICE_ID
+    duration_ids: Tuple[str, ...] = DEFAULT_DURATION_IDS
+    courts: Tuple[dict, ...] = ()
+    max_concurrency: Optional[int] = None
+
+    @property
+    def host(self) -> str:
+        return urlparse(self.base_url).netloc
+
+    @property
+    def landing_page_back_url(self) -> str:
+        """Facility list URL the landing pages link back to"""
+        return (f"{self.base_url}/Clients/BookMe4FacilityList/List"
+                f"?widgetId={self.widget_id}&calendarId={self.calendar_id}")
+
+
+DEFAULT_VENUE = Venue(name='Angus Glen', base_url=DEFAULT_BASE_URL)
+
+
+def _base_url(entry: dict) -> str:
+    if entry.get('baseUrl'):
+        return entry['baseUrl'].rstrip('/')
+    # The single-venue file carries the landing page URL instead
+    if entry.get('url'):
+        parsed = urlparse(entry['url'])
+        return f"{parsed.scheme}://{parsed.netloc}"
+    return DEFAULT_BASE_URL
+
+
+def _venue_from_entry(entry: dict, name: str) -> Venue:
+    return Venue(
+        name=entry.get('name') or name,
+        base_url=_base_url(entry),
+        widget_id=entry.get('widgetId') or DEFAULT_WIDGET_ID,
+        calendar_id=entry.get('calendarId') or DEFAULT_CALENDAR_ID,
+        service_id=entry.get('serviceId') or DEFAULT_SERVICE_ID,
+        duration_ids=tuple(entry.get('durationIds') or DEFAULT_DURATION_IDS),
+        courts=tuple(entry.get('courts', ())),
+        max_concurrency=entry.get('maxConcurrency')
+    )
+
+
+def load_venues(config: dict) -> List[Venue]:
+    """
+    Read venues from a parsed court-info.json
+
+    The file either lists venues under "venues", or is a single venue with its
+    courts at the top level. With several venues, court labels are prefixed with
+    the venue name so they stay unique across venues.
+
+    Args:
+        config: Parsed court-info.json
+
+    Returns:
+        List of Venue
+    """
+    if 'venues' not in config:
+        return [_venue_from_entry(config, DEFAULT_VENUE.name)]
+
+    venues = [_venue_from_entry(entry, f"Venue {i}") for i, entry in enumerate(config['venues'], start=1)]
+    if len(venues) > 1:
+        venues = [
+            venue._replace(courts=tuple({**court, 'court': f"{venue.name} {court['court']}"} for court in venue.courts))
+            for venue in venues
+        ]
+    return venues
+
+
+def group_by_host(venues: List[Venue]) -> Dict[str, List[Venue]]:
+    """Group venues by PerfectMind host, keeping config order"""
+    hosts = {}
+    for venue in venues:
+        hosts.setdefault(venue.host, []).append(venue)
+    return hosts
@@ -0,0 +1,197 @@
+"""
+Watch Spec
+Which slots are worth reporting: weekdays, time ranges, courts, duration and date horizon
+"""
+
+from array import array
+from datetime import date, datetime, timedelta
+from typing import Dict, FrozenSet, Iterable, NamedTuple, Optional, Tuple
+
+from .slot_table import SlotTable
+from .time_conversion import MINUTES_PER_DAY, api_date_to_str, minute_of_day
+
+WEEKDAY_NAMES = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+WEEKDAY_GROUPS = {
+    'weekdays': frozenset(range(5)),
+    'weekends': frozenset((5, 6)),
+}
+ALL_WEEKDAYS = frozenset(range(7))
+
+
+def _weekday(name: str) -> int:
+    key = name.strip().lower()[:3]
+    if key not in WEEKDAY_NAMES:
+        raise ValueError(f"Unknown weekday {name!r}")
+    return WEEKDAY_NAMES.index(key)
+
+
+def parse_weekdays(values: Iterable[str]) -> FrozenSet[int]:
+    """
+    Parse weekday names into Monday=0 numbers
+
+    Args:
+        values: Names like 'Sat', 'sunday', ranges like 'Mon-Fri', or 'weekdays' / 'weekends'
+
+    Returns:
+        Set of weekday numbers
+    """
+    days = set()
+    for value in values:
+        value = str(value).strip()
+        if value.lower() in WEEKDAY_GROUPS:
+            days |= WEEKDAY_GROUPS[value.lower()]
+        elif '-' in value:
+            first, last = (_weekday(part) for part in value.split('-', 1))
+            day = first
+            while True:
+                days.add(day)
+                if day == last:
+                    break
+                day = (day + 1) % 7
+        else:
+            days.add(_weekday(value))
+    return frozenset(days)
+
+
+def parse_time_range(value: str) -> Tuple[int, int]:
+    """Parse 'HH:MM-HH:MM' into (start, end) minutes after midnight; the end may be 24:00"""
+    try:
+        start_str, end_str = value.split('-')
+        start, end = minute_of_day(start_str.strip()), minute_of_day(end_str.strip())
+    except ValueError:
+        raise ValueError(f"Time range {value!r} is not HH:MM-HH:MM") from None
+    if not 0 <= start < end <= MINUTES_PER_DAY:
+        raise ValueError(f"Time range {value!r} must start before it ends, within one day")
+    return start, end
+
+
+def merge_ranges(ranges: Iterable[Tuple[int, int]]) -> Tuple[Tuple[int, int], ...]:
+    """Sort time ranges and join the ones that overlap or touch, so a slot spanning two still fits"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return tuple(merged)
+
+
+class WatchSpec(NamedTuple):
+    """
+    Declarative filter from the "watch" entry of court-info.json
+
+    Every field left out matches everything. A slot matches when it falls on one
+    of the weekdays, lies entirely inside one of the time ranges, is on one of
+    the courts, lasts between the minimum and maximum duration and is no more
+    than horizon_days after today.
+    """
+    weekdays: FrozenSet[int] = ALL_WEEKDAYS
+    time_ranges: Tuple[Tuple[int, int], ...] = ()
+    courts: Optional[FrozenSet[str]] = None
+    min_duration: int = 0
+    max_duration: Optional[int] = None
+    horizon_days: Optional[int] = None
+
+    @classmethod
+    def from_config(cls, entry: Optional[dict]) -> Optional['WatchSpec']:
+        """
+        Read a watch entry such as
+        {"weekdays": ["Mon-Fri"], "times": ["18:00-22:00"], "courts": [1, 2],
+         "minDuration": 60, "maxDuration": 60, "horizonDays": 7}
+
+        Returns:
+            WatchSpec, or None when there is no entry
+
+        Raises:
+            ValueError: If a field does not parse
+        """
+        if not entry:
+            return None
+        spec = cls(
+            weekdays=parse_weekdays(entry['weekdays']) if entry.get('weekdays') else ALL_WEEKDAYS,
+            time_ranges=merge_ranges(parse_time_range(value) for value in entry.get('times') or ()),
+            courts=frozenset(str(court) for court in entry['courts']) if entry.get('courts') else None,
+            min_duration=int(entry.get('minDuration') or 0),
+            max_duration=int(entry['maxDuration']) if entry.get('maxDuration') else None,
+            horizon_days=int(entry['horizonDays']) if entry.get('horizonDays') is not None else None
+        )
+        if spec.max_duration is not None and spec.max_duration < spec.min_duration:
+            raise ValueError("maxDuration is shorter than minDuration")
+        return spec
+
+    def wants_court(self, court) -> bool:
+        return self.courts is None or str(court) in self.courts
+
+    def compile(self, today: date) -> 'SlotFilter':
+        """Build the predicate for slots seen on the given day"""
+        return SlotFilter(self, today)
+
+
+class SlotFilter:
+    """
+    A WatchSpec compiled into lookups
+
+    Time ranges become a table of the latest allowed end for every start minute,
+    and each date's weekday and horizon check is worked out once, so deciding on
+    a slot is a couple of index lookups and comparisons.
+    """
+
+    __slots__ = ('spec', 'key', 'range_ends', 'last_date', 'min_duration', 'max_duration', '_dates', '_api_dates')
+
+    def __init__(self, spec: WatchSpec, today: date):
+        self.spec = spec
+        # Latest end minute allowed for a slot starting at each minute; 0 means never
+        if spec.time_ranges:
+            self.range_ends = array('H', bytes(2 * MINUTES_PER_DAY))
+            for start, end in spec.time_ranges:
+                for minute in range(start, end):
+                    self.range_ends[minute] = max(self.range_ends[minute], end)
+        else:
+            self.range_ends = None
+        self.last_date = (today + timedelta(days=spec.horizon_days)).isoformat() \
+            if spec.horizon_days is not None else None
+        # Equal for filters that keep the same slots, so results parsed with one can be reused by the other
+        self.key = (spec, self.last_date)
+        self.min_duration = spec.min_duration
+        self.max_duration = spec.max_duration if spec.max_duration is not None else MINUTES_PER_DAY
+        self._dates: Dict[str, bool] = {}
+        self._api_dates: Dict[Optional[int], bool] = {}
+
+    def wants_date(self, date_str: str) -> bool:
+        """Whether a 'YYYY-MM-DD' date is on a watched weekday within the horizon"""
+        wanted = self._dates.get(date_str)
+        if wanted is None:
+            try:
+                weekday = datetime.strptime(date_str, '%Y-%m-%d').weekday()
+            except (ValueError, TypeError):
+                # Undated slots are kept; there is nothing to filter them on
+                weekday = None
+            wanted = (weekday is None or weekday in self.spec.weekdays) and \
+                (self.last_date is None or weekday is None or date_str <= self.last_date)
+            self._dates[date_str] = wanted
+        return wanted
+
+    def wants_api_date(self, date_ms: Optional[int]) -> bool:
+        """wants_date for a /Date(ms)/ value from the API"""
+        wanted = self._api_dates.get(date_ms)
+        if wanted is None:
+            wanted = self._api_dates[date_ms] = self.wants_date(api_date_to_str(date_ms))
+        return wanted
+
+    def wants_time(self, start: int, duration: int) -> bool:
+        """Whether a slot starting at start minutes after midnight fits a time range and the duration limits"""
+        if not self.min_duration <= duration <= self.max_duration:
+            return False
+        return self.range_ends is None or (0 <= start < MINUTES_PER_DAY and start + duration <= self.range_ends[start])
+
+    def wants_court(self, court) -> bool:
+        return self.spec.wants_court(court)
+
+    def __call__(self, date_str: str, start: int, duration: int, court=None) -> bool:
+        return (self.wants_time(start, duration) and self.wants_date(date_str)
+                and (court is None or self.wants_court(court)))
+
+    def apply(self, table: SlotTable) -> SlotTable:
+        """Return the rows of a table the spec wants"""
+        dates, starts, durations, courts = table.dates, table.starts, table.durations, table.courts
+        return table.take(i for i in range(len(table)) if self(dates[i], starts[i], durations[i], courts[i]))
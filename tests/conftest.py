@@ -0,0 +1,10 @@
+import pytest
+from src import check_availability
+
+
+@pytest.fixture(autouse=True)
+def fresh_host_sessions():
+    """Start every test without sessions kept alive by an earlier test"""
+    check_availability.host_sessions.clear()
+    yield
+    check_availability.host_sessions.clear()
@@ -0,0 +1,50 @@
+from src.availability_cache import AvailabilityCache
+
+
+class TestAvailabilityCache:
+    """Test cases for AvailabilityCache"""
+
+    def setup_method(self):
+        """Setup test instance"""
+        self.cache = AvailabilityCache()
+
+    def test_fingerprint_stable_and_distinct(self):
+        """Test that identical bodies share a fingerprint and different ones do not"""
+        assert AvailabilityCache.fingerprint(b'{"a": 1}') == AvailabilityCache.fingerprint(b'{"a": 1}')
+        assert AvailabilityCache.fingerprint(b'{"a": 1}') != AvailabilityCache.fingerprint(b'{"a": 2}')
+
+    def test_get_miss_then_hit(self):
+        """Test that a stored result is returned only for the same fingerprint"""
+        assert self.cache.get('facility-1', 'fp1') is None
+        self.cache.put('facility-1', 'fp1', ['slot'])
+
+        assert self.cache.get('facility-1', 'fp1') == ['slot']
+        assert self.cache.get('facility-1', 'fp2') is None
+        assert self.cache.get('facility-2', 'fp1') is None
+        assert self.cache.stats() == {'hits': 1, 'misses': 3, 'hit_rate': 0.25}
+
+    def test_empty_result_is_a_hit(self):
+        """Test that a cached empty slot list still counts as a hit"""
+        self.cache.put('facility-1', 'fp1', [])
+        assert self.cache.get('facility-1', 'fp1') == []
+        assert self.cache.hits == 1
+
+    def test_cycle_unchanged(self):
+        """Test the per-cycle change flag"""
+        self.cache.put('facility-1', 'fp1', [])
+        self.cache.begin_cycle()
+        self.cache.get('facility-1', 'fp1')
+        assert self.cache.cycle_unchanged is True
+
+        self.cache.begin_cycle()
+        self.cache.get('facility-1', 'fp2')
+        assert self.cache.cycle_unchanged is False
+
+    def test_mark_changed_drops_entry(self):
+        """Test that a failed facility invalidates the cycle and its entry"""
+        self.cache.put('facility-1', 'fp1', [])
+        self.cache.begin_cycle()
+        self.cache.mark_changed('facility-1')
+
+        assert self.cache.cycle_unchanged is False
+        assert self.cache.get('facility-1', 'fp1') is None
@@ -0,0 +1,82 @@
+import json
+from src.availability_grid import AvailabilityGrid
+from src.slot_table import SlotTable
+
+
+def slot(date, time, court=None):
+    result = {'date': date, 'time': time}
+    if court is not None:
+        result['court'] = court
+    return result
+
+
+class TestAvailabilityGrid:
+    """Test cases for AvailabilityGrid"""
+
+    def test_from_slots_single_court(self):
+        """Test lookups and sorted rows without court information"""
+        grid = AvailabilityGrid.from_slots([slot('2025-10-16', '10:00'), slot('2025-10-15', '08:30')])
+
+        assert grid.dates() == ['2025-10-15', '2025-10-16']
+        assert grid.times() == [510, 600]
+        assert grid.is_available('2025-10-15', 510)
+        assert not grid.is_available('2025-10-16', 510)
+        assert grid.courts() == []
+
+    def test_from_table_matches_from_slots(self):
+        """Test that building from SlotTable columns matches building from rows"""
+        table = SlotTable()
+        table.append('2025-10-15', 600, 60, 1)
+        table.append('2025-10-15', 600, 60, 2)
+        table.append('2025-10-16', 660, 60, 2)
+
+        assert AvailabilityGrid.from_table(table).to_dict() == AvailabilityGrid.from_slots(table).to_dict()
+
+    def test_courts_at(self):
+        """Test per-court lookups"""
+        grid = AvailabilityGrid.from_slots([
+            slot('2025-10-15', '10:00', 1),
+            slot('2025-10-15', '10:00', 3),
+            slot('2025-10-15', '11:00', 2)
+        ])
+
+        assert grid.courts_at('2025-10-15', 600) == [1, 3]
+        assert grid.is_available('2025-10-15', 660, court=2)
+        assert not grid.is_available('2025-10-15', 660, court=1)
+
+    def test_mixed_court_labels_sort_naturally(self):
+        """Test that int and str court labels sort together, with numbers in numeric order"""
+        grid = AvailabilityGrid.from_slots([
+            slot('2025-10-15', '10:00', 'North 10'),
+            slot('2025-10-15', '10:00', 2),
+            slot('2025-10-15', '10:00', 'North 9'),
+            slot('2025-10-15', '10:00', 10)
+        ])
+
+        assert grid.courts() == [2, 10, 'North 9', 'North 10']
+        assert grid.courts_at('2025-10-15', 600) == [2, 10, 'North 9', 'North 10']
+        assert grid.render_table().split('\n')[5].split() == ['10:00', '4', 'courts']
+
+    def test_render_table_single_court(self):
+        """Test the classic check-mark table"""
+        grid = AvailabilityGrid.from_slots([slot('2025-10-15', '10:00'), slot('2025-10-16', '11:00')])
+        lines = grid.render_table().split('\n')
+
+        assert '10-15' in lines[3] and '10-16' in lines[3]
+        assert lines[5].split() == ['10:00', '✓', '-']
+        assert lines[6].split() == ['11:00', '-', '✓']
+
+    def test_render_table_all_courts(self):
+        """Test that cells list every available court"""
+        grid = AvailabilityGrid.from_slots([slot('2025-10-15', '10:00', 1), slot('2025-10-15', '10:00', 4)])
+        assert grid.render_table().split('\n')[5].split() == ['10:00', '1,4']
+
+    def test_render_compact(self):
+        """Test the one-line-per-date rendering"""
+        grid = AvailabilityGrid.from_slots([slot('2025-10-15', '10:00', 1), slot('2025-10-15', '09:00', 2)])
+        assert grid.render_compact() == '2025-10-15 Wed: 09:00[2] 10:00[1]'
+
+    def test_to_json(self):
+        """Test the JSON rendering"""
+        grid = AvailabilityGrid.from_slots([slot('2025-10-15', '10:00', 1), slot('2025-10-15', '10:00', 2)])
+        assert json.loads(grid.to_json()) == {'2025-10-15': {'10:00': [1, 2]}}
@@ -0,0 +1,147 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from datetime import time as time_of_day
+from unittest.mock import MagicMock, patch
+from src.burst_poller import BurstPoller, parse_release_times
+from src.perfectmind_stub import FakeTransport
+from src.PerfectMindSession import PerfectMindSession
+from src.upstream_controller import UpstreamController
+
+RELEASE = datetime(2025, 10, 6, 7, 0)
+RELEASE_DATE = '2025-10-13'
+
+
+class FakeClock:
+    """Clock that only moves when slept on or when a request is made"""
+
+    def __init__(self, start):
+        self.now = start
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            return self.now
+
+    def sleep(self, seconds):
+        with self.lock:
+            self.now += timedelta(seconds=seconds)
+
+
+def make_session(clock, opens_at, calls):
+    """Session whose released date gains a slot at opens_at"""
+    session = MagicMock()
+    session.warm.return_value = True
+
+    def check_availability(facility_id, date=None, days_count=7, duration=60):
+        calls.append((clock(), facility_id, date, days_count))
+        return 'open' if clock() >= opens_at else 'closed'
+
+    session.check_availability.side_effect = check_availability
+    session.parse_availability_data.side_effect = lambda data: (
+        [{'date': RELEASE_DATE, 'time': '09:00', 'duration': '60min'}] if data == 'open' else [])
+    return session
+
+
+class TestBurstPoller:
+    """Test cases for BurstPoller"""
+
+    def test_release_timing(self):
+        """Test that the lead time and window bracket each release"""
+        burst = BurstPoller([time_of_day(7, 0)], window=60, lead=30)
+
+        assert burst.wake_time(RELEASE - timedelta(hours=3)) == RELEASE - timedelta(seconds=30)
+        assert burst.due(RELEASE - timedelta(seconds=31)) is None
+        assert burst.due(RELEASE - timedelta(seconds=30)) == RELEASE
+        assert burst.due(RELEASE + timedelta(seconds=59)) == RELEASE
+        assert burst.due(RELEASE + timedelta(seconds=60)) is None
+        assert burst.next_release(RELEASE + timedelta(seconds=60)) == RELEASE + timedelta(days=1)
+
+    def test_polls_released_date_from_t0(self):
+        """Test that sessions are warmed ahead and the first burst request goes out at the release"""
+        clock = FakeClock(RELEASE - timedelta(seconds=30))
+        calls = []
+        session = make_session(clock, RELEASE + timedelta(seconds=2), calls)
+        found_rounds = []
+        burst = BurstPoller([time_of_day(7, 0)], window=5, lead=30, interval=0.5, clock=clock, sleep=clock.sleep)
+
+        found = burst.run(RELEASE, [(session, {'court': 1, 'facilityId': 'f1'})], found_rounds.append)
+
+        session.warm.assert_called_once_with('f1', valid_for=35.0)
+        baseline, first = calls[0], calls[1]
+        assert baseline[0] == RELEASE - timedelta(seconds=30)
+        assert first[0] == RELEASE
+        assert all(call[2:] == (RELEASE_DATE, 1) for call in calls)
+        assert len(calls) == 1 + 10
+        assert len(found_rounds) == 1
+        assert found.keys() == {(RELEASE_DATE, 540, 1)}
+
+    def test_slots_open_before_release_are_not_new(self):
+        """Test that the pre-release answer is the baseline"""
+        clock = FakeClock(RELEASE - timedelta(seconds=10))
+        session = make_session(clock, RELEASE - timedelta(hours=1), [])
+        found_rounds = []
+        burst = BurstPoller([time_of_day(7, 0)], window=2, clock=clock, sleep=clock.sleep)
+
+        assert len(burst.run(RELEASE, [(session, {'court': 1, 'facilityId': 'f1'})], found_rounds.append)) == 0
+        assert found_rounds == []
+
+    def test_only_wanted_courts(self):
+        """Test that BURST_COURTS limits which courts are polled"""
+        clock = FakeClock(RELEASE)
+        calls = []
+        session = make_session(clock, RELEASE, calls)
+        burst = BurstPoller([time_of_day(7, 0)], window=1, courts=['2'], clock=clock, sleep=clock.sleep)
+
+        burst.run(RELEASE, [(session, {'court': 1, 'facilityId': 'f1'}), (session, {'court': 2, 'facilityId': 'f2'})],
+                  lambda table: None)
+
+        assert {call[1] for call in calls} == {'f2'}
+
+    def test_cadence_through_upstream_rate_limit(self):
+        """Test that rounds keep the interval on a real session whose host limit is below one round per interval"""
+        transport = FakeTransport()
+        upstream = UpstreamController(rate_per_second=5, burst=5)
+        session = PerfectMindSession(transport=transport, upstream=upstream)
+        targets = [(session, {'court': court, 'facilityId': f"f{court}"}) for court in range(1, 5)]
+        burst = BurstPoller([], window=2, interval=0.25)
+
+        # Four courts every 0.25s is 16 requests a second against a limit of 5
+        burst.run(datetime.now(), targets, lambda new: None)
+
+        rounds = (sum(1 for call in transport.calls if call[0] == 'POST') - len(targets)) / len(targets)
+        assert rounds >= 6
+        assert (upstream.bucket.rate, upstream.bucket.burst) == (5, 5)
+
+    def test_from_env(self, monkeypatch):
+        """Test that burst mode is off unless release times are configured"""
+        monkeypatch.delenv('BURST_RELEASE_TIMES', raising=False)
+        assert BurstPoller.from_env() is None
+
+        monkeypatch.setenv('BURST_RELEASE_TIMES', '19:00, 07:00:05')
+        monkeypatch.setenv('BURST_INTERVAL_SECONDS', '0.25')
+        monkeypatch.setenv('BURST_COURTS', '1,3')
+        burst = BurstPoller.from_env()
+        assert burst.release_times == [time_of_day(7, 0, 5), time_of_day(19, 0)]
+        assert burst.interval == 0.25
+        assert burst.wants({'court': 3}) and not burst.wants({'court': 2})
+
+    def test_parse_release_times(self):
+        """Test parsing of the release time list"""
+        assert parse_release_times('07:00,,12:30') == [time_of_day(7, 0), time_of_day(12, 30)]
+
+
+class TestSessionWarm:
+    """Test cases for PerfectMindSession.warm"""
+
+    def test_keeps_token_valid_long_enough(self):
+        """Test that a token expiring during the burst is replaced before it starts"""
+        session = PerfectMindSession()
+        session.verification_token = 'old'
+        session.token_expires_at = time.time() + 60
+
+        with patch.object(session, 'get_verification_token', return_value=True) as mock_token:
+            assert session.warm('f1', valid_for=30)
+            mock_token.assert_not_called()
+            assert session.warm('f1', valid_for=120)
+            mock_token.assert_called_once_with('f1')
@@ -1,14 +1,8 @@
-import pytest
 import json
-from datetime import datetime, timedelta
-from unittest.mock import Mock, patch, MagicMock, mock_open
-import sys
-import os
-
-# Add parent directory to path to import check_availability
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from check_availability import (
+from datetime import datetime
+from unittest.mock import patch, MagicMock, mock_open
+from src.availability_cache import AvailabilityCache
+from src.check_availability import (
     format_slot_output,
     get_slot_key,
     find_new_slots,
@@ -374,7 +368,7 @@ class TestGetNextCheckTime:
 class TestCheckCourtAvailability:
     """Test cases for check_court_availability function"""
 
-    @patch('check_availability.PerfectMindSession')
+    @patch('src.check_availability.PerfectMindSession')
     @patch('builtins.open', new_callable=mock_open, read_data='{"courts": [{"court": 1, "facilityId": "test-id"}]}')
     def test_check_court_availability_success(self, mock_file, mock_session_class):
         """Test successful court availability check"""
@@ -411,7 +405,7 @@ class TestCheckCourtAvailability:
         assert slots[0]['court'] == 1
         assert 'formatted' in slots[0]
 
-    @patch('check_availability.PerfectMindSession')
+    @patch('src.check_availability.PerfectMindSession')
     @patch('builtins.open', new_callable=mock_open, read_data='{"courts": [{"court": 1, "facilityId": "test-id"}]}')
     def test_check_court_availability_no_slots(self, mock_file, mock_session_class):
         """Test court availability check with no available slots"""
@@ -434,7 +428,7 @@ class TestCheckCourtAvailability:
         assert success is False
         assert len(slots) == 0
 
-    @patch('check_availability.PerfectMindSession')
+    @patch('src.check_availability.PerfectMindSession')
     @patch('builtins.open', side_effect=FileNotFoundError("File not found"))
     def test_check_court_availability_file_not_found(self, mock_file, mock_session_class):
         """Test court availability check when court-info.json is not found"""
@@ -443,7 +437,21 @@ class TestCheckCourtAvailability:
         assert success is False
         assert len(slots) == 0
 
-    @patch('check_availability.PerfectMindSession')
+    @patch('src.check_availability.PerfectMindSession')
+    @patch('builtins.open', side_effect=FileNotFoundError("File not found"))
+    def test_config_error_reports_unchanged_cycle(self, mock_file, mock_session_class):
+        """Test that a config error after a changed cycle does not carry that cycle's change flag over"""
+        cache = AvailabilityCache()
+        cache.begin_cycle()
+        cache.mark_changed()
+        assert cache.cycle_unchanged is False
+
+        success, slots = check_court_availability(cache)
+
+        assert success is False
+        assert cache.cycle_unchanged is True
+
+    @patch('src.check_availability.PerfectMindSession')
     @patch('builtins.open', new_callable=mock_open, read_data='invalid json')
     def test_check_court_availability_invalid_json(self, mock_file, mock_session_class):
         """Test court availability check with invalid JSON"""
@@ -452,7 +460,7 @@ class TestCheckCourtAvailability:
         assert success is False
         assert len(slots) == 0
 
-    @patch('check_availability.PerfectMindSession')
+    @patch('src.check_availability.PerfectMindSession')
     @patch('builtins.open', new_callable=mock_open, read_data='{"courts": [{"court": 1, "facilityId": "test-id"}]}')
     def test_check_court_availability_multiple_courts(self, mock_file, mock_session_class):
         """Test court availability check with multiple courts"""
@@ -463,9 +471,11 @@ class TestCheckCourtAvailability:
         # Mock parse_availability_data to return different slots for different courts
         def mock_parse(data):
             if data == {'court1': 'data'}:
-                return [{'date': '2025-10-15', 'time': '14:30', 'duration': '60min', 'group': 'A', 'title': 'T', 'ticks': 100, 'is_disabled': False}]
+                return [{'date': '2025-10-15', 'time': '14:30', 'duration': '60min', 'group': 'A', 'title': 'T',
+                         'ticks': 100, 'is_disabled': False}]
             elif data == {'court2': 'data'}:
-                return [{'date': '2025-10-15', 'time': '15:30', 'duration': '60min', 'group': 'A', 'title': 'T', 'ticks': 100, 'is_disabled': False}]
+                return [{'date': '2025-10-15', 'time': '15:30', 'duration': '60min', 'group': 'A', 'title': 'T',
+                         'ticks': 100, 'is_disabled': False}]
             return []
 
         mock_session.parse_availability_data.side_effect = mock_parse
@@ -484,7 +494,7 @@ class TestCheckCourtAvailability:
         assert slots[0]['court'] == 1
         assert slots[1]['court'] == 2
 
-    @patch('check_availability.PerfectMindSession')
+    @patch('src.check_availability.PerfectMindSession')
     @patch('builtins.open', new_callable=mock_open, read_data='{"courts": [{"court": 1, "facilityId": "test-id"}]}')
     def test_check_court_availability_slots_sorted(self, mock_file, mock_session_class):
         """Test that slots are properly sorted"""
@@ -494,9 +504,12 @@ class TestCheckCourtAvailability:
 
         # Mock parse_availability_data to return slots in random order
         mock_session.parse_availability_data.return_value = [
-            {'date': '2025-10-16', 'time': '10:00', 'duration': '60min', 'group': 'A', 'title': 'T', 'ticks': 100, 'is_disabled': False},
-            {'date': '2025-10-15', 'time': '14:30', 'duration': '60min', 'group': 'A', 'title': 'T', 'ticks': 100, 'is_disabled': False},
-            {'date': '2025-10-15', 'time': '09:00', 'duration': '60min', 'group': 'A', 'title': 'T', 'ticks': 100, 'is_disabled': False}
+            {'date': '2025-10-16', 'time': '10:00', 'duration': '60min', 'group': 'A', 'title': 'T',
+             'ticks': 100, 'is_disabled': False},
+            {'date': '2025-10-15', 'time': '14:30', 'duration': '60min', 'group': 'A', 'title': 'T',
+             'ticks': 100, 'is_disabled': False},
+            {'date': '2025-10-15', 'time': '09:00', 'duration': '60min', 'group': 'A', 'title': 'T',
+             'ticks': 100, 'is_disabled': False}
         ]
 
         # Mock check_all_courts
@@ -517,3 +530,106 @@ class TestCheckCourtAvailability:
         assert slots[2]['date'] == '2025-10-16'
         assert slots[2]['time'] == '10:00'
 
+    @patch('src.check_availability.PerfectMindSession')
+    @patch('builtins.open', new_callable=mock_open, read_data='{"courts": [{"court": 1, "facilityId": "test-id"}]}')
+    def test_check_court_availability_reuses_cached_slots(self, mock_file, mock_session_class):
+        """Test that an unchanged response reuses formatted slots without parsing"""
+        cache = AvailabilityCache()
+        mock_session = MagicMock()
+        mock_session_class.return_value = mock_session
+        mock_session.parse_availability_data.return_value = [
+            {'date': '2025-10-15', 'time': '14:30', 'duration': '60min', 'group': 'A', 'title': 'T',
+             'ticks': 100, 'is_disabled': False}
+        ]
+
+        mock_session.check_all_courts.return_value = {
+            1: {'facility_id': 'test-id', 'availability': {'test': 'data'}, 'fingerprint': 'fp1'}
+        }
+        success, first_slots = check_court_availability(cache)
+        assert success is True
+
+        cached = cache.get('test-id', 'fp1')
+        mock_session.check_all_courts.return_value = {
+            1: {'facility_id': 'test-id', 'availability': None, 'fingerprint': 'fp1', 'cached': cached}
+        }
+        mock_session.parse_availability_data.reset_mock()
+        success, second_slots = check_court_availability(cache)
+
+        assert success is True
+        assert second_slots == first_slots
+        mock_session.parse_availability_data.assert_not_called()
+        assert cache.cycle_unchanged is True
+
+    @patch('src.check_availability.PerfectMindSession')
+    @patch('builtins.open', new_callable=mock_open, read_data='{"courts": [{"court": 1, "facilityId": "test-id"}]}')
+    def test_check_court_availability_reuses_session_across_cycles(self, mock_file, mock_session_class):
+        """Test that one session per host is kept alive between cycles and replaced after a failure"""
+        mock_session = MagicMock()
+        mock_session_class.return_value = mock_session
+        mock_session.check_all_courts.return_value = {1: {'availability': {'test': 'data'}}}
+        mock_session.parse_availability_data.return_value = []
+
+        check_court_availability()
+        check_court_availability()
+        assert mock_session_class.call_count == 1
+
+        mock_session.check_all_courts.side_effect = RuntimeError("connection reset")
+        check_court_availability()
+        mock_session.check_all_courts.side_effect = None
+        check_court_availability()
+        assert mock_session_class.call_count == 2
+
+    @patch('src.check_availability.PerfectMindSession')
+    @patch('builtins.open', new_callable=mock_open, read_data=json.dumps({'venues': [
+        {'name': 'North', 'baseUrl': 'https://north.perfectmind.com', 'courts': [{'court': 1, 'facilityId': 'n-1'}]},
+        {'name': 'South', 'baseUrl': 'https://south.perfectmind.com', 'courts': [{'court': 1, 'facilityId': 's-1'}]}
+    ]}))
+    def test_check_court_availability_isolates_venue_failures(self, mock_file, mock_session_class):
+        """Test that a failing host does not stop the other hosts' courts being checked"""
+        def make_session(**kwargs):
+            session = MagicMock()
+            if kwargs['venue'].name == 'South':
+                session.check_all_courts.side_effect = RuntimeError("tenant down")
+            else:
+                session.check_all_courts.return_value = {'North 1': {'availability': {'test': 'data'}}}
+                session.parse_availability_data.return_value = [
+                    {'date': '2025-10-15', 'time': '14:30', 'duration': '60min', 'group': 'A', 'title': 'T',
+                     'ticks': 100, 'is_disabled': False}
+                ]
+            return session
+
+        mock_session_class.side_effect = make_session
+
+        success, slots = check_court_availability()
+
+        assert success is True
+        assert len(slots) == 1
+        assert slots[0]['court'] == 'North 1'
+        assert mock_session_class.call_count == 2
+
+    @patch('src.check_availability.PerfectMindSession')
+    @patch('builtins.open', new_callable=mock_open, read_data=json.dumps({'venues': [
+        {'name': 'North', 'baseUrl': 'https://north.perfectmind.com',
+         'courts': [{'court': 1, 'facilityId': 'n-1'}, {'court': 2, 'facilityId': 'n-2'}]},
+        {'name': 'South', 'baseUrl': 'https://south.perfectmind.com', 'courts': [{'court': 1, 'facilityId': 's-1'}]}
+    ]}))
+    def test_check_court_availability_reports_failed_courts(self, mock_file, mock_session_class):
+        """Test that courts of a failing host and courts whose request failed are reported as failed"""
+        def make_session(**kwargs):
+            session = MagicMock()
+            if kwargs['venue'].name == 'South':
+                session.check_all_courts.side_effect = RuntimeError("tenant down")
+            else:
+                session.check_all_courts.return_value = {
+                    'North 1': {'facility_id': 'n-1', 'availability': {'test': 'data'}},
+                    'North 2': {'facility_id': 'n-2', 'availability': None, 'error': 'Failed to get availability data'}
+                }
+                session.parse_availability_data.return_value = []
+            return session
+
+        mock_session_class.side_effect = make_session
+        failed_courts = set()
+
+        check_court_availability(failed_courts=failed_courts)
+
+        assert failed_courts == {'North 2', 'South 1'}
@@ -0,0 +1,47 @@
+from src.duration_index import DurationIndex
+
+
+def slot(date, time, duration):
+    return {'date': date, 'time': time, 'duration': duration}
+
+
+class TestDurationIndex:
+    """Test cases for DurationIndex"""
+
+    def test_add_slots_groups_durations_by_start(self):
+        """Test that durations for the same start are collected together"""
+        index = DurationIndex()
+        index.add_slots('f1', [
+            slot('2025-10-15', '10:00', '60min'),
+            slot('2025-10-15', '10:00', '90min'),
+            slot('2025-10-15', '11:00', '60min')
+        ])
+
+        assert len(index) == 2
+        assert index.durations('f1', '2025-10-15', '10:00') == {60, 90}
+        assert index.durations('f1', '2025-10-15', 660) == {60}
+        assert index.durations('f2', '2025-10-15', '10:00') == frozenset()
+
+    def test_wanted_durations_filter(self):
+        """Test that durations outside the wanted set are ignored"""
+        index = DurationIndex([60, 120])
+        index.add_slots('f1', [slot('2025-10-15', '10:00', '90min'), slot('2025-10-15', '10:00', '120min')])
+
+        assert index.durations('f1', '2025-10-15', '10:00') == {120}
+        assert index.durations_seen() == {120}
+
+    def test_starts_for_duration(self):
+        """Test listing start times bookable for one duration"""
+        index = DurationIndex()
+        index.add_slots('f2', [slot('2025-10-16', '09:00', '90min')])
+        index.add_slots('f1', [slot('2025-10-15', '18:30', '90min'), slot('2025-10-15', '07:30', '60min')])
+
+        assert index.starts_for(90) == [('f1', '2025-10-15', 1110), ('f2', '2025-10-16', 540)]
+
+    def test_to_dict(self):
+        """Test the readable form"""
+        index = DurationIndex()
+        index.add('f1', '2025-10-15', 600, 90)
+        index.add('f1', '2025-10-15', 600, 60)
+
+        assert index.to_dict() == {('f1', '2025-10-15', '10:00'): [60, 90]}
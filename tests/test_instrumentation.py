@@ -0,0 +1,165 @@
+import pytest
+import json
+import logging
+from unittest.mock import patch
+from src.instrumentation import (
+    DISABLED, NULL_PHASE, Instrumentation, JsonLinesExporter, LogSummaryExporter, PrometheusTextExporter
+)
+
+
+class RecordingExporter:
+    def __init__(self):
+        self.reports = []
+
+    def export(self, report):
+        self.reports.append(report)
+
+
+class TestInstrumentation:
+    """Test cases for Instrumentation"""
+
+    def test_disabled_is_no_op(self):
+        """Test that a disabled collector hands out the shared null phase and records nothing"""
+        assert DISABLED.phase('post', 'facility-1') is NULL_PHASE
+        DISABLED.add('bytes', 10)
+        assert DISABLED.end_cycle() is None
+
+    def test_enabled_by_exporters(self):
+        """Test that instrumentation is on only when an exporter is configured"""
+        assert not Instrumentation().enabled
+        assert Instrumentation([RecordingExporter()]).enabled
+
+    def test_cycle_report(self):
+        """Test that phases and counters are aggregated per facility and exported"""
+        exporter = RecordingExporter()
+        metrics = Instrumentation([exporter])
+        metrics.begin_cycle()
+        metrics.record('post', 0.2, 'facility-1')
+        metrics.record('post', 0.4, 'facility-1')
+        metrics.add('bytes', 100, 'facility-1')
+        metrics.add('bytes', 50, 'facility-1')
+        with metrics.phase('diff'):
+            pass
+        report = metrics.end_cycle()
+
+        assert exporter.reports == [report]
+        post = next(e for e in report['phases'] if e['phase'] == 'post')
+        assert post == {'phase': 'post', 'facility': 'facility-1', 'count': 2,
+                        'seconds': pytest.approx(0.6), 'max_seconds': 0.4}
+        assert {'name': 'bytes', 'facility': 'facility-1', 'value': 150} in report['counters']
+        assert any(e['phase'] == 'diff' and e['facility'] is None for e in report['phases'])
+        assert metrics.end_cycle()['phases'] == []
+
+    def test_nested_phase_inherits_facility(self):
+        """Test that phases and counters inside a facility phase are attributed to it"""
+        metrics = Instrumentation([RecordingExporter()])
+        with metrics.phase('parse', 'facility-1'):
+            with metrics.phase('decode'):
+                metrics.add('slots', 3)
+        with metrics.phase('format'):
+            pass
+        report = metrics.end_cycle()
+
+        facilities = {e['phase']: e['facility'] for e in report['phases']}
+        assert facilities == {'parse': 'facility-1', 'decode': 'facility-1', 'format': None}
+        assert report['counters'] == [{'name': 'slots', 'facility': 'facility-1', 'value': 3}]
+
+    def test_nested_phase_time_is_not_counted_twice(self):
+        """Test that time in a nested phase is taken out of the phase around it"""
+        metrics = Instrumentation([RecordingExporter()])
+        clock = iter([0.0, 1.0, 3.5, 4.0])
+        with patch('src.instrumentation.time.perf_counter', side_effect=lambda: next(clock)):
+            with metrics.phase('parse', 'facility-1'):
+                with metrics.phase('decode'):
+                    pass
+        report = metrics.end_cycle()
+
+        seconds = {e['phase']: e['seconds'] for e in report['phases']}
+        assert seconds == {'parse': pytest.approx(1.5), 'decode': pytest.approx(2.5)}
+
+    def test_detached_cycle_collects_late_phases(self):
+        """Test that a detached cycle keeps its later phases apart from the next cycle and exports after its parts"""
+        exporter = RecordingExporter()
+        metrics = Instrumentation([exporter])
+        metrics.begin_cycle()
+        metrics.record('post', 0.1, 'facility-1')
+        cycle = metrics.detach_cycle()
+        cycle.expect(2)
+
+        metrics.begin_cycle()
+        metrics.record('post', 0.3, 'facility-1')
+        with cycle.use():
+            with metrics.phase('twilio'):
+                pass
+        assert cycle.done() is None
+        assert cycle.done() is None
+        report = cycle.done()
+
+        assert exporter.reports == [report]
+        assert sorted(e['phase'] for e in report['phases']) == ['post', 'twilio']
+        assert next(e for e in report['phases'] if e['phase'] == 'post')['seconds'] == 0.1
+        assert [e['phase'] for e in metrics.end_cycle()['phases']] == ['post']
+
+    def test_failing_exporter_does_not_break_cycle(self):
+        """Test that an exporter error is logged and the others still run"""
+        class Broken:
+            def export(self, report):
+                raise OSError("disk full")
+
+        exporter = RecordingExporter()
+        metrics = Instrumentation([Broken(), exporter])
+        metrics.end_cycle()
+        assert len(exporter.reports) == 1
+
+    def test_from_env(self, monkeypatch, tmp_path):
+        """Test that METRICS_EXPORTERS selects the exporters"""
+        monkeypatch.setenv('METRICS_EXPORTERS', 'prometheus, jsonl,log')
+        monkeypatch.setenv('METRICS_PROMETHEUS_PATH', str(tmp_path / 'm.prom'))
+        monkeypatch.setenv('METRICS_JSONL_PATH', str(tmp_path / 'm.jsonl'))
+        metrics = Instrumentation.from_env()
+        assert [type(e) for e in metrics.exporters] == [PrometheusTextExporter, JsonLinesExporter, LogSummaryExporter]
+
+        monkeypatch.setenv('METRICS_EXPORTERS', '')
+        assert not Instrumentation.from_env().enabled
+
+
+class TestExporters:
+    """Test cases for the metrics exporters"""
+
+    def make_report(self):
+        metrics = Instrumentation([RecordingExporter()])
+        metrics.record('post', 0.25, 'facility-1')
+        metrics.record('twilio', 0.5)
+        metrics.add('bytes', 1200, 'facility-1')
+        return metrics.end_cycle()
+
+    def test_json_lines(self, tmp_path):
+        """Test that each cycle is appended as one JSON line"""
+        path = tmp_path / 'metrics.jsonl'
+        exporter = JsonLinesExporter(str(path))
+        exporter.export(self.make_report())
+        exporter.export(self.make_report())
+
+        lines = path.read_text().splitlines()
+        assert len(lines) == 2
+        assert json.loads(lines[0])['phases'][0]['phase'] == 'post'
+
+    def test_prometheus_accumulates(self, tmp_path):
+        """Test that phase totals accumulate across cycles in the text format"""
+        path = tmp_path / 'metrics.prom'
+        exporter = PrometheusTextExporter(str(path))
+        exporter.export(self.make_report())
+        exporter.export(self.make_report())
+
+        text = path.read_text()
+        assert 'court_checker_cycles_total 2' in text
+        assert 'court_checker_phase_seconds_total{phase="post",facility="facility-1"} 0.500000' in text
+        assert 'court_checker_phase_calls_total{phase="twilio"} 2' in text
+        assert 'court_checker_bytes_total{facility="facility-1"} 2400' in text
+        assert 'court_checker_last_cycle_bytes{facility="facility-1"} 1200' in text
+
+    def test_log_summary(self, caplog):
+        """Test that the summary lists phases in pipeline order with counters"""
+        with caplog.at_level(logging.INFO):
+            LogSummaryExporter(logging.getLogger('test')).export(self.make_report())
+        assert 'post 250 ms, twilio 500 ms; bytes 1200' in caplog.text
@@ -1,6 +1,5 @@
-import pytest
 import json
-from PerfectMindSession import PerfectMindSession
+from src.PerfectMindSession import PerfectMindSession
 
 
 class TestParseAvailabilityData:
@@ -105,4 +104,44 @@ class TestParseAvailabilityData:
 
         # Each date should have at least 1 slot
         for date, date_slots in slots_by_date.items():
-            assert len(date_slots) >= 1
\ No newline at end of file
+            assert len(date_slots) >= 1
+
+    def test_parse_availability_data_raw_body_matches_decoded(self):
+        """Test that parsing the raw JSON body gives the same slots as the decoded dict"""
+        test_data = self.load_test_data()
+        body = json.dumps(test_data, separators=(',', ':')).encode()
+
+        assert self.session.parse_availability_data(body) == self.session.parse_availability_data(test_data)
+
+    def test_parse_availability_data_raw_body_escaped_dates(self):
+        """Test raw bodies with the server's escaped \\/Date(ms)\\/ values and escaped strings"""
+        body = (b'{"availabilities":[{"Date":"\\/Date(1759795200000)\\/","BookingGroups":[{"Name":"Morning","Order":0,'
+                b'"AvailableSpots":[{"Ticks":1,"Time":{"Hours":8,"Minutes":30,"Seconds":0},'
+                b'"Duration":{"Hours":1,"Minutes":30,"Seconds":0},"ResourceIds":null,"IsDisabled":true,'
+                b'"Title":"Book \\u0027Now\\u0027"}]}]}],"extraDaysInfo":null}')
+        slots = self.session.parse_availability_data(body)
+
+        assert slots == [{
+            'date': '2025-10-07',
+            'time': '08:30',
+            'duration': '90min',
+            'group': 'Morning',
+            'title': "Book 'Now'",
+            'ticks': 1,
+            'is_disabled': True
+        }]
+
+    def test_parse_availability_data_raw_body_unknown_layout(self):
+        """Test that a raw body with reordered keys falls back to a full JSON decode"""
+        body = (b'{"availabilities":[{"Date":"/Date(1759795200000)/","BookingGroups":[{"Name":"Late",'
+                b'"AvailableSpots":[{"Title":"Book Now!","IsDisabled":false,"Ticks":5,'
+                b'"Duration":{"Minutes":0,"Hours":1},"Time":{"Minutes":0,"Hours":21}}]}]}]}')
+        slots = self.session.parse_availability_data(body)
+
+        assert len(slots) == 1
+        assert slots[0]['time'] == '21:00'
+        assert slots[0]['duration'] == '60min'
+
+    def test_parse_availability_data_raw_body_invalid(self):
+        """Test that an invalid raw body yields no slots"""
+        assert self.session.parse_availability_data(b'<html>oops</html>') == []
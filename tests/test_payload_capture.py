@@ -0,0 +1,63 @@
+import os
+from src.payload_capture import PayloadCapture
+
+
+class TestPayloadCapture:
+    """Test cases for PayloadCapture"""
+
+    def test_samples_one_in_n(self, tmp_path):
+        """Test that only every Nth response is written"""
+        capture = PayloadCapture(str(tmp_path), sample_every=3)
+        paths = [capture.capture('facility-1', b'{"n": %d}' % i) for i in range(6)]
+
+        assert [path is not None for path in paths] == [False, False, True, False, False, True]
+        with open(paths[2], 'rb') as f:
+            assert f.read() == b'{"n": 2}'
+        assert 'facility-1-200' in os.path.basename(paths[2])
+
+    def test_rotates_by_file_count(self, tmp_path):
+        """Test that the oldest captures are removed beyond max_files"""
+        capture = PayloadCapture(str(tmp_path), sample_every=1, max_files=2)
+        paths = [capture.capture(f'facility-{i}', b'{}') for i in range(4)]
+
+        assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(p) for p in paths[2:])
+
+    def test_rotates_by_size(self, tmp_path):
+        """Test that the total size stays under max_bytes"""
+        capture = PayloadCapture(str(tmp_path), sample_every=1, max_bytes=25)
+        for i in range(5):
+            capture.capture(f'facility-{i}', b'x' * 10)
+
+        sizes = [entry.stat().st_size for entry in os.scandir(tmp_path)]
+        assert sum(sizes) <= 25
+
+    def test_rotation_keeps_other_files(self, tmp_path):
+        """Test that rotation only ever removes files written by capture()"""
+        (tmp_path / 'notes.txt').write_text('keep me')
+        (tmp_path / '20250101T000000-00000001-facility-200.json.bak').write_text('keep me too')
+        capture = PayloadCapture(str(tmp_path), sample_every=1, max_files=1)
+        paths = [capture.capture(f'facility-{i}', b'{}') for i in range(3)]
+
+        assert sorted(os.listdir(tmp_path)) == sorted([
+            'notes.txt', '20250101T000000-00000001-facility-200.json.bak', os.path.basename(paths[-1])
+        ])
+
+    def test_extension_follows_content_type(self, tmp_path):
+        """Test that an HTML error page is not saved as .json"""
+        capture = PayloadCapture(str(tmp_path), sample_every=1)
+
+        assert capture.capture('facility-1', b'<html>', 403, 'text/html; charset=utf-8').endswith('-403.html')
+        assert capture.capture('facility-1', b'{}', 200, 'application/json; charset=utf-8').endswith('-200.json')
+        assert capture.capture('facility-1', b'{}').endswith('-200.json')
+        assert capture.capture('facility-1', b'\x00', 200, 'application/octet-stream').endswith('-200.bin')
+
+    def test_from_env(self, monkeypatch, tmp_path):
+        """Test that capture is off unless PAYLOAD_CAPTURE_DIR is set"""
+        monkeypatch.delenv('PAYLOAD_CAPTURE_DIR', raising=False)
+        assert PayloadCapture.from_env() is None
+
+        monkeypatch.setenv('PAYLOAD_CAPTURE_DIR', str(tmp_path / 'captures'))
+        monkeypatch.setenv('PAYLOAD_CAPTURE_SAMPLE_EVERY', '10')
+        capture = PayloadCapture.from_env()
+        assert capture.sample_every == 10
+        assert os.path.isdir(tmp_path / 'captures')
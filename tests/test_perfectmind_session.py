@@ -0,0 +1,515 @@
+import pytest
+import json
+import logging
+import requests
+import threading
+import time
+from datetime import date, timedelta
+from unittest.mock import patch, MagicMock
+from src.PerfectMindSession import PerfectMindSession
+from src.availability_cache import AvailabilityCache
+from src.upstream_controller import UpstreamController
+from src.venue_config import Venue
+from src.watch_spec import WatchSpec
+
+
+COURTS_CONFIG = {
+    'courts': [
+        {'court': 1, 'facilityId': 'facility-1'},
+        {'court': 2, 'facilityId': 'facility-2'},
+        {'court': 3, 'facilityId': 'facility-3'},
+        {'court': 4, 'facilityId': 'facility-4'}
+    ]
+}
+
+
+class TestCheckAllCourts:
+    """Test cases for check_all_courts method"""
+
+    def setup_method(self):
+        """Setup test instance with a pre-fetched token"""
+        self.session = PerfectMindSession()
+        self.session.verification_token = 'token'
+
+    def test_check_all_courts_sequential_result_shape(self):
+        """Test that sequential mode keeps the court_num -> result shape"""
+        with patch.object(self.session, 'check_availability', side_effect=lambda fid: {'id': fid}):
+            results = self.session.check_all_courts(COURTS_CONFIG)
+
+        assert list(results.keys()) == [1, 2, 3, 4]
+        assert results[2]['facility_id'] == 'facility-2'
+        assert results[2]['availability'] == {'id': 'facility-2'}
+        assert results[2]['elapsed'] >= 0
+
+    def test_check_all_courts_concurrent_matches_sequential(self):
+        """Test that concurrent mode returns the same results as sequential mode"""
+        def fake_check(facility_id):
+            return None if facility_id == 'facility-3' else {'id': facility_id}
+
+        with patch.object(self.session, 'check_availability', side_effect=fake_check):
+            sequential = self.session.check_all_courts(COURTS_CONFIG)
+            concurrent = self.session.check_all_courts(COURTS_CONFIG, max_concurrency=4)
+
+        for results in (sequential, concurrent):
+            for data in results.values():
+                data.pop('elapsed')
+        assert concurrent == sequential
+        assert concurrent[3]['error'] == 'Failed to get availability data'
+
+    def test_check_all_courts_runs_in_parallel(self):
+        """Test that courts are fetched concurrently up to max_concurrency"""
+        active = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def slow_check(facility_id):
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.05)
+            with lock:
+                active -= 1
+            return {'id': facility_id}
+
+        with patch.object(self.session, 'check_availability', side_effect=slow_check):
+            self.session.check_all_courts(COURTS_CONFIG, max_concurrency=2)
+
+        assert peak == 2
+
+    def test_check_all_courts_fetches_token_once(self):
+        """Test that concurrent mode fetches a shared token before fanning out"""
+        self.session.verification_token = None
+
+        def fake_token(facility_id):
+            self.session.verification_token = 'shared'
+            return True
+
+        with patch.object(self.session, 'get_verification_token', side_effect=fake_token) as mock_token, \
+                patch.object(self.session, 'check_availability', return_value={'ok': True}):
+            self.session.check_all_courts(COURTS_CONFIG, max_concurrency=4)
+
+        mock_token.assert_called_once_with('facility-1')
+
+
+class TestTokenReuse:
+    """Test cases for cached and rejected verification tokens"""
+
+    def make_response(self, status_code=200, payload=None, content_type='application/json'):
+        response = MagicMock()
+        response.status_code = status_code
+        response.headers = {'Content-Type': content_type}
+        response.json.return_value = payload
+        return response
+
+    def test_restores_token_from_cache(self):
+        """Test that a cached token avoids scraping the landing page"""
+        cache = MagicMock()
+        cache.load.return_value = {
+            'token': 'cached-token',
+            'cookies': [{'name': 'PMSessionId', 'value': 'sid', 'domain': '', 'path': '/'}]
+        }
+        session = PerfectMindSession(token_cache=cache)
+
+        with patch.object(session, 'get_verification_token') as mock_token, \
+                patch.object(session.session, 'post', return_value=self.make_response(payload={'ok': 1})) as mock_post:
+            result = session.check_availability('facility-1')
+
+        assert result == {'ok': 1}
+        mock_token.assert_not_called()
+        assert mock_post.call_args.kwargs['data']['__RequestVerificationToken'] == 'cached-token'
+        assert session.session_id == 'sid'
+
+    def test_rejected_token_is_refreshed_once(self):
+        """Test that a rejected token is invalidated, re-fetched and the request retried"""
+        cache = MagicMock()
+        cache.load.return_value = None
+        session = PerfectMindSession(token_cache=cache)
+        session.verification_token = 'stale'
+        session.token_used_at = time.time() - 300
+
+        def fake_token(facility_id):
+            session.verification_token = 'fresh'
+            return True
+
+        responses = [self.make_response(status_code=403), self.make_response(payload={'ok': 1})]
+        with patch.object(session, 'get_verification_token', side_effect=fake_token), \
+                patch.object(session.session, 'post', side_effect=responses) as mock_post:
+            result = session.check_availability('facility-1')
+
+        assert result == {'ok': 1}
+        cache.invalidate.assert_called_once()
+        cache.learn.assert_called_once()
+        assert cache.learn.call_args.args[0] == pytest.approx(300, abs=5)
+        assert mock_post.call_count == 2
+        assert mock_post.call_args.kwargs['data']['__RequestVerificationToken'] == 'fresh'
+
+    def test_rejection_a_fresh_token_does_not_fix_teaches_nothing(self):
+        """Test that a 403 that persists with a fresh token is not learned as a token timeout"""
+        cache = MagicMock()
+        cache.load.return_value = None
+        session = PerfectMindSession(token_cache=cache)
+        session.verification_token = 'stale'
+        session.token_used_at = time.time() - 300
+
+        def fake_token(facility_id):
+            session.verification_token = 'fresh'
+            return True
+
+        responses = [self.make_response(status_code=403), self.make_response(status_code=403)]
+        responses[1].raise_for_status.side_effect = requests.HTTPError('403 Forbidden')
+        with patch.object(session, 'get_verification_token', side_effect=fake_token), \
+                patch.object(session.session, 'post', side_effect=responses):
+            assert session.check_availability('facility-1') is None
+
+        cache.invalidate.assert_called_once()
+        cache.learn.assert_not_called()
+
+    def test_expired_token_is_refreshed_before_use(self):
+        """Test that a token past its lifetime is re-fetched without a wasted request"""
+        session = PerfectMindSession()
+        session.verification_token = 'old'
+        session.token_expires_at = time.time() - 1
+
+        def fake_token(facility_id):
+            session.verification_token = 'fresh'
+            return True
+
+        with patch.object(session, 'get_verification_token', side_effect=fake_token) as mock_token, \
+                patch.object(session.session, 'post', return_value=self.make_response(payload={'ok': 1})) as mock_post:
+            session.check_availability('facility-1')
+
+        mock_token.assert_called_once()
+        assert mock_post.call_count == 1
+        assert mock_post.call_args.kwargs['data']['__RequestVerificationToken'] == 'fresh'
+
+    def test_accepted_request_extends_token_lifetime(self):
+        """Test that each accepted request pushes the token expiry out"""
+        session = PerfectMindSession()
+        session.verification_token = 'token'
+        session.token_expires_at = time.time() + 5
+
+        with patch.object(session.session, 'post', return_value=self.make_response(payload={'ok': 1})):
+            session.check_availability('facility-1')
+
+        assert session.token_expires_at > time.time() + 60
+
+    def test_html_response_counts_as_rejection(self):
+        """Test that an HTML page instead of JSON triggers re-authentication"""
+        session = PerfectMindSession()
+        assert session._is_token_rejected(self.make_response(content_type='text/html; charset=utf-8'))
+        assert not session._is_token_rejected(self.make_response())
+
+
+class TestVenues:
+    """Test cases for venue-specific request parameters"""
+
+    def test_registered_venue_ids_used_for_its_courts(self):
+        """Test that each facility's request carries its own venue's IDs"""
+        other = Venue(name='Other', base_url='https://cityofmarkham.perfectmind.com', widget_id='widget-2',
+                      calendar_id='calendar-2', service_id='service-2', duration_ids=('duration-2',),
+                      courts=({'court': 1, 'facilityId': 'other-1'},))
+        session = PerfectMindSession()
+        session.register_venue(other)
+        session.verification_token = 'token'
+
+        response = MagicMock(status_code=200, headers={'Content-Type': 'application/json'})
+        with patch.object(session.session, 'post', return_value=response) as mock_post:
+            session.check_availability('other-1')
+            session.check_availability('facility-1')
+
+        other_call, default_call = mock_post.call_args_list
+        assert other_call.kwargs['data']['serviceId'] == 'service-2'
+        assert other_call.kwargs['data']['durationIds[]'] == ['duration-2']
+        assert 'widgetId=widget-2' in other_call.kwargs['headers']['Referer']
+        assert default_call.kwargs['data']['serviceId'] == session.venue.service_id
+
+    def test_request_template_built_once_per_facility(self):
+        """Test that the Referer and service fields are reused across requests"""
+        session = PerfectMindSession()
+        session.verification_token = 'token'
+
+        response = MagicMock(status_code=200, headers={'Content-Type': 'application/json'})
+        with patch.object(session.session, 'post', return_value=response) as mock_post, \
+                patch.object(session, '_landing_page_back_url', wraps=session._landing_page_back_url) as mock_back_url:
+            session.check_availability('facility-1')
+            session.check_availability('facility-1', date='2025-10-20')
+
+        mock_back_url.assert_called_once()
+        first, second = mock_post.call_args_list
+        assert list(first.kwargs['data']) == ['facilityId', 'date', 'daysCount', 'duration', 'serviceId',
+                                              'durationIds[]', '__RequestVerificationToken']
+        assert first.kwargs['headers']['Referer'].startswith(
+            f"{session.base_url}/Clients/BookMe4LandingPages/Facility?facilityId=facility-1&")
+        assert 'landingPageBackUrl=' in second.kwargs['headers']['Referer']
+        assert first.kwargs['headers']['Origin'] == session.base_url
+
+    def test_venue_sets_base_url(self):
+        """Test that the venue's host is used unless base_url overrides it"""
+        venue = Venue(name='Other', base_url='https://other.perfectmind.com')
+        assert PerfectMindSession(venue=venue).base_url == 'https://other.perfectmind.com'
+        assert PerfectMindSession(venue=venue, base_url='http://127.0.0.1:8080/').base_url == 'http://127.0.0.1:8080'
+
+
+class TestLogging:
+    """Test cases for lazy logging and payload capture in the request path"""
+
+    def test_debug_payload_not_formatted_when_debug_off(self):
+        """Test that the decoded response is not stringified unless DEBUG is enabled"""
+        class Payload(dict):
+            formatted = 0
+
+            def __repr__(self):
+                Payload.formatted += 1
+                return 'payload'
+
+        logger = logging.getLogger('test-lazy')
+        logger.setLevel(logging.INFO)
+        session = PerfectMindSession(logger=logger)
+        session.verification_token = 'token'
+        response = MagicMock(status_code=200, headers={'Content-Type': 'application/json'})
+        response.json.return_value = Payload(ok=1)
+
+        with patch.object(session.session, 'post', return_value=response):
+            session.check_availability('facility-1')
+        assert Payload.formatted == 0
+
+    def test_responses_are_captured(self):
+        """Test that the raw body of each response is offered to the capture store"""
+        capture = MagicMock()
+        session = PerfectMindSession(capture=capture)
+        session.verification_token = 'token'
+        response = MagicMock(status_code=200, headers={'Content-Type': 'application/json'}, content=b'{}')
+
+        with patch.object(session.session, 'post', return_value=response):
+            session.check_availability('facility-1')
+        capture.capture.assert_called_once_with('facility-1', b'{}', 200, 'application/json')
+
+
+class TestUpstreamIntegration:
+    """Test cases for requests routed through an UpstreamController"""
+
+    def make_response(self, status_code=200, payload=None):
+        response = MagicMock()
+        response.status_code = status_code
+        response.headers = {'Content-Type': 'application/json'}
+        response.json.return_value = payload
+        return response
+
+    def test_open_circuit_serves_last_good_availability(self):
+        """Test that a facility's last good payload is served while the circuit is open"""
+        upstream = UpstreamController(max_retries=0, failure_threshold=1, sleep=lambda s: None)
+        session = PerfectMindSession(upstream=upstream)
+        session.verification_token = 'token'
+
+        responses = [self.make_response(payload={'ok': 1}), self.make_response(status_code=503)]
+        with patch.object(session.session, 'post', side_effect=responses) as mock_post:
+            assert session.check_availability('facility-1') == {'ok': 1}
+            assert session.check_availability('facility-1') is None
+            assert session.check_availability('facility-1') == {'ok': 1}
+
+        assert mock_post.call_count == 2
+
+    def test_last_good_payload_does_not_extend_token(self):
+        """Test that a payload served by the open circuit leaves the token expiry and capture alone"""
+        upstream = UpstreamController(max_retries=0, failure_threshold=1, sleep=lambda s: None)
+        capture = MagicMock()
+        session = PerfectMindSession(upstream=upstream, capture=capture)
+        session.verification_token = 'token'
+
+        responses = [self.make_response(payload={'ok': 1}), self.make_response(status_code=503)]
+        with patch.object(session.session, 'post', side_effect=responses):
+            session.check_availability('facility-1')
+            session.check_availability('facility-1')
+            expires_at = session.token_expires_at
+            captured = capture.capture.call_count
+            assert session.check_availability('facility-1') == {'ok': 1}
+
+        assert session.token_expires_at == expires_at
+        assert capture.capture.call_count == captured
+
+    def test_open_circuit_without_last_good_returns_none(self):
+        """Test that an open circuit with nothing to serve is reported as a failed check"""
+        upstream = UpstreamController(max_retries=0, failure_threshold=1, sleep=lambda s: None)
+        session = PerfectMindSession(upstream=upstream)
+        session.verification_token = 'token'
+
+        with patch.object(session.session, 'post', return_value=self.make_response(status_code=503)):
+            session.check_availability('facility-1')
+            assert session.check_availability('facility-2') is None
+
+
+class TestAvailabilityFingerprint:
+    """Test cases for fingerprint-based reuse in check_all_courts"""
+
+    def make_response(self, body):
+        response = MagicMock()
+        response.status_code = 200
+        response.headers = {'Content-Type': 'application/json'}
+        response.content = body
+        response.json.side_effect = lambda: json.loads(body)
+        return response
+
+    def test_unchanged_body_skips_decode(self):
+        """Test that a repeated body returns the cached value without decoding"""
+        session = PerfectMindSession()
+        session.verification_token = 'token'
+        cache = AvailabilityCache()
+        config = {'courts': [{'court': 1, 'facilityId': 'facility-1'}]}
+
+        first = self.make_response(b'{"availabilities": []}')
+        with patch.object(session.session, 'post', return_value=first):
+            results = session.check_all_courts(config, availability_cache=cache)
+        assert results[1]['availability'] == b'{"availabilities": []}'
+        first.json.assert_not_called()
+        cache.put('facility-1', results[1]['fingerprint'], ['parsed'])
+
+        second = self.make_response(b'{"availabilities": []}')
+        with patch.object(session.session, 'post', return_value=second):
+            results = session.check_all_courts(config, availability_cache=cache)
+
+        assert results[1]['cached'] == ['parsed']
+        assert results[1]['availability'] is None
+        second.json.assert_not_called()
+        assert cache.stats()['hits'] == 1
+
+    def test_changed_watch_misses(self):
+        """Test that a result parsed with one watch spec or horizon is not reused with another"""
+        session = PerfectMindSession()
+        session.verification_token = 'token'
+        cache = AvailabilityCache()
+        config = {'courts': [{'court': 1, 'facilityId': 'facility-1'}]}
+        spec = WatchSpec.from_config({'times': ['18:00-22:00'], 'horizonDays': 3})
+        body = b'{"availabilities": []}'
+
+        session.watch = spec.compile(date(2025, 10, 6))
+        with patch.object(session.session, 'post', return_value=self.make_response(body)):
+            results = session.check_all_courts(config, availability_cache=cache)
+        cache.put('facility-1', results[1]['fingerprint'], ['evenings'])
+
+        next_day = spec.compile(date(2025, 10, 7))
+        wider = WatchSpec.from_config({'times': ['06:00-22:00'], 'horizonDays': 3}).compile(date(2025, 10, 6))
+        for watch in (next_day, wider, None):
+            session.watch = watch
+            with patch.object(session.session, 'post', return_value=self.make_response(body)):
+                assert session.check_all_courts(config, availability_cache=cache)[1]['availability'] == body
+
+        session.watch = spec.compile(date(2025, 10, 6))
+        with patch.object(session.session, 'post', return_value=self.make_response(body)):
+            assert session.check_all_courts(config, availability_cache=cache)[1]['cached'] == ['evenings']
+
+
+class TestGetVerificationToken:
+    """Test cases for get_verification_token"""
+
+    def make_streaming_response(self, body, chunk_size=512):
+        response = MagicMock()
+        response.iter_content.return_value = (body[i:i + chunk_size] for i in range(0, len(body), chunk_size))
+        return response
+
+    def test_get_verification_token_from_landing_page(self):
+        """Test that the token is scanned from the streamed landing page"""
+        with open('tests/fixtures/landing_page.html', 'rb') as f:
+            body = f.read()
+        session = PerfectMindSession()
+
+        with patch.object(session.session, 'get', return_value=self.make_streaming_response(body)) as mock_get:
+            assert session.get_verification_token('facility-1') is True
+
+        assert session.verification_token.startswith('CfDJ8Kx2rV9w')
+        assert mock_get.call_args.kwargs['stream'] is True
+
+    def test_get_verification_token_falls_back_to_full_parse(self):
+        """Test that an unexpected layout is handed to the BeautifulSoup parser"""
+        body = b'<form id="AjaxAntiForgeryForm"></form><input name="__RequestVerificationToken" value="x">'
+        session = PerfectMindSession()
+
+        with patch.object(session.session, 'get', return_value=self.make_streaming_response(body, 8)), \
+                patch('src.PerfectMindSession.parse_verification_token', return_value='parsed') as mock_parse:
+            assert session.get_verification_token('facility-1') is True
+
+        mock_parse.assert_called_once_with(body)
+        assert session.verification_token == 'parsed'
+
+
+class TestGetHorizonAvailability:
+    """Test cases for get_horizon_availability and get_complete_availability"""
+
+    def test_get_complete_availability_uses_two_windows(self):
+        """Test that 8 days are covered by a 7-day and a 1-day request"""
+        session = PerfectMindSession()
+        with patch.object(session, 'check_availability', return_value=None) as mock_check:
+            assert session.get_complete_availability('facility-1') == []
+
+        days = [call.kwargs['days_count'] for call in mock_check.call_args_list]
+        assert days == [7, 1]
+
+    def test_first_window_starts_now(self):
+        """Test that the window starting today asks from the current time and later ones from midnight"""
+        session = PerfectMindSession()
+        today = date.fromisoformat(session._get_current_datetime()[:10])
+        with patch.object(session, 'check_availability', return_value=None) as mock_check:
+            session.get_horizon_availability(['facility-1'], 14)
+
+        starts = [call.kwargs['date'] for call in mock_check.call_args_list]
+        assert starts == [None, (today + timedelta(days=7)).isoformat()]
+
+    def test_get_horizon_availability_concurrent(self):
+        """Test that planned windows can run concurrently and are merged per facility"""
+        session = PerfectMindSession()
+        session.verification_token = 'token'
+        parsed = [{'date': '2099-01-01', 'time': '10:00', 'duration': '60min'}]
+
+        with patch.object(session, 'check_availability', return_value={'any': 1}) as mock_check, \
+                patch.object(session, 'parse_availability_data', return_value=parsed):
+            results = session.get_horizon_availability(['facility-1', 'facility-2'], 14, max_concurrency=4)
+
+        assert mock_check.call_count == 4
+        assert set(results) == {'facility-1', 'facility-2'}
+
+    def test_get_duration_index_learns_single_request(self):
+        """Test that one request per window is used once the server returns every duration"""
+        session = PerfectMindSession()
+        session.verification_token = 'token'
+        today = session._get_current_datetime()[:10]
+        parsed = [
+            {'date': today, 'time': '10:00', 'duration': '60min'},
+            {'date': today, 'time': '10:00', 'duration': '90min'}
+        ]
+
+        with patch.object(session, 'check_availability', return_value={'any': 1}) as mock_check, \
+                patch.object(session, 'parse_availability_data', return_value=parsed):
+            index = session.get_duration_index(['facility-1', 'facility-2'], durations=[60, 90])
+            assert mock_check.call_count == 2
+            assert session.server_returns_all_durations is True
+
+            mock_check.reset_mock()
+            index = session.get_duration_index(['facility-1', 'facility-2'], durations=[60, 90])
+            assert mock_check.call_count == 2
+
+        assert {call.kwargs['duration'] for call in mock_check.call_args_list} == {60}
+        assert index.durations('facility-1', today, '10:00') == {60, 90}
+
+    def test_get_duration_index_probe_reused_per_duration(self):
+        """Test that a server answering only the requested duration costs one request per window and duration"""
+        session = PerfectMindSession()
+        session.verification_token = 'token'
+        today = session._get_current_datetime()[:10]
+
+        def parse(availability):
+            return [{'date': today, 'time': '10:00', 'duration': f"{availability['duration']}min"}]
+
+        def check(facility_id, date=None, days_count=7, duration=60):
+            return {'duration': duration}
+
+        with patch.object(session, 'check_availability', side_effect=check) as mock_check, \
+                patch.object(session, 'parse_availability_data', side_effect=parse):
+            index = session.get_duration_index(['facility-1'], durations=[60, 90])
+            assert [call.kwargs['duration'] for call in mock_check.call_args_list] == [60, 90]
+            assert session.server_returns_all_durations is False
+
+            mock_check.reset_mock()
+            session.get_duration_index(['facility-1'], durations=[60, 90])
+            assert mock_check.call_count == 2
+
+        assert index.durations('facility-1', today, '10:00') == {60, 90}
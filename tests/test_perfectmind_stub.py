@@ -0,0 +1,121 @@
+import json
+from datetime import date, timedelta
+from src.perfectmind_stub import FakeTransport, PerfectMindStub, load_fixture
+from src.PerfectMindSession import PerfectMindSession
+from src.synthetic_availability import generate_availability, generate_body
+
+
+FIXTURE = 'tests/fixtures/response.json'
+
+
+class TestSyntheticAvailability:
+    """Test cases for the synthetic response generator"""
+
+    def test_generated_body_parses_to_requested_days(self):
+        """Test that generated responses decode to slots on the requested dates"""
+        body = generate_body(date(2025, 10, 7), days_count=3, density=1.0)
+        slots = PerfectMindSession().parse_availability_data(body)
+
+        assert {slot['date'] for slot in slots} == {'2025-10-07', '2025-10-08', '2025-10-09'}
+        assert slots[0]['time'] == '07:00'
+        assert slots[0]['duration'] == '60min'
+        assert slots[0]['group'] == 'Morning'
+
+    def test_generation_is_deterministic(self):
+        """Test that the same seed gives the same response"""
+        first = generate_availability(date(2025, 10, 7), seed='a')
+        assert first == generate_availability(date(2025, 10, 7), seed='a')
+        assert first != generate_availability(date(2025, 10, 7), seed='b')
+
+
+class TestPerfectMindStub:
+    """Test cases for the local PerfectMind stand-in server"""
+
+    def test_session_replays_fixture(self):
+        """Test that a session pointed at the stub gets the recorded response"""
+        with PerfectMindStub(fixtures=FIXTURE) as stub:
+            session = PerfectMindSession(base_url=stub.url)
+            data = session.check_availability('facility-1')
+
+        assert json.dumps(data, separators=(',', ':')).encode() == load_fixture(FIXTURE)
+        assert session.verification_token.startswith('CfDJ8')
+        assert stub.stats['landing'] == 1
+
+    def test_session_gets_synthetic_availability(self):
+        """Test that facilities without fixtures get generated availability for the requested date"""
+        with PerfectMindStub(density=1.0) as stub:
+            session = PerfectMindSession(base_url=stub.url)
+            data = session.check_availability('facility-1', date='2025-10-07', days_count=2)
+
+        slots = session.parse_availability_data(data)
+        assert {slot['date'] for slot in slots} == {'2025-10-07', '2025-10-08'}
+
+    def test_unknown_token_rejected(self):
+        """Test that a token the stub did not issue is answered with 403"""
+        with PerfectMindStub() as stub:
+            session = PerfectMindSession(base_url=stub.url)
+            session.verification_token = 'forged'
+            response = session.session.post(
+                f"{stub.url}/Clients/BookMe4LandingPages/FacilityAvailability",
+                data={'facilityId': 'facility-1', '__RequestVerificationToken': 'forged'}
+            )
+
+        assert response.status_code == 403
+        assert stub.stats['rejected'] == 1
+
+    def test_error_rate(self):
+        """Test that injected errors surface as failed checks"""
+        with PerfectMindStub(error_rate=1.0) as stub:
+            session = PerfectMindSession(base_url=stub.url)
+            assert session.check_availability('facility-1') is None
+        assert stub.stats['errors'] == 1
+
+    def test_churn_changes_slots_between_requests(self):
+        """Test that churn opens and closes synthetic slots between requests"""
+        with PerfectMindStub(churn=0.5, seed=1) as stub:
+            session = PerfectMindSession(base_url=stub.url)
+            first = session.parse_availability_data(session.check_availability('facility-1', date='2025-10-07'))
+            second = session.parse_availability_data(session.check_availability('facility-1', date='2025-10-07'))
+
+        assert first != second
+
+    def test_without_churn_responses_are_stable(self):
+        """Test that repeated requests return the same slots when churn is off"""
+        with PerfectMindStub(seed=1) as stub:
+            session = PerfectMindSession(base_url=stub.url)
+            first = session.check_availability('facility-1', date='2025-10-07')
+            second = session.check_availability('facility-1', date='2025-10-07')
+
+        assert first == second
+
+
+class TestFakeTransport:
+    """Test cases for FakeTransport"""
+
+    def test_rejects_unknown_token(self):
+        """Test that availability requests need a token issued by the landing page"""
+        transport = FakeTransport()
+        response = transport.request('POST', 'https://x/Clients/BookMe4LandingPages/FacilityAvailability',
+                                     data={'__RequestVerificationToken': 'forged'})
+        assert response.status_code == 403
+
+    def test_custom_handler(self):
+        """Test that a handler replaces the built-in endpoints"""
+        transport = FakeTransport(handler=lambda method, url, params, data: (
+            200, {'Content-Type': 'application/json'}, b'{"availabilities": []}'))
+        response = transport.request('GET', 'https://x/anything', params={'a': 1})
+
+        assert response.json() == {'availabilities': []}
+        assert response.url == 'https://x/anything?a=1'
+        assert transport.calls == [('GET', 'https://x/anything', {'a': 1}, None)]
+
+    def test_synthetic_days_follow_request(self):
+        """Test that the requested start date and day count are served"""
+        transport = FakeTransport(density=1.0)
+        session = PerfectMindSession(transport=transport)
+        start = date.today() + timedelta(days=3)
+
+        data = session.check_availability('facility-1', date=start.isoformat(), days_count=2)
+
+        assert {slot['date'] for slot in session.parse_availability_data(data)} == \
+            {start.isoformat(), (start + timedelta(days=1)).isoformat()}
@@ -0,0 +1,295 @@
+import pytest
+import asyncio
+import os
+import signal
+import threading
+import time
+from datetime import date, datetime, timedelta
+from unittest.mock import MagicMock, patch
+from src import check_availability
+from src.availability_cache import AvailabilityCache
+from src.instrumentation import Instrumentation
+from src.pipeline import Pipeline, PipelineStalled, Stage
+from src.slot_event_log import SlotEventLog
+from src.slot_state import SlotStateStore
+from src.slot_table import SlotTable
+
+
+async def numbers(pipeline, count=None, interval=0.0):
+    n = 0
+    while count is None or n < count:
+        yield n
+        n += 1
+        if not await pipeline.sleep(interval):
+            return
+
+
+def run(coroutine, timeout=10):
+    return asyncio.run(asyncio.wait_for(coroutine, timeout))
+
+
+class TestPipeline:
+    """Test cases for Pipeline"""
+
+    def test_items_flow_through_stages(self):
+        """Test that outputs feed the next stage, lists fan out and None drops the item"""
+        results = []
+        pipeline = Pipeline([
+            Stage('double', lambda n: n * 2),
+            Stage('split', lambda n: [n, n + 1] if n % 4 == 0 else None),
+            Stage('collect', results.append, concurrency=3),
+        ])
+
+        run(pipeline.run(numbers(pipeline, count=5)))
+
+        assert sorted(results) == [0, 1, 4, 5, 8, 9]
+
+    def test_slow_stage_does_not_hold_up_the_source(self):
+        """Test that a slow last stage leaves the polling cadence alone while its queue has room"""
+        produced = []
+        sent = []
+
+        def slow_send(n):
+            time.sleep(0.3)
+            sent.append(n)
+
+        async def source(pipeline):
+            async for n in numbers(pipeline, count=5, interval=0.02):
+                produced.append(time.monotonic())
+                yield n
+
+        pipeline = Pipeline([Stage('fetch', lambda n: n), Stage('notify', slow_send, queue_size=8)])
+        run(pipeline.run(source(pipeline)))
+
+        assert produced[-1] - produced[0] < 0.25
+        assert sent == [0, 1, 2, 3, 4]
+
+    def test_timeout_and_errors_drop_only_that_item(self):
+        """Test that a failing or timed out item is reported and the next one still runs"""
+        errors = []
+        results = []
+
+        def handler(n):
+            if n == 1:
+                raise RuntimeError("boom")
+            if n == 2:
+                time.sleep(0.5)
+            return n
+
+        pipeline = Pipeline([Stage('work', handler, timeout=0.1), Stage('collect', results.append)],
+                            on_error=lambda stage, error: errors.append((stage, type(error))))
+        run(pipeline.run(numbers(pipeline, count=4)))
+
+        assert results == [0, 3]
+        assert errors == [('work', RuntimeError), ('work', asyncio.TimeoutError)]
+
+    def test_coroutine_handlers(self):
+        """Test that async handlers run on the loop"""
+        results = []
+
+        async def handler(n):
+            await asyncio.sleep(0)
+            results.append(threading.current_thread() is threading.main_thread())
+
+        pipeline = Pipeline([Stage('async', handler)])
+        run(pipeline.run(numbers(pipeline, count=2)))
+
+        assert results == [True, True]
+
+    def test_signal_stops_and_drains(self):
+        """Test that SIGTERM stops the source and queued items are still finished"""
+        finished = []
+
+        def handler(n):
+            if n == 2:
+                os.kill(os.getpid(), signal.SIGTERM)
+            time.sleep(0.05)
+            finished.append(n)
+
+        pipeline = Pipeline([Stage('work', handler, queue_size=4)])
+        run(pipeline.run(numbers(pipeline)))
+
+        assert pipeline.stopping
+        assert finished == list(range(len(finished)))
+        assert 3 <= len(finished) <= 8
+
+    def test_second_stop_cancels(self):
+        """Test that stopping twice abandons work that would not finish"""
+        release = threading.Event()
+
+        def handler(n):
+            release.wait(5)
+
+        pipeline = Pipeline([Stage('work', handler, queue_size=4)])
+
+        async def main():
+            task = asyncio.create_task(pipeline.run(numbers(pipeline, interval=0.01)))
+            await asyncio.sleep(0.1)
+            pipeline.stop()
+            pipeline.stop()
+            await task
+
+        started = time.monotonic()
+        run(main())
+        release.set()
+        assert time.monotonic() - started < 2
+
+    def test_stuck_threads_stall_the_pipeline(self):
+        """Test that a stage whose every thread stays stuck after timing out ends the run"""
+        release = threading.Event()
+        errors = []
+
+        def handler(n):
+            release.wait(5)
+
+        pipeline = Pipeline([Stage('work', handler, concurrency=2, timeout=0.05, stall_timeout=0.2)],
+                            on_error=lambda stage, error: errors.append(stage))
+        started = time.monotonic()
+        try:
+            with pytest.raises(PipelineStalled):
+                run(pipeline.run(numbers(pipeline, interval=0.01)))
+        finally:
+            release.set()
+
+        assert pipeline.stalled == 'work'
+        assert errors == ['work', 'work']
+        assert time.monotonic() - started < 2
+
+    def test_returning_thread_frees_its_slot(self):
+        """Test that a timed out thread that returns within the stall timeout gives its slot back"""
+        results = []
+
+        def handler(n):
+            if n == 0:
+                time.sleep(0.2)
+            return n
+
+        pipeline = Pipeline([Stage('work', handler, timeout=0.05, stall_timeout=1), Stage('collect', results.append)])
+        run(pipeline.run(numbers(pipeline, count=3)))
+
+        assert pipeline.stalled is None
+        assert results == [1, 2]
+
+
+class TestRunPipeline:
+    """Test cases for the check_availability pipeline"""
+
+    @patch('src.check_availability.is_quiet_hours', return_value=False)
+    @patch('src.check_availability.check_court_availability')
+    @patch('src.check_availability.notify_recipient')
+    def test_poll_diff_notify(self, mock_notify, mock_check, mock_quiet):
+        """Test one poll through fetch, diff and notify, stopped by SIGTERM"""
+        slots = SlotTable()
+        slots.append('2025-10-15', 600, 60, 1)
+        mock_check.return_value = (True, slots)
+        mock_notify.side_effect = lambda current, new_count: os.kill(os.getpid(), signal.SIGTERM)
+        store = SlotStateStore(':memory:')
+
+        run(check_availability.run_pipeline(store, 20))
+
+        mock_check.assert_called_once()
+        mock_notify.assert_called_once_with(slots, 1)
+        assert store.load().keys() == {('2025-10-15', 600, 1)}
+
+    @patch('src.check_availability.is_quiet_hours', return_value=False)
+    @patch('src.check_availability.check_court_availability')
+    @patch('src.check_availability.notify_recipient')
+    def test_cycle_metrics_include_notify(self, mock_notify, mock_check, mock_quiet):
+        """Test that a poll's metrics are exported once, after its SMS, with the diff and twilio phases"""
+        reports = []
+        exporter = MagicMock()
+        exporter.export.side_effect = reports.append
+        slots = SlotTable()
+        slots.append('2025-10-15', 600, 60, 1)
+        mock_check.return_value = (True, slots)
+
+        def send(current, new_count):
+            with check_availability.metrics.phase('twilio'):
+                pass
+            os.kill(os.getpid(), signal.SIGTERM)
+
+        mock_notify.side_effect = send
+
+        with patch('src.check_availability.metrics', Instrumentation([exporter])):
+            run(check_availability.run_pipeline(SlotStateStore(':memory:'), 20))
+
+        assert len(reports) == 1
+        assert {e['phase'] for e in reports[0]['phases']} == {'diff', 'twilio'}
+        assert {'name': 'new_slots', 'facility': None, 'value': 1} in reports[0]['counters']
+
+    @patch('src.check_availability.availability_cache', new_callable=AvailabilityCache)
+    @patch('src.check_availability.get_next_check_time', side_effect=lambda now, interval: now)
+    @patch('src.check_availability.is_quiet_hours', return_value=False)
+    @patch('src.check_availability.check_court_availability')
+    @patch('src.check_availability.notify_recipient')
+    def test_failed_court_keeps_its_slots(self, mock_notify, mock_check, mock_quiet, mock_next, mock_cache, tmp_path):
+        """Test that a court whose check failed is not treated as closed, logged as closed or alerted again"""
+        both, first_only = SlotTable(), SlotTable()
+        both.append('2025-10-15', 600, 60, 1)
+        both.append('2025-10-15', 600, 60, 2)
+        first_only.append('2025-10-15', 600, 60, 1)
+        polls = [(both, set()), (first_only, {2}), (both, set())]
+
+        def check(failed_courts=None):
+            slots, failed = polls.pop(0)
+            failed_courts.update(failed)
+            # Every poll got a new payload, so none of the diffs is skipped
+            mock_cache.mark_changed()
+            if not polls:
+                os.kill(os.getpid(), signal.SIGTERM)
+            return True, slots
+
+        mock_check.side_effect = check
+        store = SlotStateStore(':memory:')
+        event_log = SlotEventLog(str(tmp_path))
+
+        run(check_availability.run_pipeline(store, 20, event_log))
+
+        assert mock_check.call_count == 3
+        mock_notify.assert_called_once_with(both, 2)
+        assert store.load().keys() == {('2025-10-15', 600, 1), ('2025-10-15', 600, 2)}
+        # Only the first cycle's openings: no close and reopen for court 2
+        assert [event.opened for event in event_log.events()] == [True, True]
+        event_log.close()
+
+    @patch('src.check_availability.availability_cache', new_callable=AvailabilityCache)
+    @patch('src.check_availability.is_quiet_hours', return_value=False)
+    @patch('src.check_availability.run_burst')
+    @patch('src.check_availability.check_court_availability')
+    @patch('src.check_availability.notify_recipient')
+    def test_burst_slot_is_not_sent_again(self, mock_notify, mock_check, mock_run_burst, mock_quiet, mock_cache):
+        """Test that a burst find stays suppressed until a regular poll sees it, and is observed by the scheduler"""
+        released = (date.today() + timedelta(days=7)).isoformat()
+        found = SlotTable()
+        found.append(released, 600, 60, 1)
+
+        def run_burst(burst, release, notified, subscriptions):
+            notified.update(found.keys())
+            return found
+
+        # The released date is outside the regular window until a later poll
+        polls = [SlotTable(), SlotTable(), found]
+
+        def check(failed_courts=None):
+            slots = polls.pop(0)
+            mock_cache.mark_changed()
+            if not polls:
+                os.kill(os.getpid(), signal.SIGTERM)
+            return len(slots) > 0, slots
+
+        mock_run_burst.side_effect = run_burst
+        mock_check.side_effect = check
+        burst = MagicMock(window=120)
+        burst.due.side_effect = [datetime.now()] + [None] * 10
+        burst.wake_time.return_value = None
+        scheduler = MagicMock()
+        scheduler.next_check_time.side_effect = lambda now: now
+        store = SlotStateStore(':memory:')
+
+        run(check_availability.run_pipeline(store, 20, scheduler=scheduler, burst=burst))
+
+        mock_run_burst.assert_called_once()
+        assert mock_check.call_count == 3
+        mock_notify.assert_not_called()
+        assert store.load().keys() == found.keys()
+        assert [call.args[1] for call in scheduler.observe.call_args_list] == [1, 0, 0]
@@ -0,0 +1,117 @@
+import pytest
+from datetime import datetime, timedelta
+from src.check_availability import is_quiet_hours
+from src.poll_scheduler import BUCKET_MINUTES, PollScheduler, bucket_of
+from src.slot_event_log import SlotEvent
+
+MONDAY = datetime(2025, 10, 6)
+
+
+def polls_per_day(scheduler):
+    return sum(BUCKET_MINUTES * 60 / interval for interval in scheduler.intervals() if interval) / 7
+
+
+def learn_daily_release(scheduler, days=5, hour=8):
+    """Feed a release at the given hour on consecutive days, with polls every 20 minutes"""
+    for day in range(days):
+        poll = MONDAY + timedelta(days=day, hours=hour) - timedelta(minutes=5)
+        scheduler.observe(poll, 0)
+        scheduler.observe(poll + timedelta(minutes=20), 10)
+
+
+class TestPollScheduler:
+    """Test cases for PollScheduler"""
+
+    def test_cold_start_is_even(self):
+        """Test that without history the budget is spread evenly over active hours"""
+        scheduler = PollScheduler(polls_per_day=45, is_quiet=is_quiet_hours)
+        intervals = [interval for interval in scheduler.intervals() if interval]
+
+        assert max(intervals) == pytest.approx(min(intervals))
+        assert intervals[0] == pytest.approx(20 * 60)
+        assert polls_per_day(scheduler) == pytest.approx(45)
+
+    def test_quiet_hours_not_polled(self):
+        """Test that quiet hours get no polls and the next poll skips over them"""
+        scheduler = PollScheduler(polls_per_day=45, is_quiet=is_quiet_hours)
+
+        assert scheduler.intervals()[bucket_of(MONDAY.replace(hour=23))] is None
+        next_check = scheduler.next_check_time(MONDAY.replace(hour=22, minute=25))
+        assert next_check.date() == MONDAY.date() + timedelta(days=1)
+        assert next_check.hour == 7 and next_check.minute >= 30
+
+    def test_learns_release_window(self):
+        """Test that polls concentrate where slots opened, within the same budget"""
+        scheduler = PollScheduler(polls_per_day=45, is_quiet=is_quiet_hours)
+        learn_daily_release(scheduler)
+        intervals = scheduler.intervals()
+
+        hot = intervals[bucket_of(MONDAY.replace(hour=8))]
+        cold = intervals[bucket_of(MONDAY.replace(hour=15))]
+        assert hot < 5 * 60
+        assert cold > 30 * 60
+        assert polls_per_day(scheduler) == pytest.approx(45)
+        assert scheduler.hottest(1)[0].endswith('08:00')
+
+    def test_daily_pattern_applies_to_unseen_weekdays(self):
+        """Test that a weekday release is expected on the weekend too"""
+        scheduler = PollScheduler(polls_per_day=45, is_quiet=is_quiet_hours)
+        learn_daily_release(scheduler)
+        intervals = scheduler.intervals()
+
+        saturday = MONDAY + timedelta(days=5)
+        assert intervals[bucket_of(saturday.replace(hour=8))] < intervals[bucket_of(saturday.replace(hour=15))]
+
+    def test_next_check_pulled_into_hot_window(self):
+        """Test that a busy window starting soon pulls the next poll forward"""
+        scheduler = PollScheduler(polls_per_day=45, is_quiet=is_quiet_hours)
+        learn_daily_release(scheduler)
+
+        now = MONDAY + timedelta(days=7, hours=7, minutes=50)
+        next_check = scheduler.next_check_time(now)
+        assert next_check <= now.replace(hour=8, minute=5)
+
+    def test_request_budget_follows_court_count(self):
+        """Test that a request budget is split by the number of courts each poll costs"""
+        scheduler = PollScheduler(requests_per_day=180, requests_per_poll=4, is_quiet=is_quiet_hours)
+        assert polls_per_day(scheduler) == pytest.approx(45)
+
+        scheduler.set_requests_per_poll(9)
+        assert polls_per_day(scheduler) == pytest.approx(20)
+
+    def test_min_interval_caps_hot_windows(self):
+        """Test that the shortest interval holds however concentrated the openings are"""
+        scheduler = PollScheduler(polls_per_day=400, min_interval=120, is_quiet=is_quiet_hours)
+        learn_daily_release(scheduler, days=7)
+
+        assert min(interval for interval in scheduler.intervals() if interval) == pytest.approx(120)
+        assert polls_per_day(scheduler) == pytest.approx(400)
+
+    def test_learn_from_events(self):
+        """Test that event log history seeds the schedule"""
+        scheduler = PollScheduler(polls_per_day=45, is_quiet=is_quiet_hours)
+        opened_at = int((MONDAY.replace(hour=12, minute=5)).timestamp())
+        scheduler.learn_from_events([
+            SlotEvent(opened_at, 'f', '2025-10-13', 600, 60, True),
+            SlotEvent(opened_at, 'f', '2025-10-13', 660, 60, True),
+            SlotEvent(opened_at + 60, 'f', '2025-10-13', 600, 60, False),
+        ])
+
+        # Openings are spread over up to one long interval before they were logged
+        intervals = scheduler.intervals()
+        assert intervals[bucket_of(MONDAY.replace(hour=11, minute=30))] < intervals[bucket_of(MONDAY.replace(hour=15))]
+        assert intervals[bucket_of(MONDAY.replace(hour=12))] < intervals[bucket_of(MONDAY.replace(hour=15))]
+        assert scheduler.last_poll is None
+
+    def test_from_env(self, monkeypatch):
+        """Test that the scheduler is opt-in and defaults to the fixed schedule's budget"""
+        monkeypatch.delenv('POLL_SCHEDULER', raising=False)
+        assert PollScheduler.from_env(20) is None
+
+        monkeypatch.setenv('POLL_SCHEDULER', 'adaptive')
+        monkeypatch.delenv('POLL_REQUEST_BUDGET_PER_DAY', raising=False)
+        scheduler = PollScheduler.from_env(20, is_quiet=is_quiet_hours)
+        assert scheduler.polls_per_day_budget() == pytest.approx(45)
+
+        monkeypatch.setenv('POLL_REQUEST_BUDGET_PER_DAY', '400')
+        assert PollScheduler.from_env(20, requests_per_poll=4).polls_per_day_budget() == pytest.approx(100)
@@ -0,0 +1,78 @@
+from datetime import date
+from src.request_planner import RequestWindow, plan_requests, merge_window_slots
+
+
+START = date(2025, 10, 15)
+
+
+def slot(slot_date, time, duration='60min'):
+    return {'date': slot_date, 'time': time, 'duration': duration}
+
+
+class TestPlanRequests:
+    """Test cases for plan_requests"""
+
+    def test_plan_eight_days(self):
+        """Test that 8 days need one full window and a 1-day window"""
+        windows = plan_requests(['f1'], 8, start_date=START)
+
+        assert windows == [
+            RequestWindow('f1', '2025-10-15', 7, 60),
+            RequestWindow('f1', '2025-10-22', 1, 60)
+        ]
+
+    def test_plan_thirty_days_no_overlap(self):
+        """Test that windows tile the horizon exactly"""
+        windows = plan_requests(['f1'], 30, start_date=START)
+
+        assert len(windows) == 5
+        assert sum(w.days_count for w in windows) == 30
+        assert windows[-1] == RequestWindow('f1', '2025-11-12', 2, 60)
+
+    def test_plan_facilities_and_durations(self):
+        """Test the cross product of facilities and unique durations"""
+        windows = plan_requests(['f1', 'f2', 'f1'], 14, durations=[60, 90, 60], start_date=START)
+
+        assert len(windows) == 2 * 2 * 2
+        assert {(w.facility_id, w.duration) for w in windows} == {('f1', 60), ('f1', 90), ('f2', 60), ('f2', 90)}
+
+    def test_plan_empty_horizon(self):
+        """Test that a non-positive horizon needs no requests"""
+        assert plan_requests(['f1'], 0, start_date=START) == []
+
+
+class TestMergeWindowSlots:
+    """Test cases for merge_window_slots"""
+
+    def test_merge_dedupes_boundary_slots(self):
+        """Test that slots returned by two overlapping responses appear once"""
+        first = RequestWindow('f1', '2025-10-15', 7, 60)
+        second = RequestWindow('f1', '2025-10-22', 1, 60)
+        merged = merge_window_slots([
+            (first, [slot('2025-10-21', '10:00'), slot('2025-10-22', '09:00')]),
+            (second, [slot('2025-10-22', '09:00'), slot('2025-10-22', '11:00')])
+        ])
+
+        assert merged['f1'] == [slot('2025-10-21', '10:00'), slot('2025-10-22', '09:00'), slot('2025-10-22', '11:00')]
+
+    def test_merge_clips_to_horizon(self):
+        """Test that slots outside the horizon are dropped"""
+        window = RequestWindow('f1', '2025-10-15', 2, 60)
+        merged = merge_window_slots(
+            [(window, [slot('2025-10-14', '10:00'), slot('2025-10-16', '10:00'), slot('2025-10-17', '10:00')])],
+            start_date=START, horizon_days=2
+        )
+
+        assert merged['f1'] == [slot('2025-10-16', '10:00')]
+
+    def test_merge_keeps_durations_apart(self):
+        """Test that the same start with different durations is kept"""
+        window = RequestWindow('f1', '2025-10-15', 7, 60)
+        merged = merge_window_slots([(window, [slot('2025-10-15', '10:00', '90min'), slot('2025-10-15', '10:00')])])
+
+        assert [s['duration'] for s in merged['f1']] == ['60min', '90min']
+
+    def test_merge_failed_facility_has_empty_list(self):
+        """Test that a facility whose requests failed still appears"""
+        merged = merge_window_slots([(RequestWindow('f2', '2025-10-15', 7, 60), [])])
+        assert merged == {'f2': []}
@@ -0,0 +1,124 @@
+import os
+from src.slot_event_log import HEADER, RECORD, SlotEvent, SlotEventLog, iter_records
+from src.slot_table import SlotTable
+
+T0 = 1760000000
+
+
+def make_table(*slots):
+    table = SlotTable()
+    for date, start, duration, court in slots:
+        table.append(date, start, duration, court)
+    return table
+
+
+class TestSlotEventLog:
+    """Test cases for SlotEventLog"""
+
+    def test_round_trip(self, tmp_path):
+        """Test that openings and closings read back with their facility and times"""
+        log = SlotEventLog(str(tmp_path))
+        facilities = {1: 'facility-1'}
+        written = log.append_diff(make_table(('2025-10-15', 600, 60, 1)),
+                                  make_table(('2025-10-16', 1260, 90, 'North 2')),
+                                  facilities.get, timestamp=T0)
+
+        assert written == 2
+        assert list(log.events()) == [
+            SlotEvent(T0, 'facility-1', '2025-10-15', 600, 60, True),
+            SlotEvent(T0, 'North 2', '2025-10-16', 1260, 90, False),
+        ]
+
+    def test_started_slots_expire_instead_of_closing(self, tmp_path):
+        """Test that slots gone after their start passed are logged as expired, later ones as closed"""
+        log = SlotEventLog(str(tmp_path))
+        # T0 is 2025-10-09 04:53 in Toronto
+        log.append_diff(SlotTable(), make_table(('2025-10-08', 1200, 60, 1), ('2025-10-09', 240, 60, 1),
+                                                ('2025-10-09', 600, 60, 1)), timestamp=T0)
+
+        assert [(event.date, event.opened, event.expired) for event in log.events()] == [
+            ('2025-10-08', False, True), ('2025-10-09', False, True), ('2025-10-09', False, False)]
+
+    def test_undated_slots_are_skipped(self, tmp_path):
+        """Test that a slot whose date could not be read is left out instead of failing the cycle"""
+        log = SlotEventLog(str(tmp_path))
+        written = log.append_diff(make_table(('Unknown', 600, 60, 1), ('2025-10-15', 600, 60, 1)),
+                                  make_table(('Unknown', 660, 60, 1)), timestamp=T0)
+
+        assert written == 1
+        assert [event.date for event in log.events()] == ['2025-10-15']
+
+    def test_fixed_width_records(self, tmp_path):
+        """Test that each event costs exactly one fixed-size record"""
+        log = SlotEventLog(str(tmp_path))
+        log.append_diff(make_table(*[('2025-10-15', 420 + 30 * i, 60, 1) for i in range(10)]), SlotTable(),
+                        timestamp=T0)
+        log.close()
+
+        segment, = SlotEventLog(str(tmp_path)).segments()
+        assert os.path.getsize(segment) == HEADER.size + 10 * RECORD.size
+        assert len(list(iter_records(segment))) == 10
+
+    def test_empty_diff_writes_nothing(self, tmp_path):
+        """Test that a quiet cycle does not create a segment"""
+        log = SlotEventLog(str(tmp_path))
+        assert log.append_diff(SlotTable(), SlotTable(), timestamp=T0) == 0
+        assert log.segments() == []
+
+    def test_reopen_appends_and_keeps_facilities(self, tmp_path):
+        """Test that a restarted checker continues the same segment and facility numbering"""
+        log = SlotEventLog(str(tmp_path))
+        log.append_diff(make_table(('2025-10-15', 600, 60, 'a')), SlotTable(), timestamp=T0)
+        log.close()
+
+        reopened = SlotEventLog(str(tmp_path))
+        reopened.append_diff(make_table(('2025-10-15', 660, 60, 'b'), ('2025-10-15', 720, 60, 'a')), SlotTable(),
+                             timestamp=T0 + 60)
+
+        assert len(reopened.segments()) == 1
+        assert [event.facility for event in reopened.events()] == ['a', 'b', 'a']
+        with open(os.path.join(str(tmp_path), 'facilities.txt')) as f:
+            assert f.read().splitlines() == ['a', 'b']
+
+    def test_torn_record_is_dropped(self, tmp_path):
+        """Test that a partial record left by a crash is ignored and then overwritten"""
+        log = SlotEventLog(str(tmp_path))
+        log.append_diff(make_table(('2025-10-15', 600, 60, 1)), SlotTable(), timestamp=T0)
+        log.close()
+        segment, = log.segments()
+        with open(segment, 'ab') as f:
+            f.write(b'\x01\x02\x03')
+
+        assert len(list(iter_records(segment))) == 1
+        reopened = SlotEventLog(str(tmp_path))
+        reopened.append_diff(SlotTable(), make_table(('2025-10-15', 600, 60, 1)), timestamp=T0 + 60)
+        assert [event.opened for event in reopened.events()] == [True, False]
+
+    def test_rotates_by_size(self, tmp_path):
+        """Test that a full segment is closed and a new one started"""
+        log = SlotEventLog(str(tmp_path), max_bytes=HEADER.size + 3 * RECORD.size)
+        for i in range(5):
+            log.append_diff(make_table(('2025-10-15', 420 + 30 * i, 60, 1), ('2025-10-16', 420 + 30 * i, 60, 1)),
+                            SlotTable(), timestamp=T0 + i)
+
+        assert len(log.segments()) == 5
+        assert len(list(log.events())) == 10
+
+    def test_rotates_by_age_and_prunes(self, tmp_path):
+        """Test that old segments are rotated out and only max_segments are kept"""
+        log = SlotEventLog(str(tmp_path), max_age=3600, max_segments=2)
+        for hour in range(4):
+            log.append_diff(make_table(('2025-10-15', 600, 60, 1)), SlotTable(), timestamp=T0 + hour * 3600)
+
+        assert len(log.segments()) == 2
+        assert [event.timestamp for event in log.events()] == [T0 + 2 * 3600, T0 + 3 * 3600]
+        assert [event.timestamp for event in log.events(since=T0 + 3 * 3600)] == [T0 + 3 * 3600]
+
+    def test_from_env(self, tmp_path, monkeypatch):
+        """Test that the log is only enabled when a directory is configured"""
+        monkeypatch.delenv('SLOT_EVENT_LOG_DIR', raising=False)
+        assert SlotEventLog.from_env() is None
+
+        monkeypatch.setenv('SLOT_EVENT_LOG_DIR', str(tmp_path))
+        monkeypatch.setenv('SLOT_EVENT_LOG_MAX_AGE_HOURS', '6')
+        assert SlotEventLog.from_env().max_age == 6 * 3600
@@ -0,0 +1,111 @@
+import pytest
+import os
+import signal
+import subprocess
+import sys
+import textwrap
+from src.slot_state import SlotStateStore
+from src.slot_table import SlotTable
+
+
+def make_table(*slots):
+    table = SlotTable()
+    for date, start, court in slots:
+        table.append(date, start, 60, court, 'Morning', 123)
+    return table
+
+
+class TestSlotStateStore:
+    """Test cases for SlotStateStore"""
+
+    def test_first_cycle_everything_appears(self):
+        """Test that with an empty store every slot is new"""
+        store = SlotStateStore(':memory:')
+        appeared, disappeared = store.apply(make_table(('2025-10-15', 600, 1), ('2025-10-15', 660, 2)))
+
+        assert appeared.keys() == {('2025-10-15', 600, 1), ('2025-10-15', 660, 2)}
+        assert len(disappeared) == 0
+        assert store.cycle == 1
+
+    def test_appeared_and_disappeared(self):
+        """Test that a cycle reports only the changes against the stored slots"""
+        store = SlotStateStore(':memory:')
+        store.apply(make_table(('2025-10-15', 600, 1), ('2025-10-15', 660, 2)))
+
+        appeared, disappeared = store.apply(make_table(('2025-10-15', 600, 1), ('2025-10-16', 600, 'North 1')))
+
+        assert appeared.keys() == {('2025-10-16', 600, 'North 1')}
+        assert disappeared.keys() == {('2025-10-15', 660, 2)}
+        assert disappeared[0]['group'] == 'Morning'
+        assert disappeared[0]['ticks'] == 123
+        assert len(store) == 2
+
+    def test_unobserved_courts_carry_forward(self):
+        """Test that a court whose check failed keeps its slots and reports no changes"""
+        store = SlotStateStore(':memory:')
+        store.apply(make_table(('2025-10-15', 600, 1), ('2025-10-15', 660, 2)))
+
+        appeared, disappeared = store.apply(make_table(('2025-10-15', 600, 1)), unobserved_courts={2})
+        assert len(appeared) == 0 and len(disappeared) == 0
+        assert len(store) == 2
+
+        appeared, disappeared = store.apply(make_table(('2025-10-15', 600, 1), ('2025-10-15', 660, 2)))
+        assert len(appeared) == 0 and len(disappeared) == 0
+
+    def test_state_survives_reopen(self, tmp_path):
+        """Test that a restarted checker does not see the stored slots as new"""
+        path = str(tmp_path / 'state.sqlite3')
+        store = SlotStateStore(path)
+        store.apply(make_table(('2025-10-15', 600, 1)))
+        store.close()
+
+        reopened = SlotStateStore(path)
+        appeared, disappeared = reopened.apply(make_table(('2025-10-15', 600, 1)))
+
+        assert len(appeared) == 0 and len(disappeared) == 0
+        assert reopened.cycle == 2
+        assert reopened.load().keys() == {('2025-10-15', 600, 1)}
+        reopened.close()
+        reopened.close()
+
+    def test_failed_cycle_rolls_back(self):
+        """Test that an interrupted cycle leaves the previous state untouched"""
+        store = SlotStateStore(':memory:')
+        store.apply(make_table(('2025-10-15', 600, 1)))
+
+        bad = make_table(('2025-10-16', 600, 1))
+        bad.courts[0] = object()  # not storable in SQLite
+        with pytest.raises(Exception):
+            store.apply(bad)
+
+        assert store.cycle == 1
+        assert store.load().keys() == {('2025-10-15', 600, 1)}
+
+    def test_sigterm_checkpoints(self, tmp_path):
+        """Test that SIGTERM during the poll loop leaves a checkpointed database"""
+        path = str(tmp_path / 'state.sqlite3')
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        script = textwrap.dedent(f"""
+            import signal, sys, time
+            sys.path.insert(0, {root!r})
+            from src.slot_state import SlotStateStore
+            from src.slot_table import SlotTable
+            store = SlotStateStore({path!r})
+            signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+            try:
+                table = SlotTable()
+                table.append('2025-10-15', 600, 60, 1)
+                store.apply(table)
+                print('ready', flush=True)
+                time.sleep(30)
+            finally:
+                store.close()
+        """)
+        process = subprocess.Popen([sys.executable, '-c', script], stdout=subprocess.PIPE, text=True)
+        assert process.stdout.readline().strip() == 'ready'
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=10) == 0
+
+        wal = path + '-wal'
+        assert not os.path.exists(wal) or os.path.getsize(wal) == 0
+        assert SlotStateStore(path).load().keys() == {('2025-10-15', 600, 1)}
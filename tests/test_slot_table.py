@@ -0,0 +1,115 @@
+import pytest
+from src.check_availability import format_slot_output
+from src.slot_table import SlotTable
+from src.time_conversion import minute_of_day, format_minute
+
+
+def make_table(rows):
+    table = SlotTable()
+    for date, time, court in rows:
+        table.append(date, minute_of_day(time), 60, court, 'Afternoon', 100)
+    return table
+
+
+class TestSlotTable:
+    """Test cases for SlotTable"""
+
+    def test_extend_slots_from_parsed_dicts(self):
+        """Test that parsed slot dicts round-trip through the table"""
+        slots = [
+            {'date': '2025-10-15', 'time': '14:30', 'duration': '90min', 'group': 'Afternoon',
+             'title': 'Book Now!', 'ticks': 100, 'is_disabled': False}
+        ]
+        table = SlotTable()
+        table.extend_slots(slots, 2)
+
+        row = table[0]
+        assert len(table) == 1
+        assert row['date'] == '2025-10-15'
+        assert row['time'] == '14:30'
+        assert row['duration'] == '90min'
+        assert row['court'] == 2
+        assert row['ticks'] == 100
+        assert 'formatted' in row
+
+    def test_formatted_matches_slot_output(self):
+        """Test that formatting matches format_slot_output, including midnight wrap"""
+        table = SlotTable()
+        table.append('2025-10-15', minute_of_day('14:30'), 60, 1)
+        table.append('2025-10-15', minute_of_day('23:30'), 90, 3)
+        table.append('Unknown', minute_of_day('10:00'), 90, 2)
+
+        for row in table:
+            legacy = {'date': row['date'], 'time': row['time'], 'duration': row['duration']}
+            assert row['formatted'] == format_slot_output(legacy, row['court'])
+        assert table[0]['formatted'] == '2025-10-15 Wed 14:30-15:30 court 1'
+
+    def test_sorted_by_date_time_court(self):
+        """Test sorting by date, then time, then court"""
+        table = make_table([
+            ('2025-10-16', '10:00', 1),
+            ('2025-10-15', '14:30', 2),
+            ('2025-10-15', '14:30', 1),
+            ('2025-10-15', '09:00', 4)
+        ])
+        ordered = table.sorted()
+
+        assert [(row['date'], row['time'], row['court']) for row in ordered] == [
+            ('2025-10-15', '09:00', 4),
+            ('2025-10-15', '14:30', 1),
+            ('2025-10-15', '14:30', 2),
+            ('2025-10-16', '10:00', 1)
+        ]
+
+    def test_sorted_keeps_every_column(self):
+        """Test that sorting moves whole rows, orders equal slots by duration and handles an empty table"""
+        table = SlotTable()
+        table.append('2025-10-16', 600, 90, 2, 'B', 7)
+        table.append('2025-10-15', 600, 90, 1, 'A')
+        table.append('2025-10-15', 600, 60, 1, 'A', 5)
+        ordered = table.sorted()
+
+        assert [ordered.row_tuple(i) for i in range(len(ordered))] == [
+            ('2025-10-15', 600, 60, 1, 'A', 5),
+            ('2025-10-15', 600, 90, 1, 'A', -1),
+            ('2025-10-16', 600, 90, 2, 'B', 7),
+        ]
+        assert len(SlotTable().sorted()) == 0
+
+    def test_filter(self):
+        """Test filtering rows with a predicate"""
+        table = make_table([('2025-10-15', '09:00', 1), ('2025-10-15', '18:00', 2)])
+        evening = table.filter(lambda row: row['time'] >= '17:00')
+
+        assert len(evening) == 1
+        assert evening[0]['court'] == 2
+
+    def test_diff(self):
+        """Test appeared and disappeared slots between two checks"""
+        previous = make_table([('2025-10-15', '09:00', 1), ('2025-10-15', '10:00', 1)])
+        current = make_table([('2025-10-15', '10:00', 1), ('2025-10-15', '11:00', 1)])
+
+        appeared, disappeared = current.diff(previous)
+
+        assert [row['time'] for row in appeared] == ['11:00']
+        assert [row['time'] for row in disappeared] == ['09:00']
+
+    def test_concat_and_equality(self):
+        """Test combining tables and comparing them"""
+        first = make_table([('2025-10-15', '09:00', 1)])
+        second = make_table([('2025-10-15', '10:00', 2)])
+
+        combined = SlotTable.concat([first, second])
+        assert len(combined) == 2
+        assert combined == make_table([('2025-10-15', '09:00', 1), ('2025-10-15', '10:00', 2)])
+        assert combined != first
+
+    def test_index_out_of_range(self):
+        """Test indexing past the end"""
+        with pytest.raises(IndexError):
+            SlotTable()[0]
+
+    def test_format_minute_wraps(self):
+        """Test minute formatting past midnight"""
+        assert format_minute(0) == '00:00'
+        assert format_minute(24 * 60 + 30) == '00:30'
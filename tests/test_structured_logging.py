@@ -0,0 +1,20 @@
+import json
+import logging
+from src.structured_logging import JsonFormatter
+
+
+class TestJsonFormatter:
+    """Test cases for JsonFormatter"""
+
+    def test_includes_message_and_extra_fields(self):
+        """Test that extra= fields are emitted next to the message"""
+        record = logging.LogRecord('checker', logging.INFO, __file__, 1, "Court %s took %.3fs", (1, 0.25), None)
+        record.facility_id = 'facility-1'
+        record.elapsed = 0.25
+
+        entry = json.loads(JsonFormatter().format(record))
+        assert entry['message'] == 'Court 1 took 0.250s'
+        assert entry['level'] == 'INFO'
+        assert entry['facility_id'] == 'facility-1'
+        assert entry['elapsed'] == 0.25
+        assert 'args' not in entry
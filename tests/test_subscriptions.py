@@ -0,0 +1,164 @@
+import pytest
+import json
+import os
+import random
+from datetime import date
+from unittest.mock import MagicMock, patch
+from src.check_availability import notify_subscribers
+from src.slot_table import SlotTable
+from src.subscriptions import Subscription, SubscriptionIndex, SubscriptionRegistry, load_subscriptions
+from src.watch_spec import WatchSpec
+
+TODAY = date(2025, 10, 6)  # Monday
+
+
+def subscription(name, **watch):
+    return Subscription(name, f"+1555000{len(name):04d}", WatchSpec.from_config(watch) or WatchSpec())
+
+
+def random_subscriptions(count, rng):
+    subscriptions = []
+    for n in range(count):
+        watch = {'weekdays': rng.sample(['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'], rng.randint(1, 7))}
+        if rng.random() < 0.8:
+            start = rng.randrange(6 * 60, 21 * 60, 30)
+            watch['times'] = [f"{start // 60:02d}:{start % 60:02d}-{min(24, start // 60 + rng.randint(1, 4)):02d}:00"]
+        if rng.random() < 0.3:
+            watch['courts'] = rng.sample([1, 2, 3, 4], 2)
+        if rng.random() < 0.3:
+            watch['horizonDays'] = rng.randint(0, 7)
+        if rng.random() < 0.3:
+            watch['maxDuration'] = 60
+        subscriptions.append(Subscription(f"member {n}", f"+1555{n:07d}", WatchSpec.from_config(watch)))
+    return subscriptions
+
+
+class TestSubscriptionIndex:
+    """Test cases for SubscriptionIndex"""
+
+    def test_match_groups_slots_by_subscriber(self):
+        """Test that each subscriber gets just the slots they asked for"""
+        evenings = subscription('evenings', weekdays=['Mon-Fri'], times=['18:00-22:00'])
+        weekends = subscription('weekend', weekdays=['weekends'], courts=[2])
+        table = SlotTable()
+        table.append('2025-10-08', 19 * 60, 60, 1)  # Wednesday evening
+        table.append('2025-10-08', 9 * 60, 60, 1)   # Wednesday morning
+        table.append('2025-10-11', 9 * 60, 60, 2)   # Saturday, court 2
+        table.append('2025-10-11', 9 * 60, 60, 1)   # Saturday, court 1
+
+        matches = SubscriptionIndex([evenings, weekends]).match(table, TODAY)
+
+        assert [(sub.name, slots.keys()) for sub, slots in matches] == [
+            ('evenings', {('2025-10-08', 19 * 60, 1)}),
+            ('weekend', {('2025-10-11', 9 * 60, 2)}),
+        ]
+
+    def test_slot_must_fit_inside_range(self):
+        """Test range boundaries and slots spanning ranges that touch"""
+        index = SubscriptionIndex([subscription('a', times=['18:00-20:00', '20:00-21:00'])])
+
+        assert index.candidates(0, 18 * 60, 60) == [0]
+        assert index.candidates(0, 19 * 60 + 30, 90) == [0]
+        assert index.candidates(0, 20 * 60 + 30, 60) == []
+        assert index.candidates(0, 17 * 60 + 30, 60) == []
+        assert index.candidates(0, 21 * 60, 60) == []
+
+    def test_agrees_with_watch_spec(self):
+        """Test that the index matches exactly what each subscription's own filter wants"""
+        rng = random.Random(7)
+        subscriptions = random_subscriptions(300, rng)
+        table = SlotTable()
+        for _ in range(400):
+            table.append(f"2025-10-{rng.randint(6, 15):02d}", rng.randrange(7 * 60, 23 * 60, 30),
+                         rng.choice((60, 90)), rng.randint(1, 4))
+
+        matched = {sub.phone: slots.keys() for sub, slots in SubscriptionIndex(subscriptions).match(table, TODAY)}
+
+        for sub in subscriptions:
+            expected = sub.watch.compile(TODAY).apply(table).keys()
+            assert matched.get(sub.phone, set()) == expected
+
+    def test_does_not_scan_every_subscription(self):
+        """Test that a slot only reaches the subscriptions whose ranges hold it"""
+        subscriptions = [subscription(f"m{n}", times=[f"{7 + n % 14:02d}:00-{8 + n % 14:02d}:00"]) for n in range(1400)]
+        index = SubscriptionIndex(subscriptions)
+
+        assert len(index.candidates(2, 9 * 60, 60)) == 100
+
+    def test_load_subscriptions(self):
+        """Test reading the subscriptions file and rejecting entries without a phone"""
+        subscriptions = load_subscriptions({'subscriptions': [
+            {'name': 'Ann', 'phone': '+15550001', 'watch': {'weekdays': ['Sat']}},
+            {'phone': '+15550002'},
+        ]})
+
+        assert subscriptions[0].watch.weekdays == {5}
+        assert subscriptions[1].name == '+15550002'
+        with pytest.raises(ValueError):
+            load_subscriptions({'subscriptions': [{'name': 'nobody'}]})
+
+
+class TestSubscriptionRegistry:
+    """Test cases for SubscriptionRegistry"""
+
+    def write(self, path, entries, mtime):
+        path.write_text(json.dumps({'subscriptions': entries}))
+        os.utime(path, ns=(mtime, mtime))
+
+    def test_reloads_when_file_changes(self, tmp_path):
+        """Test that edits are picked up and an invalid file keeps the last good subscriptions"""
+        path = tmp_path / 'subscriptions.json'
+        self.write(path, [{'phone': '+15550001'}], 1_000_000_000)
+        registry = SubscriptionRegistry(str(path))
+        assert len(registry) == 1
+        assert registry.refresh() is False
+
+        self.write(path, [{'phone': '+15550001'}, {'phone': '+15550002'}], 2_000_000_000)
+        assert registry.refresh() is True
+        assert len(registry) == 2
+
+        path.write_text('not json')
+        os.utime(path, ns=(3_000_000_000, 3_000_000_000))
+        assert registry.refresh() is False
+        assert len(registry) == 2
+
+    def test_from_env(self, monkeypatch, tmp_path):
+        """Test that the registry is off unless SUBSCRIPTIONS_PATH is set"""
+        monkeypatch.delenv('SUBSCRIPTIONS_PATH', raising=False)
+        assert SubscriptionRegistry.from_env() is None
+
+        monkeypatch.setenv('SUBSCRIPTIONS_PATH', str(tmp_path / 'missing.json'))
+        assert len(SubscriptionRegistry.from_env()) == 0
+
+
+class TestNotifySubscribers:
+    """Test cases for notify_subscribers"""
+
+    @patch('src.check_availability.subscriber_notifiers', {})
+    @patch('src.check_availability.SMSNotifier')
+    def test_sends_each_subscriber_their_slots(self, mock_notifier_class):
+        """Test one notifier per recipient, each sent only its matches"""
+        notifiers = {}
+
+        def make_notifier(logger=None, to_number=None):
+            notifier = notifiers[to_number] = MagicMock()
+            notifier.is_configured.return_value = True
+            notifier.send_availability_notification.return_value = True
+            return notifier
+
+        mock_notifier_class.side_effect = make_notifier
+        registry = MagicMock()
+        registry.__len__.return_value = 3
+        saturday, sunday = SlotTable(), SlotTable()
+        saturday.append('2025-10-11', 540, 60, 1)
+        sunday.append('2025-10-12', 540, 60, 1)
+        registry.match.return_value = [
+            (Subscription('Ann', '+15550001', WatchSpec()), saturday),
+            (Subscription('Bo', '+15550002', WatchSpec()), sunday),
+        ]
+
+        assert notify_subscribers(registry, SlotTable.concat([saturday, sunday])) == 2
+        registry.refresh.assert_called_once()
+        assert set(notifiers) == {'+15550001', '+15550002'}
+        notifiers['+15550001'].send_availability_notification.assert_called_once_with(saturday)
+        notifiers['+15550002'].send_availability_notification.assert_called_once_with(sunday)
@@ -0,0 +1,75 @@
+import pytest
+from datetime import datetime, timedelta
+import pytz
+from src.time_conversion import (
+    api_date_to_str,
+    duration_label,
+    format_minute,
+    format_time,
+    minute_of_day,
+    weekday_abbr,
+    TORONTO_TZ
+)
+
+
+def legacy_api_date(timestamp):
+    """The original per-day conversion from parse_availability_data"""
+    utc_date = datetime.fromtimestamp(timestamp / 1000, tz=pytz.UTC)
+    toronto_date = utc_date.astimezone(pytz.timezone('America/Toronto')) + timedelta(days=1)
+    return toronto_date.strftime('%Y-%m-%d')
+
+
+class TestApiDateToStr:
+    """Test cases for api_date_to_str"""
+
+    @pytest.mark.parametrize('timestamp', [
+        1759795200000,  # 2025-10-07 from the fixture
+        1762066800000,  # Around the November DST change
+        1741503600000,  # Around the March DST change
+        1767225600000   # New year
+    ])
+    def test_matches_legacy_conversion(self, timestamp):
+        """Test that the memoized conversion matches the original one"""
+        assert api_date_to_str(timestamp) == legacy_api_date(timestamp)
+
+    def test_fixture_date(self):
+        """Test the browser-matching +1 day adjustment"""
+        assert api_date_to_str(1759795200000) == '2025-10-07'
+
+    def test_missing_timestamp(self):
+        """Test that a missing date is reported as Unknown"""
+        assert api_date_to_str(None) == 'Unknown'
+
+    def test_result_is_memoized(self):
+        """Test that repeated conversions return the same string object"""
+        assert api_date_to_str(1759795200000) is api_date_to_str(1759795200000)
+
+
+class TestLabels:
+    """Test cases for the precomputed time and duration labels"""
+
+    def test_format_time(self):
+        """Test HH:MM labels, including out-of-range values"""
+        assert format_time(8, 30) == '08:30'
+        assert format_time(0, 0) == '00:00'
+        assert format_time(25, 0) == '25:00'
+
+    def test_format_minute_and_minute_of_day_roundtrip(self):
+        """Test that every minute of the day round-trips"""
+        for minute in range(24 * 60):
+            assert minute_of_day(format_minute(minute)) == minute
+
+    def test_duration_label(self):
+        """Test duration labels"""
+        assert duration_label(60) == '60min'
+        assert duration_label(90) == '90min'
+        assert duration_label(5000) == '5000min'
+
+    def test_weekday_abbr(self):
+        """Test weekday abbreviations"""
+        assert weekday_abbr('2025-10-15') == 'Wed'
+        assert weekday_abbr('Unknown') == ''
+
+    def test_timezone_resolved_once(self):
+        """Test that the shared timezone is the Toronto zone"""
+        assert TORONTO_TZ.zone == 'America/Toronto'
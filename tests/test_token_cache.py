@@ -0,0 +1,138 @@
+import pytest
+import json
+from src.token_cache import (
+    DEFAULT_TTL_SECONDS, LEARNED_TTL_RECOVERY, LEARNED_TTL_RECOVERY_SECONDS, MIN_LEARNED_TTL_SECONDS, TokenCache
+)
+
+
+COOKIES = [{'name': 'PMSessionId', 'value': 'abc', 'domain': 'example.com', 'path': '/'}]
+
+
+class TestTokenCache:
+    """Test cases for TokenCache"""
+
+    def test_load_missing_file(self, tmp_path):
+        """Test that a missing cache file yields no token"""
+        cache = TokenCache(path=str(tmp_path / 'cache.json'))
+        assert cache.load() is None
+
+    def test_load_corrupt_file(self, tmp_path):
+        """Test that a corrupt cache file yields no token"""
+        path = tmp_path / 'cache.json'
+        path.write_text('not json')
+        cache = TokenCache(path=str(path))
+        assert cache.load() is None
+
+    def test_save_and_load_roundtrip(self, tmp_path):
+        """Test that a saved token is returned while fresh"""
+        cache = TokenCache(path=str(tmp_path / 'cache.json'))
+        cache.save('token-1', COOKIES, now=1000)
+
+        entry = cache.load(now=1010)
+        assert entry['token'] == 'token-1'
+        assert entry['cookies'] == COOKIES
+
+    def test_load_expired_default_ttl(self, tmp_path):
+        """Test that a token older than the default TTL is ignored"""
+        cache = TokenCache(path=str(tmp_path / 'cache.json'))
+        cache.save('token-1', COOKIES, now=1000)
+
+        assert cache.load(now=1000 + DEFAULT_TTL_SECONDS) is None
+
+    def test_load_configured_ttl(self, tmp_path):
+        """Test that a configured TTL overrides the default"""
+        cache = TokenCache(path=str(tmp_path / 'cache.json'), ttl_seconds=60)
+        cache.save('token-1', COOKIES, now=1000)
+
+        assert cache.load(now=1059) is not None
+        assert cache.load(now=1060) is None
+
+    def test_invalidate_learns_ttl_from_rejection(self, tmp_path):
+        """Test that a rejected token teaches the cache a shorter lifetime"""
+        path = tmp_path / 'cache.json'
+        cache = TokenCache(path=str(path))
+        cache.save('token-1', COOKIES, now=1000)
+        cache.invalidate(rejected=True, now=1100)
+
+        assert cache.load(now=1101) is None
+        assert json.loads(path.read_text())['learned_ttl'] == pytest.approx(90)
+
+        cache.save('token-2', COOKIES, now=2000)
+        assert cache.load(now=2089) is not None
+        assert cache.load(now=2090) is None
+
+    def test_invalidate_learns_ttl_from_idle_time(self, tmp_path):
+        """Test that the TTL is learned from the time since last use, not since the fetch"""
+        cache = TokenCache(path=str(tmp_path / 'cache.json'))
+        cache.save('token-1', COOKIES, now=1000)
+        cache.invalidate(rejected=True, idle_seconds=200, now=5000)
+
+        assert cache.current_ttl() == pytest.approx(180)
+
+    def test_current_ttl_is_kept_in_memory(self, tmp_path):
+        """Test that the TTL is read from disk once and then follows this cache's own writes"""
+        path = tmp_path / 'cache.json'
+        path.write_text(json.dumps({'learned_ttl': 300}))
+        cache = TokenCache(path=str(path))
+        assert cache.current_ttl() == 300
+
+        path.write_text(json.dumps({'learned_ttl': 10}))
+        assert cache.current_ttl() == 300
+
+        cache.save('token-1', COOKIES, now=1000)
+        cache.invalidate(rejected=True, idle_seconds=100, now=1200)
+        assert cache.current_ttl() == pytest.approx(90)
+
+    def test_invalidate_without_rejection_keeps_ttl(self, tmp_path):
+        """Test that a plain invalidation does not learn a lifetime"""
+        path = tmp_path / 'cache.json'
+        cache = TokenCache(path=str(path))
+        cache.save('token-1', COOKIES, now=1000)
+        cache.invalidate(now=1100)
+
+        assert 'learned_ttl' not in json.loads(path.read_text())
+        assert cache.load(now=1101) is None
+
+    def test_learned_ttl_has_a_floor(self, tmp_path):
+        """Test that a rejection right after a fetch cannot shrink the TTL below the minimum"""
+        cache = TokenCache(path=str(tmp_path / 'cache.json'))
+        cache.save('token-1', COOKIES, now=1000)
+        cache.invalidate(rejected=True, idle_seconds=2, now=1002)
+
+        assert cache.current_ttl() == MIN_LEARNED_TTL_SECONDS
+
+    def test_learn_keeps_current_token(self, tmp_path):
+        """Test that learning from a confirmed rejection leaves the replacement token in place"""
+        cache = TokenCache(path=str(tmp_path / 'cache.json'))
+        cache.save('token-2', COOKIES, now=1000)
+        cache.learn(300, now=1000)
+
+        assert cache.current_ttl() == pytest.approx(270)
+        assert cache.load(now=1100)['token'] == 'token-2'
+
+    def test_learned_ttl_recovers_after_accepted_requests(self, tmp_path):
+        """Test that a learned TTL grows back to the default while requests keep being accepted"""
+        path = tmp_path / 'cache.json'
+        cache = TokenCache(path=str(path))
+        cache.learn(300, now=1000)
+        cache.accepted(now=1000 + LEARNED_TTL_RECOVERY_SECONDS - 1)
+        assert cache.current_ttl() == pytest.approx(270)
+
+        now = 1000 + LEARNED_TTL_RECOVERY_SECONDS
+        cache.accepted(now=now)
+        assert cache.current_ttl() == pytest.approx(270 * LEARNED_TTL_RECOVERY)
+        assert TokenCache(path=str(path)).current_ttl() == pytest.approx(270 * LEARNED_TTL_RECOVERY)
+
+        for _ in range(10):
+            now += LEARNED_TTL_RECOVERY_SECONDS
+            cache.accepted(now=now)
+        assert cache.current_ttl() == DEFAULT_TTL_SECONDS
+        assert 'learned_ttl' not in json.loads(path.read_text())
+
+    def test_accepted_without_learned_ttl_does_not_write(self, tmp_path):
+        """Test that accepted requests leave the cache file alone when nothing was learned"""
+        path = tmp_path / 'cache.json'
+        cache = TokenCache(path=str(path))
+        cache.accepted(now=10 ** 6)
+
+        assert not path.exists()
@@ -0,0 +1,74 @@
+import pytest
+from src.token_extractor import scan_verification_token, parse_verification_token
+
+
+FIXTURE_TOKEN = ('CfDJ8Kx2rV9wYbqKp3Gd1eL0uM7sNfTjHcAiZoQyWX4lR8Pv6B_Ume5tKJ-dgSnO2hF'
+                 'IaCzE9xYwVqLbrGkNj0sTPi1fDHoA3mRlZ7uUcXe')
+
+
+def chunked(data, size):
+    return (data[i:i + size] for i in range(0, len(data), size))
+
+
+class TestScanVerificationToken:
+    """Test cases for the streaming token scanner"""
+
+    def load_landing_page(self):
+        """Load the saved Facility landing page"""
+        with open('tests/fixtures/landing_page.html', 'rb') as f:
+            return f.read()
+
+    @pytest.mark.parametrize('chunk_size', [1, 7, 64, 8192, 1 << 20])
+    def test_scan_fixture_any_chunk_size(self, chunk_size):
+        """Test that the token is found regardless of how the body is chunked"""
+        page = self.load_landing_page()
+        token, consumed = scan_verification_token(chunked(page, chunk_size))
+
+        assert token == FIXTURE_TOKEN
+        assert token == parse_verification_token(page)
+
+    def test_scan_stops_after_token(self):
+        """Test that the scanner does not consume chunks past the token"""
+        page = self.load_landing_page()
+        chunks = chunked(page, 1024)
+        token, consumed = scan_verification_token(chunks)
+
+        assert token == FIXTURE_TOKEN
+        assert len(consumed) < len(page)
+        assert consumed + b''.join(chunks) == page
+
+    def test_scan_attribute_order_and_quotes(self):
+        """Test that attribute order and quoting style do not matter"""
+        page = (b"<FORM class='x' id='AjaxAntiForgeryForm'>"
+                b"<input type=hidden value='a&amp;b' name='__RequestVerificationToken'></FORM>")
+        token, _ = scan_verification_token([page])
+        assert token == 'a&b'
+
+    def test_scan_ignores_token_outside_form(self):
+        """Test that token inputs in other forms are ignored"""
+        page = (b'<form id="Other"><input name="__RequestVerificationToken" value="wrong"></form>'
+                b'<form id="AjaxAntiForgeryForm"><input name="__RequestVerificationToken" value="right"></form>')
+        token, _ = scan_verification_token(chunked(page, 5))
+        assert token == 'right'
+
+    def test_scan_layout_changed_returns_consumed(self):
+        """Test that an unrecognised layout returns everything read for the fallback"""
+        page = b'<form id="AjaxAntiForgeryForm"><input name="somethingElse" value="x"></form><p>more</p>'
+        token, consumed = scan_verification_token(chunked(page, 10))
+
+        assert token is None
+        assert page.startswith(consumed)
+
+    def test_scan_missing_form(self):
+        """Test that a page without the form yields no token"""
+        token, consumed = scan_verification_token([b'<html>', b'<body></body></html>'])
+        assert token is None
+        assert consumed == b'<html><body></body></html>'
+
+
+class TestParseVerificationToken:
+    """Test cases for the BeautifulSoup fallback"""
+
+    def test_parse_missing_form(self):
+        """Test that the fallback returns None without the form"""
+        assert parse_verification_token(b'<html><body></body></html>') is None
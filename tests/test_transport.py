@@ -0,0 +1,289 @@
+import pytest
+import json
+import os
+import socket
+import ssl
+import threading
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from src.PerfectMindSession import PerfectMindSession
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.perfectmind_stub import LANDING_PATH, FakeTransport, PerfectMindStub
+from src.transport import (
+    DEFAULT_READ_TIMEOUT, RequestsTransport, Transport, make_response, make_transport, timeouts_from_env
+)
+
+# Self-signed key and certificate for localhost and 127.0.0.1, valid until 2126
+LOCALHOST_PEM = os.path.join(os.path.dirname(__file__), 'fixtures', 'localhost.pem')
+
+COURTS_CONFIG = {
+    'courts': [
+        {'court': 1, 'facilityId': 'facility-1'},
+        {'court': 2, 'facilityId': 'facility-2'},
+        {'court': 3, 'facilityId': 'facility-3'}
+    ]
+}
+
+
+def requests_session(stub):
+    return PerfectMindSession(base_url=stub.url, transport=RequestsTransport())
+
+
+def http2_session(stub):
+    pytest.importorskip('httpx')
+    return PerfectMindSession(base_url=stub.url, transport=make_transport('http2'))
+
+
+def fake_session(stub):
+    return PerfectMindSession(transport=FakeTransport(seed=1))
+
+
+@pytest.fixture(params=[requests_session, http2_session, fake_session], ids=['requests', 'http2', 'fake'])
+def session(request):
+    with PerfectMindStub(seed=1) as stub:
+        session = request.param(stub)
+        yield session
+        session.close()
+
+
+class TestBackends:
+    """Test cases for the session methods on every transport"""
+
+    def test_check_availability(self, session):
+        """Test that a single facility check authenticates and returns decoded JSON"""
+        result = session.check_availability('facility-1')
+
+        assert isinstance(result, dict)
+        assert session.verification_token
+        assert session.parse_availability_data(result)
+
+    def test_check_all_courts(self, session):
+        """Test that concurrent court checks share the session's token"""
+        results = session.check_all_courts(COURTS_CONFIG, max_concurrency=3)
+
+        assert set(results) == {1, 2, 3}
+        assert all(result['availability'] for result in results.values())
+
+    def test_get_complete_availability(self, session):
+        """Test that the multi-window horizon fetch works"""
+        slots = session.get_complete_availability('facility-1')
+
+        assert slots
+        assert all('date' in slot and 'time' in slot for slot in slots)
+
+
+class TestTimeouts:
+    """Test cases for per-request timeouts"""
+
+    @pytest.mark.parametrize('name', ['requests', 'http2'])
+    def test_slow_response_times_out(self, name):
+        """Test that a response slower than the read timeout raises requests.Timeout"""
+        if name == 'http2':
+            pytest.importorskip('httpx')
+        with PerfectMindStub(latency=1.0) as stub:
+            transport = make_transport(name, timeout=(1.0, 0.2))
+            try:
+                with pytest.raises(requests.Timeout):
+                    transport.request('GET', stub.url + LANDING_PATH)
+            finally:
+                transport.close()
+
+    def test_timeouts_from_env(self, monkeypatch):
+        """Test that the timeouts default to finite values and can be configured"""
+        monkeypatch.delenv('PERFECTMIND_CONNECT_TIMEOUT_SECONDS', raising=False)
+        monkeypatch.delenv('PERFECTMIND_READ_TIMEOUT_SECONDS', raising=False)
+        assert timeouts_from_env()[1] == DEFAULT_READ_TIMEOUT
+
+        monkeypatch.setenv('PERFECTMIND_CONNECT_TIMEOUT_SECONDS', '2')
+        monkeypatch.setenv('PERFECTMIND_READ_TIMEOUT_SECONDS', '12.5')
+        assert timeouts_from_env() == (2.0, 12.5)
+        assert make_transport('requests', timeout=timeouts_from_env()).timeout == (2.0, 12.5)
+
+
+class TestStreaming:
+    """Test cases for stream=True"""
+
+    @pytest.mark.parametrize('name', ['requests', 'http2'])
+    def test_body_is_read_as_iterated(self, name):
+        """Test that a streamed response returns before the body is complete and yields it chunk by chunk"""
+        if name == 'http2':
+            pytest.importorskip('httpx')
+        release = threading.Event()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain')
+                self.send_header('Content-Length', '10')
+                self.end_headers()
+                self.wfile.write(b'first')
+                self.wfile.flush()
+                release.wait(5)
+                self.wfile.write(b'-rest')
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        # The body is held back longer than the read timeout, so reading it up front would time out
+        transport = make_transport(name, timeout=(2.0, 1.0))
+        try:
+            response = transport.request('GET', f"http://127.0.0.1:{server.server_address[1]}/", stream=True)
+            chunks = response.iter_content(chunk_size=5)
+
+            assert next(chunks) == b'first'
+            release.set()
+            assert b''.join(chunks) == b'-rest'
+        finally:
+            release.set()
+            transport.close()
+            server.shutdown()
+            server.server_close()
+
+
+class H2Server:
+    """
+    Minimal HTTP/2-only TLS server (ALPN h2) that holds every request until
+    `hold` requests are open at once, then answers them all
+
+    Records how many TCP connections it accepted and the most streams that were
+    open on one connection, which is what multiplexing is about.
+    """
+
+    def __init__(self, hold: int, max_wait: float = 2.0):
+        import h2.config
+        import h2.connection
+        import h2.events
+        self.h2 = h2
+        self.hold = hold
+        self.max_wait = max_wait
+        self.connections = 0
+        self.peak_streams = 0
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(LOCALHOST_PEM)
+        context.set_alpn_protocols(['h2'])
+        self._context = context
+        self._listener = socket.create_server(('127.0.0.1', 0))
+        self._listener.settimeout(0.1)
+        self.url = f"https://127.0.0.1:{self._listener.getsockname()[1]}"
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._accept, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._closed.set()
+        self._thread.join()
+        self._listener.close()
+
+    def _accept(self):
+        while not self._closed.is_set():
+            try:
+                sock, _ = self._listener.accept()
+            except socket.timeout:
+                continue
+            self.connections += 1
+            threading.Thread(target=self._serve, args=(sock,), daemon=True).start()
+
+    def _serve(self, raw_sock):
+        h2 = self.h2
+        try:
+            sock = self._context.wrap_socket(raw_sock, server_side=True)
+        except (ssl.SSLError, OSError):
+            raw_sock.close()
+            return
+        conn = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False))
+        conn.initiate_connection()
+        sock.sendall(conn.data_to_send())
+        sock.settimeout(0.05)
+        pending = []
+        first_at = None
+        with sock:
+            while not self._closed.is_set():
+                try:
+                    data = sock.recv(65535)
+                    if not data:
+                        return
+                except socket.timeout:
+                    data = None
+                except OSError:
+                    return
+                for event in conn.receive_data(data) if data else ():
+                    if isinstance(event, h2.events.StreamEnded):
+                        pending.append(event.stream_id)
+                        first_at = first_at or time.monotonic()
+                        self.peak_streams = max(self.peak_streams, len(pending))
+                if pending and (len(pending) >= self.hold or time.monotonic() - first_at > self.max_wait):
+                    for stream_id in pending:
+                        conn.send_headers(stream_id, [(':status', '200'), ('content-type', 'text/plain')])
+                        conn.send_data(stream_id, f"stream {stream_id}".encode(), end_stream=True)
+                    pending = []
+                    first_at = None
+                outgoing = conn.data_to_send()
+                if outgoing:
+                    sock.sendall(outgoing)
+
+
+class TestHttp2:
+    """Test cases for the http2 transport against a real HTTP/2 endpoint"""
+
+    def test_concurrent_requests_share_one_connection(self, monkeypatch):
+        """Test that concurrent requests over TLS negotiate h2 and run as streams of a single connection"""
+        pytest.importorskip('httpx')
+        pytest.importorskip('h2')
+        # httpx trusts SSL_CERT_FILE in place of its default CA bundle
+        monkeypatch.setenv('SSL_CERT_FILE', LOCALHOST_PEM)
+        with H2Server(hold=4) as server:
+            transport = make_transport('http2', timeout=(2.0, 5.0))
+            try:
+                with ThreadPoolExecutor(max_workers=4) as pool:
+                    responses = list(pool.map(lambda _: transport.request('GET', server.url + LANDING_PATH), range(4)))
+            finally:
+                transport.close()
+
+        assert [response.status_code for response in responses] == [200] * 4
+        assert len({response.text for response in responses}) == 4
+        assert server.connections == 1
+        assert server.peak_streams == 4
+
+
+class TestMakeTransport:
+    """Test cases for make_transport and make_response"""
+
+    def test_default_is_requests(self):
+        """Test that no name gives the requests backend"""
+        assert isinstance(make_transport(None), RequestsTransport)
+        assert isinstance(make_transport('requests'), RequestsTransport)
+
+    def test_requests_transport_uses_base_jar_and_headers(self):
+        """Test that the requests backend sends the cookie jar and headers set up by Transport"""
+        transport = RequestsTransport()
+        transport.headers['X-Test'] = '1'
+        transport.cookies.set('PMSessionId', 'abc')
+
+        assert transport.session.headers['X-Test'] == '1'
+        assert transport.session.cookies['PMSessionId'] == 'abc'
+        assert 'User-Agent' in transport.headers
+
+    def test_transport_is_abstract(self):
+        """Test that a backend has to implement request"""
+        with pytest.raises(TypeError):
+            Transport()
+
+    def test_unknown_name(self):
+        """Test that a typo is reported"""
+        with pytest.raises(ValueError):
+            make_transport('carrier-pigeon')
+
+    def test_make_response_streams_body(self):
+        """Test that a prebuilt response supports the streaming API used for token scans"""
+        response = make_response(200, {'Content-Type': 'application/json'}, json.dumps({'a': 1}).encode(), 'u')
+        assert b''.join(response.iter_content(chunk_size=2)) == b'{"a": 1}'
+        assert response.json() == {'a': 1}
+        response.raise_for_status()
@@ -0,0 +1,264 @@
+import pytest
+import requests
+from unittest.mock import Mock
+from src.upstream_controller import (
+    AimdLimiter, CircuitBreaker, CircuitOpenError, TokenBucket, UpstreamController, backoff_delay
+)
+
+
+class FakeClock:
+    """Manually advanced monotonic clock whose sleep advances time"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def make_response(status_code=200, headers=None):
+    response = Mock(spec=requests.Response)
+    response.status_code = status_code
+    response.headers = headers or {}
+    return response
+
+
+def make_controller(clock, **kwargs):
+    return UpstreamController(clock=clock, sleep=clock.sleep, rng=lambda: 1.0, **kwargs)
+
+
+class TestBackoffDelay:
+    """Test cases for backoff_delay"""
+
+    def test_grows_exponentially_up_to_cap(self):
+        """Test that the delay ceiling doubles per attempt and is capped"""
+        assert backoff_delay(1, base=1, cap=10, rng=lambda: 1.0) == 1
+        assert backoff_delay(3, base=1, cap=10, rng=lambda: 1.0) == 4
+        assert backoff_delay(8, base=1, cap=10, rng=lambda: 1.0) == 10
+
+    def test_full_jitter(self):
+        """Test that the delay is scaled by the random draw"""
+        assert backoff_delay(3, base=1, cap=10, rng=lambda: 0.25) == 1
+
+
+class TestTokenBucket:
+    """Test cases for TokenBucket"""
+
+    def test_burst_then_wait(self):
+        """Test that requests beyond the burst wait for a refill"""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, burst=2, clock=clock, sleep=clock.sleep)
+
+        bucket.acquire()
+        bucket.acquire()
+        assert clock.sleeps == []
+
+        bucket.acquire()
+        assert clock.sleeps == [pytest.approx(0.5)]
+
+
+class TestAimdLimiter:
+    """Test cases for AimdLimiter"""
+
+    def test_additive_increase(self):
+        """Test that a fast healthy response raises the limit by 1/limit"""
+        limiter = AimdLimiter(initial=4, minimum=1, maximum=16, latency_target=3)
+        limiter.acquire()
+        limiter.release(0.2, overloaded=False)
+        assert limiter.limit == pytest.approx(4.25)
+        assert limiter.in_flight == 0
+
+    def test_multiplicative_decrease(self):
+        """Test that overload and slow responses halve the limit down to the minimum"""
+        limiter = AimdLimiter(initial=4, minimum=1, maximum=16, latency_target=3)
+        limiter.acquire()
+        limiter.release(0.2, overloaded=True)
+        assert limiter.limit == 2
+        limiter.acquire()
+        limiter.release(5.0, overloaded=False)
+        assert limiter.limit == 1
+        limiter.acquire()
+        limiter.release(None, overloaded=True)
+        assert limiter.limit == 1
+
+    def test_failure_without_overload_keeps_limit(self):
+        """Test that a request failing without a response or overload leaves the limit alone"""
+        limiter = AimdLimiter(initial=4, minimum=1, maximum=16, latency_target=3)
+        limiter.acquire()
+        limiter.release(None, overloaded=False)
+        assert limiter.limit == 4
+        assert limiter.in_flight == 0
+
+
+class TestCircuitBreaker:
+    """Test cases for CircuitBreaker"""
+
+    def test_half_open_after_timeout(self):
+        """Test that the breaker opens at the threshold and allows a trial after the timeout"""
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60, clock=clock)
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert not breaker.allow()
+
+        clock.now = 60
+        assert breaker.allow()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+
+
+class TestUpstreamController:
+    """Test cases for UpstreamController"""
+
+    def test_retries_retryable_status(self):
+        """Test that a 503 is retried with backoff and the success returned"""
+        clock = FakeClock()
+        controller = make_controller(clock, backoff_base=1)
+        ok = make_response(200)
+        send = Mock(side_effect=[make_response(503), ok])
+
+        assert controller.request(send) is ok
+        assert send.call_count == 2
+        assert clock.sleeps == [1]
+
+    def test_honours_retry_after(self):
+        """Test that Retry-After extends the backoff delay"""
+        clock = FakeClock()
+        controller = make_controller(clock, backoff_base=1)
+        send = Mock(side_effect=[make_response(429, {'Retry-After': '7'}), make_response(200)])
+
+        controller.request(send)
+        assert clock.sleeps == [7]
+
+    def test_retries_connection_errors(self):
+        """Test that connection errors are retried and re-raised when retries run out"""
+        clock = FakeClock()
+        controller = make_controller(clock, max_retries=2)
+        send = Mock(side_effect=requests.ConnectionError("boom"))
+
+        with pytest.raises(requests.ConnectionError):
+            controller.request(send)
+        assert send.call_count == 3
+
+    def test_non_retryable_status_returned(self):
+        """Test that a 403 is returned straight away for the caller to handle"""
+        clock = FakeClock()
+        controller = make_controller(clock)
+        send = Mock(return_value=make_response(403))
+
+        assert controller.request(send).status_code == 403
+        assert send.call_count == 1
+
+    def test_open_circuit_serves_last_good(self):
+        """Test that an open circuit serves the last good response for the key"""
+        clock = FakeClock()
+        controller = make_controller(clock, max_retries=0, failure_threshold=2)
+        ok = make_response(200)
+        controller.request(Mock(return_value=ok), key='court-1')
+
+        failing = Mock(return_value=make_response(500))
+        controller.request(failing, key='court-1')
+        controller.request(failing, key='court-1')
+        assert controller.stats()['circuit'] == CircuitBreaker.OPEN
+
+        send = Mock()
+        assert controller.request(send, key='court-1') is ok
+        send.assert_not_called()
+
+    def test_open_circuit_without_last_good(self):
+        """Test that an open circuit raises when nothing was cached for the key"""
+        clock = FakeClock()
+        controller = make_controller(clock, max_retries=0, failure_threshold=1)
+        controller.request(Mock(return_value=make_response(502)), key='court-1')
+
+        with pytest.raises(CircuitOpenError):
+            controller.request(Mock(), key='court-2')
+
+    def test_only_2xx_is_kept_as_last_good(self):
+        """Test that a rejected request is not served as the last good result while the circuit is open"""
+        clock = FakeClock()
+        controller = make_controller(clock, max_retries=0, failure_threshold=1)
+        ok = make_response(200)
+        controller.request(Mock(return_value=ok), key='court-1')
+        controller.request(Mock(return_value=make_response(403)), key='court-1')
+        controller.request(Mock(return_value=make_response(403)), key='court-2')
+        assert controller.stats()['circuit'] == CircuitBreaker.CLOSED
+
+        controller.request(Mock(return_value=make_response(502)))
+        assert controller.request(Mock(), key='court-1') is ok
+        with pytest.raises(CircuitOpenError):
+            controller.request(Mock(), key='court-2')
+
+    def test_4xx_trial_leaves_circuit_open_for_next_trial(self):
+        """Test that a half-open trial answered with a 4xx neither closes the circuit nor blocks it"""
+        clock = FakeClock()
+        controller = make_controller(clock, max_retries=0, failure_threshold=1, reset_timeout=30)
+        controller.request(Mock(return_value=make_response(502)))
+
+        clock.now += 30
+        assert controller.request(Mock(return_value=make_response(403))).status_code == 403
+        assert controller.stats()['circuit'] == CircuitBreaker.OPEN
+
+        controller.request(Mock(return_value=make_response(200)))
+        assert controller.stats()['circuit'] == CircuitBreaker.CLOSED
+
+    def test_circuit_closes_after_successful_trial(self):
+        """Test that a successful request after the reset timeout closes the circuit"""
+        clock = FakeClock()
+        controller = make_controller(clock, max_retries=0, failure_threshold=1, reset_timeout=30)
+        controller.request(Mock(return_value=make_response(502)))
+
+        clock.now += 30
+        controller.request(Mock(return_value=make_response(200)))
+        assert controller.stats()['circuit'] == CircuitBreaker.CLOSED
+
+    def test_failed_trial_reopens_on_any_request_error(self):
+        """Test that a half-open trial failing with a non-connection error reopens the circuit"""
+        clock = FakeClock()
+        controller = make_controller(clock, max_retries=0, failure_threshold=1, reset_timeout=30)
+        controller.request(Mock(return_value=make_response(502)))
+
+        clock.now += 30
+        with pytest.raises(requests.exceptions.ChunkedEncodingError):
+            controller.request(Mock(side_effect=requests.exceptions.ChunkedEncodingError("truncated")))
+        assert controller.stats()['circuit'] == CircuitBreaker.OPEN
+
+        clock.now += 30
+        controller.request(Mock(return_value=make_response(200)))
+        assert controller.stats()['circuit'] == CircuitBreaker.CLOSED
+
+    def test_raised_rate_is_restored(self):
+        """Test that a raised rate lets a burst through without waits and the configured limits come back"""
+        clock = FakeClock()
+        controller = make_controller(clock, rate_per_second=2, burst=2)
+
+        with controller.raised_rate(8, 4):
+            # The bucket fills up to the raised burst, as it does over a burst's lead time
+            clock.sleep(1)
+            for _ in range(2):
+                for _ in range(4):
+                    controller.request(lambda: make_response(200))
+                clock.sleep(0.5)
+            assert clock.sleeps == [1, 0.5, 0.5]
+
+        assert (controller.bucket.rate, controller.bucket.burst) == (2, 2)
+        for _ in range(3):
+            controller.request(lambda: make_response(200))
+        assert clock.sleeps == [1, 0.5, 0.5, 0.5]
+
+    def test_from_env(self, monkeypatch):
+        """Test that the rate and concurrency come from the environment"""
+        monkeypatch.setenv('UPSTREAM_RATE_PER_SECOND', '2')
+        monkeypatch.setenv('UPSTREAM_MAX_CONCURRENCY', '3')
+        controller = UpstreamController.from_env()
+        assert controller.bucket.rate == 2
+        assert controller.limiter.maximum == 3
+        assert controller.limiter.limit == 3
@@ -0,0 +1,68 @@
+from src.venue_config import DEFAULT_BASE_URL, DEFAULT_SERVICE_ID, DEFAULT_WIDGET_ID, group_by_host, load_venues
+
+
+class TestLoadVenues:
+    """Test cases for load_venues"""
+
+    def test_single_venue_file(self):
+        """Test that the single-venue court-info.json keeps its courts and IDs"""
+        config = {
+            'widgetId': 'widget-1',
+            'calendarId': 'calendar-1',
+            'url': 'https://example.perfectmind.com/Clients/BookMe4LandingPages/Facility',
+            'courts': [{'court': 1, 'facilityId': 'facility-1'}]
+        }
+        venues = load_venues(config)
+
+        assert len(venues) == 1
+        assert venues[0].base_url == 'https://example.perfectmind.com'
+        assert venues[0].widget_id == 'widget-1'
+        assert venues[0].calendar_id == 'calendar-1'
+        assert venues[0].service_id == DEFAULT_SERVICE_ID
+        assert venues[0].courts == ({'court': 1, 'facilityId': 'facility-1'},)
+
+    def test_defaults(self):
+        """Test that a bare courts list targets the default tenant"""
+        venue = load_venues({'courts': []})[0]
+        assert venue.base_url == DEFAULT_BASE_URL
+        assert venue.widget_id == DEFAULT_WIDGET_ID
+        assert venue.host == 'cityofmarkham.perfectmind.com'
+
+    def test_multiple_venues_prefix_court_labels(self):
+        """Test that court labels stay unique across venues"""
+        config = {'venues': [
+            {'name': 'North', 'baseUrl': 'https://a.perfectmind.com/', 'serviceId': 'svc-a',
+             'durationIds': ['d1'], 'maxConcurrency': 2, 'courts': [{'court': 1, 'facilityId': 'a-1'}]},
+            {'name': 'South', 'baseUrl': 'https://b.perfectmind.com', 'courts': [{'court': 1, 'facilityId': 'b-1'}]}
+        ]}
+        north, south = load_venues(config)
+
+        assert north.base_url == 'https://a.perfectmind.com'
+        assert north.service_id == 'svc-a'
+        assert north.duration_ids == ('d1',)
+        assert north.max_concurrency == 2
+        assert north.courts[0]['court'] == 'North 1'
+        assert south.courts[0]['court'] == 'South 1'
+
+    def test_landing_page_back_url(self):
+        """Test that the back URL carries the venue's widget and calendar"""
+        config = {'venues': [{'baseUrl': 'https://a.perfectmind.com', 'widgetId': 'w', 'calendarId': 'c'}]}
+        venue = load_venues(config)[0]
+        assert venue.landing_page_back_url == ('https://a.perfectmind.com/Clients/BookMe4FacilityList/List'
+                                               '?widgetId=w&calendarId=c')
+
+
+class TestGroupByHost:
+    """Test cases for group_by_host"""
+
+    def test_groups_venues_sharing_a_tenant(self):
+        """Test that venues on one host share a group"""
+        config = {'venues': [
+            {'name': 'A', 'baseUrl': 'https://one.perfectmind.com'},
+            {'name': 'B', 'baseUrl': 'https://two.perfectmind.com'},
+            {'name': 'C', 'baseUrl': 'https://one.perfectmind.com'}
+        ]}
+        hosts = group_by_host(load_venues(config))
+
+        assert list(hosts) == ['one.perfectmind.com', 'two.perfectmind.com']
+        assert [venue.name for venue in hosts['one.perfectmind.com']] == ['A', 'C']
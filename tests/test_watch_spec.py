@@ -0,0 +1,149 @@
+import pytest
+import json
+from datetime import date
+from unittest.mock import MagicMock, mock_open, patch
+from src.availability_decoder import decode_spots
+from src.check_availability import check_court_availability
+from src.PerfectMindSession import PerfectMindSession
+from src.slot_table import SlotTable
+from src.watch_spec import WatchSpec, parse_time_range, parse_weekdays
+
+TODAY = date(2025, 10, 6)  # Monday
+
+EVENINGS = {
+    'weekdays': ['Mon-Fri'],
+    'times': ['18:00-22:00'],
+    'courts': [1, 3],
+    'minDuration': 60,
+    'maxDuration': 60,
+    'horizonDays': 7
+}
+
+
+def load_test_data():
+    with open('tests/fixtures/response.json', 'r') as f:
+        return eval(f.read())
+
+
+class TestWatchSpec:
+    """Test cases for WatchSpec and its compiled SlotFilter"""
+
+    def test_parse_weekdays(self):
+        """Test weekday names, ranges across the weekend and groups"""
+        assert parse_weekdays(['Mon-Fri']) == frozenset(range(5))
+        assert parse_weekdays(['Fri-Mon']) == frozenset((4, 5, 6, 0))
+        assert parse_weekdays(['saturday', 'Sun']) == parse_weekdays(['weekends'])
+        with pytest.raises(ValueError):
+            parse_weekdays(['Funday'])
+
+    def test_parse_time_range(self):
+        """Test that time ranges must be ordered within one day"""
+        assert parse_time_range('18:00-24:00') == (1080, 1440)
+        with pytest.raises(ValueError):
+            parse_time_range('22:00-18:00')
+        with pytest.raises(ValueError):
+            parse_time_range('evening')
+
+    def test_from_config(self):
+        """Test reading the watch entry, and that a missing entry means no filter"""
+        spec = WatchSpec.from_config(EVENINGS)
+
+        assert spec.weekdays == frozenset(range(5))
+        assert spec.time_ranges == ((1080, 1320),)
+        assert spec.courts == {'1', '3'}
+        assert WatchSpec.from_config(None) is None
+        with pytest.raises(ValueError):
+            WatchSpec.from_config({'minDuration': 90, 'maxDuration': 60})
+
+    def test_filter(self):
+        """Test each field of the compiled filter"""
+        keep = WatchSpec.from_config(EVENINGS).compile(TODAY)
+
+        assert keep('2025-10-08', 18 * 60, 60, 1)
+        assert keep('2025-10-08', 21 * 60, 60, 3)
+        assert not keep('2025-10-08', 21 * 60 + 30, 60, 1)  # Ends after 22:00
+        assert not keep('2025-10-08', 9 * 60, 60, 1)  # Weekday morning
+        assert not keep('2025-10-08', 18 * 60, 90, 1)  # 90 minutes
+        assert not keep('2025-10-11', 18 * 60, 60, 1)  # Saturday
+        assert not keep('2025-10-08', 18 * 60, 60, 2)  # Court 2
+        assert keep('2025-10-13', 18 * 60, 60, 1)
+        assert not keep('2025-10-14', 18 * 60, 60, 1)  # Past the horizon
+
+    def test_empty_spec_keeps_everything(self):
+        """Test that fields left out match every slot"""
+        keep = WatchSpec().compile(TODAY)
+
+        assert keep('2025-12-25', 0, 180, 'Angus Glen 4')
+
+    def test_apply_to_table(self):
+        """Test filtering a slot table"""
+        table = SlotTable()
+        table.append('2025-10-08', 19 * 60, 60, 1)
+        table.append('2025-10-08', 8 * 60, 60, 1)
+        table.append('2025-10-08', 19 * 60, 60, 2)
+
+        kept = WatchSpec.from_config(EVENINGS).compile(TODAY).apply(table)
+
+        assert kept.keys() == {('2025-10-08', 19 * 60, 1)}
+
+
+class TestWatchedParsing:
+    """Test cases for applying a watch spec while parsing"""
+
+    def test_decoder_skips_unwanted_spots(self):
+        """Test that the raw scan and the JSON walk keep the same spots"""
+        test_data = load_test_data()
+        body = json.dumps(test_data, separators=(',', ':')).encode()
+        keep = WatchSpec.from_config({'times': ['12:00-24:00']}).compile(TODAY)
+
+        all_spots = decode_spots(body)
+        kept = decode_spots(body, keep)
+
+        assert kept == decode_spots(test_data, keep)
+        assert 0 < len(kept) < len(all_spots)
+        assert all(spot.hours >= 12 for spot in kept)
+
+    def test_parse_availability_data_uses_session_watch(self):
+        """Test that parse_availability_data drops slots outside the session's watch spec"""
+        session = PerfectMindSession()
+        test_data = load_test_data()
+        all_slots = session.parse_availability_data(test_data)
+        first_date = all_slots[0]['date']
+
+        session.watch = WatchSpec(horizon_days=0).compile(date.fromisoformat(first_date))
+        slots = session.parse_availability_data(test_data)
+
+        assert slots and {slot['date'] for slot in slots} == {first_date}
+
+    @patch('src.check_availability.PerfectMindSession')
+    @patch('builtins.open', new_callable=mock_open, read_data=json.dumps({
+        'courts': [{'court': 1, 'facilityId': 'f1'}, {'court': 2, 'facilityId': 'f2'}],
+        'watch': {'courts': [1], 'times': ['18:00-22:00']}
+    }))
+    def test_check_court_availability_applies_watch(self, mock_file, mock_session_class):
+        """Test that unwatched courts are not polled and unwanted slots are not reported"""
+        mock_session = MagicMock()
+        mock_session_class.return_value = mock_session
+        mock_session.parse_availability_data.return_value = [
+            {'date': '2025-10-15', 'time': '09:00', 'duration': '60min'},
+            {'date': '2025-10-15', 'time': '19:00', 'duration': '60min'},
+        ]
+        mock_session.check_all_courts.return_value = {1: {'availability': b'body', 'facility_id': 'f1'}}
+
+        success, slots = check_court_availability()
+
+        polled = mock_session.check_all_courts.call_args[0][0]['courts']
+        assert [court['court'] for court in polled] == [1]
+        assert mock_session.watch.spec.courts == {'1'}
+        assert success is True
+        assert [slot['time'] for slot in slots] == ['19:00']
+
+    @patch('src.check_availability.PerfectMindSession')
+    @patch('builtins.open', new_callable=mock_open, read_data='{"courts": [], "watch": {"times": ["late"]}}')
+    def test_check_court_availability_invalid_watch(self, mock_file, mock_session_class):
+        """Test that an invalid watch spec fails the check like an invalid file"""
+        success, slots = check_court_availability()
+
+        assert success is False
+        assert len(slots) == 0
+        mock_session_class.assert_not_called()